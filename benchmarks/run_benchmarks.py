@@ -0,0 +1,212 @@
+"""
+Benchmark suite for the hot paths of hoomd_kf.
+
+Runs scaling sweeps over particle count and patch count and records
+the wall time (best of several repeats) and peak memory (tracemalloc)
+of every case in a JSON file, so that regressions are visible.
+
+Usage:
+    python run_benchmarks.py [--output FILE] [--quick] [--repeat R]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import numpy as np
+from hoomd_kf import __version__
+from hoomd_kf.patch import Patch
+from hoomd_kf.patches import Patches
+from hoomd_kf.patchy_system import PatchySystem
+from hoomd_kf.utils import check_adjacency, make_random_frame
+from hoomd_kf.energy import compute_energy
+from hoomd_kf.bonds import find_bonds
+
+
+def measure(function, repeat):
+    """
+    Function that returns the best wall time over repeat calls
+    and the peak traced memory of one call.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak
+
+def make_patches(n_patches):
+    """
+    Function that returns n_patches patches that all interact.
+    """
+    patches = Patches(list_of_patches=[Patch(kf_lambda=1.1, cos_delta=0.92, epsilon=1)
+                                       for _ in range(n_patches)])
+    patches.make_all_patches_interact_with_each_other()
+    return patches
+
+def bench_initial_configuration(sizes, repeat, tmp_dir):
+    """
+    Benchmark of PatchySystem.generate_initial_configuration().
+    """
+    file_name = os.path.join(tmp_dir, "initial.gsd")
+    for n in sizes['particles']:
+        # lattice spacing of 2
+        density = n / (2 * np.ceil(n ** (1./3)))
+        system = PatchySystem(num_particles=n, density=density,
+                              particle_types={'A': 0.5, 'B': 0.5})
+        yield {'n_particles': n}, measure(
+            lambda: system.generate_initial_configuration(file_name=file_name, mode='wb'), repeat)
+
+def bench_set_adjacency(sizes, repeat, tmp_dir):
+    """
+    Benchmark of Patches.set_adjacency() with a dense matrix.
+    """
+    for p in sizes['patches']:
+        patches = make_patches(p)
+        adjacency = np.ones((p, p))
+        yield {'n_patches': p}, measure(lambda: patches.set_adjacency(adjacency), repeat)
+
+def bench_check_adjacency(sizes, repeat, tmp_dir):
+    """
+    Benchmark of utils.check_adjacency() with a dense matrix.
+    """
+    for p in sizes['patches']:
+        adjacency = np.ones((p, p))
+        yield {'n_patches': p}, measure(lambda: check_adjacency(adjacency), repeat)
+
+def bench_add(sizes, repeat, tmp_dir):
+    """
+    Benchmark of Patches.__add__().
+    """
+    for p in sizes['patches']:
+        patches = make_patches(p)
+        yield {'n_patches': p}, measure(lambda: patches + patches, repeat)
+
+def bench_concatenate(sizes, repeat, tmp_dir):
+    """
+    Benchmark of Patches.concatenate() building a library of
+    n_patches single-patch objects.
+    """
+    for p in sizes['patches']:
+        library = [make_patches(1) for _ in range(p)]
+        yield {'n_patches': p}, measure(lambda: Patches.concatenate(library), repeat)
+
+def bench_getitem(sizes, repeat, tmp_dir):
+    """
+    Benchmark of Patches.__getitem__() with a slice.
+    """
+    for p in sizes['patches']:
+        patches = make_patches(p)
+        yield {'n_patches': p}, measure(lambda: patches[::2], repeat)
+
+def bench_energy(sizes, repeat, tmp_dir):
+    """
+    Benchmark of energy.compute_energy().
+    """
+    for p in (2, 4):
+        patches = Patches()
+        patches.generate_patches_from_geometry(p, cache_dir=os.path.join(tmp_dir, "geometry"))
+        for n in sizes['particles']:
+            frame = make_random_frame(n, density=0.5)
+            yield {'n_particles': n, 'n_patches': p}, measure(
+                lambda: compute_energy(patches, frame), repeat)
+
+def bench_energy_numba(sizes, repeat, tmp_dir):
+    """
+    Benchmark of energy.compute_energy() with the numba backend
+    (which falls back to numpy if numba is not installed).
+    """
+    for p in (2, 4, 12):
+        patches = Patches()
+        patches.generate_patches_from_geometry(p, cache_dir=os.path.join(tmp_dir, "geometry"))
+        # compile the kernels outside of the timed calls
+        compute_energy(patches, make_random_frame(10, density=0.5), backend='numba')
+        for n in sizes['particles']:
+            frame = make_random_frame(n, density=0.5)
+            yield {'n_particles': n, 'n_patches': p}, measure(
+                lambda: compute_energy(patches, frame, backend='numba'), repeat)
+
+def bench_bonds(sizes, repeat, tmp_dir):
+    """
+    Benchmark of bonds.find_bonds().
+    """
+    for p in (2, 4):
+        patches = Patches()
+        patches.generate_patches_from_geometry(p, cache_dir=os.path.join(tmp_dir, "geometry"))
+        for n in sizes['particles']:
+            frame = make_random_frame(n, density=0.5)
+            yield {'n_particles': n, 'n_patches': p}, measure(
+                lambda: find_bonds(patches, frame), repeat)
+
+BENCHMARKS = {'generate_initial_configuration': bench_initial_configuration,
+              'set_adjacency': bench_set_adjacency,
+              'check_adjacency': bench_check_adjacency,
+              'patches_add': bench_add,
+              'patches_concatenate': bench_concatenate,
+              'patches_getitem': bench_getitem,
+              'compute_energy': bench_energy,
+              'compute_energy_numba': bench_energy_numba,
+              'find_bonds': bench_bonds}
+
+def run(sizes, repeat, selected=None):
+    """
+    Function that runs the selected benchmarks and returns the records.
+    """
+    records = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, benchmark in BENCHMARKS.items():
+            if selected and name not in selected:
+                continue
+            for params, (seconds, peak) in benchmark(sizes, repeat, tmp_dir):
+                record = {'benchmark': name, **params,
+                          'seconds': seconds, 'peak_bytes': peak}
+                records.append(record)
+                print(f"{name}\t{params}\t{seconds:.4g} s\t{peak / 1024 ** 2:.3g} MiB",
+                      flush=True)
+    return records
+
+def main(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help="JSON file to write the results to")
+    parser.add_argument('--quick', action='store_true',
+                        help="only run the small sizes")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="number of timed repeats per case")
+    parser.add_argument('--only', nargs='*', choices=list(BENCHMARKS),
+                        help="only run these benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        sizes = {'particles': [10 ** 3, 10 ** 4], 'patches': [10, 100]}
+    else:
+        sizes = {'particles': [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6],
+                 'patches': [10, 100, 1000, 4000]}
+
+    records = run(sizes, args.repeat, selected=args.only)
+    result = {'hoomd_kf_version': __version__,
+              'numpy_version': np.__version__,
+              'python_version': platform.python_version(),
+              'machine': platform.machine(),
+              'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'records': records}
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+This file contains the AnalysisCache class: a persistent cache of
+per-frame analysis results of gsd trajectories, stored as .npz shards.
+
+Entries are keyed by the trajectory path, the content hash of the
+Patches object and the analysis function. The trajectory identity
+(size, mtime) is stored alongside; if the file changed because frames
+were appended, the cached frames are reused after checking a
+fingerprint of the last cached frame, and only new frames are computed.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import gsd.hoomd
+from hoomd_kf.kernel_cache import default_cache_dir
+from hoomd_kf.parallel import iter_analysis
+
+META_NAME = "meta.json"
+
+
+def get_frame_fingerprint(frame):
+    """
+    Function that returns a digest of the particle data of a frame.
+    """
+    digest = hashlib.sha256()
+    for array in (frame.particles.position, frame.particles.orientation):
+        if array is not None:
+            digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+def get_file_identity(file_name):
+    """
+    Function that returns the (path, size, mtime) identity of a file.
+    """
+    stat = os.stat(file_name)
+    return os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns
+
+def get_analysis_name(analysis):
+    """
+    Function that returns the fully qualified name of an analysis function.
+    """
+    return f"{analysis.__module__}.{analysis.__qualname__}"
+
+
+class AnalysisCache:
+    """
+    An AnalysisCache object stores per-frame analysis results on disk.
+    """
+
+    def __init__(self, cache_dir=None):
+        """
+        Initialize the AnalysisCache object.
+
+        cache_dir -> directory of the cache (default: <kernel cache dir>/analysis)
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(default_cache_dir(), "analysis")
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __repr__(self):
+        """
+        __repr__ function for AnalysisCache object.
+        """
+        return f"<AnalysisCache object at {self.cache_dir}>"
+
+    def get_key(self, file_name, patches, analysis):
+        """
+        Function that returns the cache key of an analysis of a trajectory.
+        """
+        digest = hashlib.sha256()
+        digest.update(os.path.abspath(file_name).encode())
+        digest.update(patches.content_hash().encode())
+        digest.update(get_analysis_name(analysis).encode())
+        return digest.hexdigest()
+
+    def get_entry(self, key):
+        """
+        Function that returns the directory of a cache entry.
+        """
+        return os.path.join(self.cache_dir, key)
+
+    def load_meta(self, key):
+        """
+        Function that returns the metadata of a cache entry, or None.
+        """
+        try:
+            with open(os.path.join(self.get_entry(key), META_NAME)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def write_atomic(self, key, name, write):
+        """
+        Function that calls write(f) on a temporary file and moves it
+        into place, so that readers never see a partial file.
+        """
+        entry = self.get_entry(key)
+        os.makedirs(entry, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=entry, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, os.path.join(entry, name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_valid_frames(self, key, file_name):
+        """
+        Function that returns the metadata of a cache entry and the
+        number of cached frames that are still valid for the file.
+        """
+        meta = self.load_meta(key)
+        if meta is None:
+            return None, 0
+
+        _, size, mtime = get_file_identity(file_name)
+        if size == meta['size'] and mtime == meta['mtime']:
+            return meta, meta['n_frames']
+
+        # the file changed: reuse the cached frames only if it grew by
+        # appending frames, i.e. the last cached frame is unchanged
+        n_cached = meta['n_frames']
+        if size < meta['size'] or n_cached == 0:
+            return None, 0
+        with gsd.hoomd.open(name=file_name, mode='rb') as f:
+            if len(f) < n_cached:
+                return None, 0
+            if get_frame_fingerprint(f[n_cached - 1]) != meta['fingerprint']:
+                return None, 0
+        return meta, n_cached
+
+    def load_shard(self, key, shard):
+        """
+        Function that yields the per-frame results stored in a shard.
+        """
+        start, stop, name, is_tuple = shard
+        with np.load(os.path.join(self.get_entry(key), name)) as data:
+            for frame in range(start, stop):
+                n_outputs = int(data[f"n_{frame}"])
+                values = [data[f"f{frame}_{k}"] for k in range(n_outputs)]
+                values = [v[()] if v.ndim == 0 else v for v in values]
+                yield tuple(values) if is_tuple else values[0]
+
+    def store_shard(self, key, start, results):
+        """
+        Function that stores the results of frames start, start+1, ...
+        as a shard. Returns the shard description.
+        """
+        stop = start + len(results)
+        name = f"frames_{start:08d}_{stop:08d}.npz"
+        is_tuple = isinstance(results[0], tuple)
+        arrays = {}
+        for frame, result in zip(range(start, stop), results):
+            values = result if is_tuple else (result,)
+            arrays[f"n_{frame}"] = np.array(len(values))
+            for k, value in enumerate(values):
+                arrays[f"f{frame}_{k}"] = np.asarray(value)
+        self.write_atomic(key, name, lambda f: np.savez(f, **arrays))
+        return [start, stop, name, is_tuple]
+
+    def store_meta(self, key, file_name, shards, n_frames, fingerprint):
+        """
+        Function that writes the metadata of a cache entry.
+        """
+        path, size, mtime = get_file_identity(file_name)
+        meta = {'path': path,
+                'size': size,
+                'mtime': mtime,
+                'n_frames': n_frames,
+                'fingerprint': fingerprint,
+                'shards': shards}
+        self.write_atomic(key, META_NAME, lambda f: f.write(json.dumps(meta).encode()))
+
+    def iter_results(self, file_name, patches, analysis, chunk_size=64, n_workers=1):
+        """
+        Generator that yields analysis(patches, frame) for every frame of
+        a gsd file in frame order, reading cached frames from disk and
+        computing (and caching) the rest.
+
+        chunk_size -> number of frames per shard
+        n_workers -> number of processes used for uncached frames
+        """
+        key = self.get_key(file_name, patches, analysis)
+        meta, n_cached = self.get_valid_frames(key, file_name)
+        if meta is None:
+            # drop stale shards of an invalidated entry
+            shutil.rmtree(self.get_entry(key), ignore_errors=True)
+            shards = []
+        else:
+            shards = meta['shards']
+
+        for shard in shards:
+            yield from self.load_shard(key, shard)
+
+        with gsd.hoomd.open(name=file_name, mode='rb') as f:
+            n_frames = len(f)
+            if n_frames == n_cached:
+                return
+            fingerprint = get_frame_fingerprint(f[n_frames - 1])
+
+            if n_workers > 1:
+                results = iter_analysis(file_name, patches, analysis, n_workers=n_workers,
+                                        start=n_cached, stop=n_frames)
+            else:
+                results = (analysis(patches, f[i]) for i in range(n_cached, n_frames))
+
+            buffer = []
+            start = n_cached
+            for result in results:
+                yield result
+                buffer.append(result)
+                if len(buffer) == chunk_size:
+                    shards.append(self.store_shard(key, start, buffer))
+                    start += len(buffer)
+                    buffer = []
+            if buffer:
+                shards.append(self.store_shard(key, start, buffer))
+
+        self.store_meta(key, file_name, shards, n_frames, fingerprint)
+
+    def get_results(self, file_name, patches, analysis, **kwargs):
+        """
+        Function that returns the list of per-frame results of iter_results().
+        """
+        return list(self.iter_results(file_name, patches, analysis, **kwargs))
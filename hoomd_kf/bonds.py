@@ -0,0 +1,59 @@
+"""
+This file contains functions to extract the Kern-Frenkel bond network
+of gsd frames, and to stream it over whole trajectories one frame at
+a time.
+"""
+import numpy as np
+import gsd.hoomd
+from hoomd_kf.energy import PatchFrame, bonded_patch_pairs, pair_parameters
+from hoomd_kf.jit import get_backend, jit_find_bonds
+from hoomd_kf.neighbor import NeighborList
+
+
+def find_bonds(patches, frame, neighbor_list=None, backend=None):
+    """
+    Function that finds all bonds in a gsd.hoomd.Frame (or a PatchFrame),
+    given the Patches object carried by every particle. Returns an
+    (n_bonds, 4) int array whose rows are (particle_i, patch_a,
+    particle_j, patch_b), with particle_i < particle_j.
+
+    neighbor_list -> optional NeighborList, reused across calls.
+    backend -> 'numpy' (default) or 'numba' (see jit.py)
+    """
+    patch_frame = PatchFrame.get(patches, frame)
+    arrays = patch_frame.arrays
+    positions = patch_frame.positions
+    box = patch_frame.box
+
+    r_cut = np.max(arrays['kf_lambda'])
+    if neighbor_list is None:
+        neighbor_list = NeighborList(r_cut, skin=0)
+    i, j = neighbor_list.pairs(positions, box, r_cut=r_cut)
+
+    if get_backend(backend) == 'numba':
+        lambda_ab, _ = pair_parameters(arrays)
+        return jit_find_bonds(arrays, lambda_ab, positions, box, i, j, patch_frame.directions)
+
+    bonded = bonded_patch_pairs(arrays, positions, patch_frame.orientations, box, i, j,
+                                directions=patch_frame.directions)
+    m, a, b = np.nonzero(bonded)
+    return np.stack([i[m], a, j[m], b], axis=1).astype(np.int64)
+
+def iter_bonds(trajectory, patches, skin=0.3):
+    """
+    Generator that walks a gsd trajectory frame by frame and yields
+    the bonds of each frame, as returned by find_bonds(). Only one
+    frame is held in memory at a time, and the neighbor list is reused
+    between frames while particles stay within the skin.
+
+    trajectory -> file name, or an open gsd.hoomd trajectory
+    """
+    neighbor_list = NeighborList.from_patches(patches, skin=skin)
+
+    if isinstance(trajectory, str):
+        with gsd.hoomd.open(name=trajectory, mode='rb') as f:
+            for frame in f:
+                yield find_bonds(patches, frame, neighbor_list=neighbor_list)
+    else:
+        for frame in trajectory:
+            yield find_bonds(patches, frame, neighbor_list=neighbor_list)
@@ -0,0 +1,62 @@
+"""
+This file contains functions to label the clusters of bonded particles,
+using a sparse connected-components pass over the bond graph.
+"""
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from hoomd_kf.bonds import find_bonds
+from hoomd_kf.energy import PatchFrame
+
+
+def label_clusters(bonds, num_particles):
+    """
+    Function that labels the connected clusters of the bond graph.
+
+    bonds -> (n_bonds, 4) array as returned by bonds.find_bonds(), or an
+             (n_bonds, 2) array of bonded particle pairs
+    num_particles -> number of particles in the frame
+
+    Returns (labels, sizes): an (N,) array with the cluster label of
+    every particle and the size of every cluster. Clusters are labelled
+    by decreasing size, so that label 0 is the largest cluster.
+    """
+    bonds = np.asarray(bonds, dtype=np.int64)
+    if bonds.ndim == 2 and bonds.shape[1] == 4:
+        i, j = bonds[:, 0], bonds[:, 2]
+    else:
+        # also accepts an empty list of bonds
+        bonds = bonds.reshape(-1, 2)
+        i, j = bonds[:, 0], bonds[:, 1]
+
+    graph = coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)),
+                       shape=(num_particles, num_particles))
+    _, labels = connected_components(graph, directed=False)
+
+    sizes = np.bincount(labels)
+    # relabel by decreasing size (stable, so ties keep their order)
+    order = np.argsort(-sizes, kind='stable')
+    relabel = np.empty_like(order)
+    relabel[order] = np.arange(len(order))
+
+    return relabel[labels], sizes[order]
+
+def cluster_size_histogram(sizes):
+    """
+    Function that returns the cluster size histogram, i.e. an array
+    whose entry s is the number of clusters of size s.
+    """
+    return np.bincount(sizes)
+
+def analyze_clusters(patches, frame, neighbor_list=None):
+    """
+    Function that runs the cluster analysis on a gsd.hoomd.Frame
+    (or a PatchFrame).
+    Returns (labels, histogram, largest), where largest holds the
+    indices of the particles in the largest cluster. Can be used with
+    parallel.iter_analysis().
+    """
+    patch_frame = PatchFrame.get(patches, frame)
+    bonds = find_bonds(patches, patch_frame, neighbor_list=neighbor_list)
+    labels, sizes = label_clusters(bonds, patch_frame.N)
+    return labels, cluster_size_histogram(sizes), np.flatnonzero(labels == 0)
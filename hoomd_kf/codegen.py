@@ -0,0 +1,93 @@
+"""
+This file contains functions that generate C++ code for the
+hoomd.hpmc.pair.user.CPPPotential pair kernel of a Patches object.
+The kernel is specialized to the patch set: patch loops are unrolled,
+the adjacency is baked in as a constant bitmask table, and cos_delta and
+lambda^2 are precomputed constants.
+See: https://hoomd-blue.readthedocs.io/en/latest/tutorial/07-Modelling-Patchy-Particles/02-Simulating-a-System-of-Patchy-Particles.html
+"""
+import numpy as np
+from hoomd_kf.energy import patch_arrays, pair_parameters
+
+MAX_PATCHES = 64
+# bump whenever the generated code changes, to invalidate cached kernels
+CODEGEN_VERSION = 1
+
+
+def float_literal(x):
+    """
+    Function that formats a number as a C++ float literal.
+    """
+    s = f"{float(x):.9g}"
+    if '.' not in s and 'e' not in s and 'n' not in s:
+        s += '.0'
+    return s + 'f'
+
+def vec_literal(v):
+    """
+    Function that formats a 3-vector as a C++ vec3<float>.
+    """
+    return f"vec3<float>({float_literal(v[0])}, {float_literal(v[1])}, {float_literal(v[2])})"
+
+def generate_cpp_code(patches):
+    """
+    Function that generates the body of the CPPPotential eval() function
+    for the given Patches object. Every particle carries all patches.
+    Returns None if the patch set cannot be encoded in a 64-bit mask.
+    """
+    arrays = patch_arrays(patches)
+    n_patch = len(arrays['kf_lambda'])
+    if n_patch > MAX_PATCHES:
+        print(f"ERROR: can't generate code for more than {MAX_PATCHES} patches.")
+        return None
+
+    lambda_ab, epsilon_ab = pair_parameters(arrays)
+    adjacency = arrays['adjacency']
+    r_cut_sq = np.max(arrays['kf_lambda']) ** 2
+
+    masks = [f"{int(mask):#x}ull" for mask in patches.arrays.get_bitset()[:, 0]]
+
+    lines = []
+    lines.append("// generated by hoomd_kf: Kern-Frenkel patches")
+    lines.append("const float rsq = dot(r_ij, r_ij);")
+    lines.append(f"if (rsq >= {float_literal(r_cut_sq)})")
+    lines.append("    return 0.0f;")
+    lines.append("")
+    lines.append("// bring the bond direction into each particle frame once,")
+    lines.append("// instead of rotating every patch vector")
+    lines.append("const vec3<float> r_hat = r_ij / sqrtf(rsq);")
+    lines.append("const vec3<float> r_i = rotate(conj(q_i), r_hat);")
+    lines.append("const vec3<float> r_j = rotate(conj(q_j), -r_hat);")
+    lines.append("")
+    lines.append("unsigned long long facing_i = 0;")
+    lines.append("unsigned long long facing_j = 0;")
+    for a in range(n_patch):
+        vec = vec_literal(arrays['vec'][a])
+        cos_delta = float_literal(arrays['cos_delta'][a])
+        lines.append(f"if (dot({vec}, r_i) >= {cos_delta}) facing_i |= {1 << a:#x}ull;")
+        lines.append(f"if (dot({vec}, r_j) >= {cos_delta}) facing_j |= {1 << a:#x}ull;")
+    lines.append("if (facing_i == 0 || facing_j == 0)")
+    lines.append("    return 0.0f;")
+    lines.append("")
+    lines.append(f"const unsigned long long adjacency[{n_patch}] = {{{', '.join(masks)}}};")
+    lines.append("float energy = 0.0f;")
+    for a in range(n_patch):
+        partners = np.flatnonzero(adjacency[a])
+        if len(partners) == 0:
+            continue
+        lines.append(f"if (facing_i & {1 << a:#x}ull)")
+        lines.append("    {")
+        lines.append(f"    const unsigned long long m = facing_j & adjacency[{a}];")
+        lines.append("    if (m)")
+        lines.append("        {")
+        for b in partners:
+            condition = f"m & {1 << int(b):#x}ull"
+            lambda_sq = lambda_ab[a, b] ** 2
+            if lambda_sq < r_cut_sq:
+                condition += f" && rsq < {float_literal(lambda_sq)}"
+            lines.append(f"        if ({condition}) energy -= {float_literal(epsilon_ab[a, b])};")
+        lines.append("        }")
+        lines.append("    }")
+    lines.append("return energy;")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,189 @@
+"""
+This file contains generators of crystal and chain initial states whose
+particle orientations match the patch geometry.
+
+The sites of a lattice are built from its cubic (or, for chains,
+tetragonal) unit cell. The orientation is the same for all sites of one
+basis position of the cell, so it is computed once per basis position
+and broadcast to all sites. For every basis position, all rotations that
+take two reference patches onto two nearest-neighbor bond directions are
+scored at once, and the one that points the most patches along bonds is
+kept. Bond directions that a neighbor already oriented can not bond back
+to are skipped, so that e.g. tetrahedral patches on a BCC lattice form
+mutual bonds.
+"""
+import numpy as np
+from hoomd_kf.utils import rotation_matrix_to_quaternion
+
+# fractional coordinates of the sites of the unit cell
+LATTICES = {'diamond': np.array([[0, 0, 0], [0, 0.5, 0.5], [0.5, 0, 0.5], [0.5, 0.5, 0],
+                                 [0.25, 0.25, 0.25], [0.25, 0.75, 0.75],
+                                 [0.75, 0.25, 0.75], [0.75, 0.75, 0.25]]),
+            'bcc': np.array([[0, 0, 0], [0.5, 0.5, 0.5]]),
+            'fcc': np.array([[0, 0, 0], [0, 0.5, 0.5], [0.5, 0, 0.5], [0.5, 0.5, 0]]),
+            'chain': np.array([[0, 0, 0]])}
+
+ALIGNMENT_TOLERANCE = 1e-6
+
+
+def get_lattice_cells(structure, num_particles, L, diameter=1.0):
+    """
+    Function that returns the number of unit cells along each axis and
+    the (3,) unit cell edges of a lattice of at least num_particles sites
+    in a cubic box of edge L. Chains run along z with consecutive sites
+    about a diameter apart; the other lattices have cubic cells.
+    """
+    n_basis = len(LATTICES[structure])
+    if structure == 'chain':
+        n_z = min(max(int(L // diameter), 1), num_particles)
+        K = int(np.ceil(np.sqrt(num_particles / n_z)))
+        counts = np.array([K, K, n_z])
+    else:
+        K = int(np.ceil((num_particles / n_basis) ** (1./3)))
+        counts = np.array([K, K, K])
+    return counts, L / counts
+
+def get_lattice_sites(structure, num_particles, L, counts, cell):
+    """
+    Function that returns the (N,3) positions of the first num_particles
+    sites of a lattice filling a cubic box of edge L centered at the
+    origin, and the (N,) basis position of every site.
+    """
+    basis = LATTICES[structure]
+    site = np.arange(num_particles, dtype=np.int64)
+    cell_index, basis_index = np.divmod(site, len(basis))
+    n_y, n_z = counts[1], counts[2]
+    cells = np.stack([cell_index // (n_y * n_z), (cell_index // n_z) % n_y, cell_index % n_z],
+                     axis=1)
+    positions = (cells + basis[basis_index]) * cell - L/2
+    return positions, basis_index
+
+def get_bond_directions(structure, cell):
+    """
+    Function that returns, for every basis position, the (n,3) unit
+    vectors to its nearest neighbors and the (n,) basis positions of
+    those neighbors, along with the nearest-neighbor distance.
+    """
+    basis = LATTICES[structure]
+    if structure == 'chain':
+        return [(np.array([[0., 0., 1.], [0., 0., -1.]]), np.zeros(2, dtype=np.int64))], cell[2]
+
+    offsets = np.stack(np.meshgrid(*[[-1, 0, 1]] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+    # (basis, neighbor basis, offset, 3) separation vectors
+    dr = (basis[None, :, None, :] + offsets[None, None, :, :] - basis[:, None, None, :]) * cell
+    r = np.linalg.norm(dr, axis=-1)
+    r_min = np.min(r[r > 0])
+
+    bonds = []
+    for b in range(len(basis)):
+        t, k = np.nonzero(np.abs(r[b] - r_min) < ALIGNMENT_TOLERANCE * r_min)
+        bonds.append((dr[b, t, k] / r[b, t, k, None], t))
+    return bonds, r_min
+
+def get_frames(first, second):
+    """
+    Function that returns the (n,3,3) orthonormal frames, as rows, built
+    from (n,3) unit vectors first and (n,3) vectors second. If second is
+    parallel to first, any perpendicular direction is used.
+    """
+    second = second - np.sum(second * first, axis=1, keepdims=True) * first
+    norm = np.linalg.norm(second, axis=1)
+    parallel = norm < ALIGNMENT_TOLERANCE
+    if np.any(parallel):
+        # the axis least aligned with first
+        axis = np.eye(3)[np.argmin(np.abs(first[parallel]), axis=1)]
+        second[parallel] = np.cross(first[parallel], axis)
+        norm[parallel] = np.linalg.norm(second[parallel], axis=1)
+    second = second / norm[:, None]
+    return np.stack([first, second, np.cross(first, second)], axis=1)
+
+def align_patches(vectors, directions):
+    """
+    Function that returns the rotation matrix that points the most patch
+    vectors along the given unit bond directions, and the number of
+    patch vectors that end up along a bond.
+
+    vectors -> (P,3) patch vectors in the particle frame
+    directions -> (n,3) unit bond directions
+    """
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    cross = np.linalg.norm(np.cross(vectors[0], vectors), axis=1)
+    second = np.flatnonzero(cross > ALIGNMENT_TOLERANCE)
+
+    # candidate images of the first (and second) reference patch
+    n = len(directions)
+    if len(second) == 0 or n < 2:
+        a = np.arange(n)
+        b = a
+        reference = vectors[[0, 0]]
+    else:
+        a, b = np.nonzero(~np.eye(n, dtype=bool))
+        reference = vectors[[0, second[0]]]
+
+    particle_frame = get_frames(reference[:1], reference[1:])[0]
+    bond_frames = get_frames(directions[a], directions[b])
+    rotations = np.einsum('cki,kj->cij', bond_frames, particle_frame)
+
+    # every patch counts the bond it is best aligned with
+    rotated = np.einsum('cij,pj->cpi', rotations, vectors)
+    best = np.max(np.einsum('cpi,ni->cpn', rotated, directions), axis=2)
+    c = np.argmax(np.sum(best, axis=1))
+    return rotations[c], int(np.sum(best[c] > 1 - ALIGNMENT_TOLERANCE))
+
+def get_basis_orientations(structure, vectors, bonds):
+    """
+    Function that returns the (n_basis,4) orientations of the basis
+    positions of a lattice, oriented one after the other, and the number
+    of patches pointing along a bond for each of them.
+    """
+    n_basis = len(LATTICES[structure])
+    rotations = [None] * n_basis
+    aligned = np.zeros(n_basis, dtype=np.int64)
+    for s, (directions, neighbors) in enumerate(bonds):
+        # skip bonds that an oriented neighbor has no patch for
+        allowed = np.ones(len(directions), dtype=bool)
+        for k, t in enumerate(neighbors):
+            if rotations[t] is not None:
+                patches_t = rotations[t] @ vectors.T
+                allowed[k] = np.max(-directions[k] @ patches_t) > 1 - ALIGNMENT_TOLERANCE
+        if not np.any(allowed):
+            allowed[:] = True
+        rotations[s], aligned[s] = align_patches(vectors, directions[allowed])
+    return rotation_matrix_to_quaternion(np.array(rotations)), aligned
+
+def generate_crystal(structure, num_particles, L, vectors=None, diameter=1.0):
+    """
+    Function that returns the (N,3) positions and (N,4) orientations of
+    num_particles particles on a diamond, bcc, fcc or chain lattice in a
+    cubic box of edge L centered at the origin, with the patch vectors
+    pointing along nearest-neighbor bonds as far as the patch geometry
+    allows. Returns None if the lattice sites would overlap.
+
+    vectors -> (P,3) patch vectors in the particle frame (None: identity
+               orientations)
+    """
+    if structure not in LATTICES:
+        print(f"ERROR: unknown lattice {structure}.")
+        return None
+
+    counts, cell = get_lattice_cells(structure, num_particles, L, diameter=diameter)
+    bonds, r_min = get_bond_directions(structure, cell)
+    r_min = min(r_min, np.min(cell[:2]))
+    if r_min < diameter:
+        print(f"ERROR: the sites of the {structure} lattice are {r_min} apart, "
+              f"closer than the diameter {diameter}.")
+        return None
+
+    positions, basis_index = get_lattice_sites(structure, num_particles, L, counts, cell)
+    if vectors is None or len(vectors) == 0:
+        orientations = np.zeros((num_particles, 4))
+        orientations[:, 0] = 1
+        return positions, orientations
+
+    vectors = np.asarray(vectors, dtype=np.float64)
+    quaternions, aligned = get_basis_orientations(structure, vectors, bonds)
+    expected = min(len(vectors), len(bonds[0][0]))
+    if np.any(aligned < expected):
+        print(f"WARNING: only {np.min(aligned)} of {len(vectors)} patches point along "
+              f"nearest-neighbor bonds of the {structure} lattice.")
+    return positions, quaternions[basis_index]
@@ -0,0 +1,183 @@
+"""
+This file contains a shared-memory domain decomposition of the energy
+and bond evaluation of single large frames.
+
+The positions, orientations and patch arrays are placed in shared memory
+once, and the box is split into slabs along x. Every worker process
+attaches to the shared arrays (nothing is pickled but their names),
+takes the particles of its slab plus a halo of width r_cut on both
+sides, and evaluates the pairs (i, j), i < j, whose particle i lies in
+the slab. Every pair is evaluated by exactly one slab with the same
+arithmetic as the serial engine, and the pairs are merged back into the
+serial (i, j) order before summing, so the results equal the serial ones
+exactly.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from hoomd_kf.energy import PatchFrame, pair_parameters, pair_energies, sum_pair_energies
+from hoomd_kf.energy import bonded_patch_pairs
+from hoomd_kf.jit import get_backend, jit_pair_energies, jit_find_bonds
+from hoomd_kf.neighbor import CellList, wrap_positions
+from hoomd_kf.utils import box_lengths, rotate_vectors
+
+
+def share_arrays(arrays):
+    """
+    Function that copies a dict of arrays into shared memory blocks.
+    Returns the blocks (to be closed and unlinked by the caller) and
+    a picklable dict of (name, shape, dtype) specs.
+    """
+    blocks = []
+    specs = {}
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        specs[key] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+def attach_arrays(specs):
+    """
+    Function that attaches to the shared memory blocks described by
+    specs. Returns the blocks (to be closed by the caller) and a dict
+    of arrays viewing them.
+    """
+    blocks = []
+    arrays = {}
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+def get_slab_particles(positions, box, n_slabs, slab, r_cut):
+    """
+    Function that returns the (sorted) indices of the particles of a
+    slab along x plus its halo, and a mask of those owned by the slab.
+    """
+    L = box_lengths(box)[0]
+    x = wrap_positions(positions, box)[:, 0]
+    width = L / n_slabs
+    owner = np.minimum(np.floor((x + L/2) / width).astype(np.int64), n_slabs - 1)
+
+    # x distance to the slab center, with the minimum-image convention
+    dx = x - (-L/2 + (slab + 0.5) * width)
+    dx -= L * np.round(dx / L)
+    local = np.flatnonzero((owner == slab) | (np.abs(dx) <= width/2 + r_cut))
+    return local, owner[local] == slab
+
+def evaluate_slab(specs, n_slabs, slab, r_cut, mode, backend, dtype):
+    """
+    Function that evaluates the pairs owned by one slab. Runs in the
+    workers. Returns (i, j, pair energies) if mode is 'energy', and the
+    (n, 4) bonds if mode is 'bonds', with global particle indices.
+    """
+    blocks, shared = attach_arrays(specs)
+    try:
+        positions = shared['position']
+        box = shared['box']
+        arrays = {key: shared[key] for key in ('vec', 'kf_lambda', 'cos_delta', 'epsilon',
+                                               'adjacency')}
+
+        local, owned = get_slab_particles(positions, box, n_slabs, slab, r_cut)
+        local_positions = positions[local]
+        directions = rotate_vectors(shared['orientation'][local], arrays['vec'])
+        directions = directions.astype(dtype, copy=False)
+
+        i, j = CellList(box, r_cut).pairs(local_positions, r_cut=r_cut)
+        keep = owned[i]
+        i, j = i[keep], j[keep]
+
+        lambda_ab, epsilon_ab = pair_parameters(arrays)
+        if mode == 'energy':
+            if backend == 'numba':
+                e_pair = jit_pair_energies(arrays, lambda_ab, epsilon_ab, local_positions, box,
+                                           i, j, directions)
+            else:
+                e_pair = pair_energies(arrays, local_positions, None, box, i, j,
+                                       directions=directions)
+            return local[i], local[j], e_pair
+
+        if backend == 'numba':
+            bonds = jit_find_bonds(arrays, lambda_ab, local_positions, box, i, j, directions)
+        else:
+            bonded = bonded_patch_pairs(arrays, local_positions, None, box, i, j,
+                                        directions=directions)
+            m, a, b = np.nonzero(bonded)
+            bonds = np.stack([i[m], a, j[m], b], axis=1).astype(np.int64)
+        bonds[:, 0] = local[bonds[:, 0]]
+        bonds[:, 2] = local[bonds[:, 2]]
+        return bonds
+    finally:
+        del shared
+        for block in blocks:
+            block.close()
+
+def run_slabs(patches, frame, mode, n_workers=None, n_slabs=None, backend=None):
+    """
+    Function that shares the frame data and evaluates all slabs in a
+    process pool. Returns the per-slab results and the PatchFrame.
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    if n_slabs is None:
+        n_slabs = n_workers
+    backend = get_backend(backend)
+
+    patch_frame = PatchFrame.get(patches, frame)
+    r_cut = np.max(patch_frame.arrays['kf_lambda'])
+    # fail early on boxes with tilt
+    box_lengths(patch_frame.box)
+
+    data = {'position': np.asarray(patch_frame.positions, dtype=np.float64),
+            'orientation': np.asarray(patch_frame.orientations),
+            'box': np.asarray(patch_frame.box, dtype=np.float64)}
+    data.update(patch_frame.arrays)
+
+    blocks, specs = share_arrays(data)
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(evaluate_slab, specs, n_slabs, slab, r_cut, mode, backend,
+                                       patch_frame.dtype)
+                       for slab in range(n_slabs)]
+            results = [future.result() for future in futures]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return results, patch_frame
+
+def compute_energy_parallel(patches, frame, n_workers=None, n_slabs=None, backend=None):
+    """
+    Function that computes the Kern-Frenkel energy of a frame like
+    energy.compute_energy(), with the pairs split over slabs evaluated
+    in n_workers processes. Returns the total energy and the (N,)
+    per-particle energies, equal to the serial results.
+
+    n_slabs -> number of slabs along x (default: n_workers)
+    backend -> 'numpy' (default) or 'numba'
+    """
+    results, patch_frame = run_slabs(patches, frame, 'energy', n_workers=n_workers,
+                                     n_slabs=n_slabs, backend=backend)
+    i = np.concatenate([result[0] for result in results])
+    j = np.concatenate([result[1] for result in results])
+    e_pair = np.concatenate([result[2] for result in results])
+
+    # back to the (i, j) order of the serial neighbor list
+    order = np.lexsort((j, i))
+    return sum_pair_energies(e_pair[order], i[order], j[order], patch_frame.N)
+
+def find_bonds_parallel(patches, frame, n_workers=None, n_slabs=None, backend=None):
+    """
+    Function that finds all bonds of a frame like bonds.find_bonds(),
+    with the pairs split over slabs evaluated in n_workers processes.
+    Returns the same (n_bonds, 4) array as the serial function.
+    """
+    results, _ = run_slabs(patches, frame, 'bonds', n_workers=n_workers,
+                           n_slabs=n_slabs, backend=backend)
+    bonds = np.concatenate(results)
+    order = np.lexsort((bonds[:, 3], bonds[:, 1], bonds[:, 2], bonds[:, 0]))
+    return bonds[order]
@@ -0,0 +1,201 @@
+"""
+This file contains a vectorized NumPy engine to evaluate the
+Kern-Frenkel patch energy of whole gsd frames.
+
+Two particles i and j, with patches a and b, are bonded if
+    - patches a and b interact (adjacency),
+    - r_ij < lambda_ab,
+    - n_a(i) . r_ij / r >= cos_delta_a,
+    - n_b(j) . r_ji / r >= cos_delta_b,
+in which case the pair contributes -epsilon_ab. For two different
+patches lambda_ab is the arithmetic mean and epsilon_ab the geometric
+mean of the individual values. Only the patch (attractive) part of the
+energy is computed; the hard core is left to the HPMC shape.
+"""
+import numpy as np
+from hoomd_kf.utils import rotate_vectors, minimum_image, get_orientations
+from hoomd_kf.neighbor import NeighborList
+from hoomd_kf.jit import get_backend, jit_pair_energies
+
+
+class PatchFrame:
+    """
+    A PatchFrame object holds the per-frame data shared by the
+    orientation-dependent analyses of a frame (energy, bonds, order
+    parameters): the patch arrays, positions, orientations and box, and
+    the (N,P,3) world-frame patch directions, which are computed once
+    on first use and then shared.
+    """
+
+    def __init__(self, patches, frame, dtype=np.float64):
+        """
+        Initialize the PatchFrame object.
+
+        patches -> Patches object carried by every particle
+        frame -> gsd.hoomd.Frame
+        dtype -> dtype of the patch directions (np.float32 halves their memory)
+        """
+        self.patches = patches
+        self.arrays = patch_arrays(patches)
+        self.positions = frame.particles.position
+        self.orientations = get_orientations(frame)
+        self.box = frame.configuration.box
+        self.N = frame.particles.N
+        self.dtype = dtype
+        self._directions = None
+
+    def __repr__(self):
+        """
+        __repr__ function for PatchFrame object.
+        """
+        return f"<PatchFrame object of {self.N} particles at {hex(id(self))}>"
+
+    @classmethod
+    def get(cls, patches, frame):
+        """
+        Function that returns frame if it already is a PatchFrame,
+        or a new PatchFrame otherwise.
+        """
+        if isinstance(frame, cls):
+            return frame
+        return cls(patches, frame)
+
+    @property
+    def directions(self):
+        """
+        (N,P,3) world-frame patch directions of every particle.
+        """
+        if self._directions is None:
+            directions = rotate_vectors(self.orientations, self.arrays['vec'])
+            self._directions = directions.astype(self.dtype, copy=False)
+        return self._directions
+
+
+def patch_arrays(patches):
+    """
+    Function that returns the patch parameters of a Patches object
+    as arrays. Returns a dict with (P,3) unit vec, (P,) kf_lambda,
+    cos_delta and epsilon (views into the Patches storage), and a
+    (P,P) boolean adjacency.
+    """
+    arrays = patches.arrays
+    for name in ('kf_lambda', 'cos_delta', 'epsilon'):
+        unset = np.flatnonzero(np.isnan(getattr(arrays, name)))
+        if len(unset) > 0:
+            raise ValueError(f"patch index {unset[0]} needs kf_lambda, an angular width and epsilon.")
+
+    vec = arrays.vec / np.linalg.norm(arrays.vec, axis=1)[:, None]
+
+    return {'vec': vec,
+            'kf_lambda': arrays.kf_lambda,
+            'cos_delta': arrays.cos_delta,
+            'epsilon': arrays.epsilon,
+            'adjacency': patches.get_adjacency_from_patch_info().astype(bool)}
+
+def pair_parameters(arrays):
+    """
+    Function that returns the (P,P) arrays of lambda_ab and epsilon_ab
+    (with non-interacting patch pairs zeroed out).
+    """
+    kf_lambda = arrays['kf_lambda']
+    epsilon = arrays['epsilon']
+    adjacency = arrays['adjacency']
+
+    lambda_ab = 0.5 * (kf_lambda[:, None] + kf_lambda[None, :])
+    epsilon_ab = np.sqrt(epsilon[:, None] * epsilon[None, :])
+
+    return np.where(adjacency, lambda_ab, 0), np.where(adjacency, epsilon_ab, 0)
+
+def bonded_patch_pairs(arrays, positions, orientations, box, i, j, directions=None):
+    """
+    Function that evaluates the Kern-Frenkel bonding criteria for the
+    given pairs (i, j) as array operations. Returns an (M,P,P) boolean
+    array, true where patch a of particle i[m] is bonded to patch b
+    of particle j[m].
+
+    directions -> optional (N,P,3) world-frame patch directions (see
+                  PatchFrame), used instead of rotating the patch vectors.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    n_patch = len(arrays['kf_lambda'])
+    if len(i) == 0:
+        return np.zeros((0, n_patch, n_patch), dtype=bool)
+
+    lambda_ab, _ = pair_parameters(arrays)
+
+    if directions is None:
+        # rotate patch vectors of the particles involved in one batched step
+        world_i = rotate_vectors(np.asarray(orientations)[i], arrays['vec'])
+        world_j = rotate_vectors(np.asarray(orientations)[j], arrays['vec'])
+    else:
+        world_i = directions[i]
+        world_j = directions[j]
+
+    dr = minimum_image(positions[j] - positions[i], box)
+    r = np.linalg.norm(dr, axis=1)
+    r_hat = (dr / r[:, None]).astype(world_i.dtype, copy=False)
+
+    cos_i = np.einsum('mpk,mk->mp', world_i, r_hat)
+    cos_j = -np.einsum('mpk,mk->mp', world_j, r_hat)
+
+    facing_i = cos_i >= arrays['cos_delta'][None, :]
+    facing_j = cos_j >= arrays['cos_delta'][None, :]
+
+    return (facing_i[:, :, None]
+            & facing_j[:, None, :]
+            & (r[:, None, None] < lambda_ab[None, :, :]))
+
+def pair_energies(arrays, positions, orientations, box, i, j, directions=None):
+    """
+    Function that evaluates the Kern-Frenkel energy of the given
+    pairs (i, j) as array operations. Returns an array of pair energies.
+    """
+    _, epsilon_ab = pair_parameters(arrays)
+    bonded = bonded_patch_pairs(arrays, positions, orientations, box, i, j,
+                                directions=directions)
+    # sum the bonded patch pairs of each pair in (a, b) order
+    m, a, b = np.nonzero(bonded)
+    return -np.bincount(m, weights=epsilon_ab[a, b], minlength=len(i))
+
+def compute_energy(patches, frame, neighbor_list=None, backend=None):
+    """
+    Function that computes the Kern-Frenkel energy of a gsd.hoomd.Frame
+    (or of a PatchFrame, whose patch directions are then reused), given
+    the Patches object carried by every particle.
+    Returns the total energy and an (N,) array of per-particle energies,
+    where each pair energy is split evenly between the two particles.
+
+    neighbor_list -> optional NeighborList, reused across calls (e.g. the
+                     frames of a trajectory) to skip unnecessary rebuilds.
+    backend -> 'numpy' (default) or 'numba' (see jit.py)
+    """
+    patch_frame = PatchFrame.get(patches, frame)
+    arrays = patch_frame.arrays
+    positions = patch_frame.positions
+    box = patch_frame.box
+
+    r_cut = np.max(arrays['kf_lambda'])
+    if neighbor_list is None:
+        neighbor_list = NeighborList(r_cut, skin=0)
+    i, j = neighbor_list.pairs(positions, box, r_cut=r_cut)
+    if get_backend(backend) == 'numba':
+        lambda_ab, epsilon_ab = pair_parameters(arrays)
+        e_pair = jit_pair_energies(arrays, lambda_ab, epsilon_ab, positions, box, i, j,
+                                   patch_frame.directions)
+    else:
+        e_pair = pair_energies(arrays, positions, patch_frame.orientations, box, i, j,
+                               directions=patch_frame.directions)
+
+    return sum_pair_energies(e_pair, i, j, patch_frame.N)
+
+def sum_pair_energies(e_pair, i, j, num_particles):
+    """
+    Function that returns the total energy and the (N,) per-particle
+    energies of the pairs (i, j), each pair energy being split evenly
+    between the two particles.
+    """
+    per_particle = np.zeros(num_particles, dtype=np.float64)
+    np.add.at(per_particle, i, 0.5 * e_pair)
+    np.add.at(per_particle, j, 0.5 * e_pair)
+
+    return e_pair.sum(), per_particle
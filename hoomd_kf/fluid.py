@@ -0,0 +1,141 @@
+"""
+This file contains a generator of disordered, overlap-free hard-sphere
+configurations, used as fluid initial states.
+
+Particles are first placed by random sequential insertion in a box
+diluted to a packing fraction that insertion reaches easily, with a
+cell grid so that each candidate is only tested against the particles
+of its neighbor cells. The box is then compressed to the target size
+in small steps (by inflating the spheres), and overlaps created by each
+step are removed by pushing every overlapping pair apart at once, until
+none are left.
+"""
+import numpy as np
+from hoomd_kf.neighbor import CellList, NeighborList, wrap_positions, expand_ranges
+from hoomd_kf.utils import minimum_image
+
+INSERTION_PACKING_FRACTION = 0.25
+
+
+def get_packing_fraction(num_particles, L, diameter=1.0):
+    """
+    Function that returns the packing fraction of num_particles spheres
+    in a cubic box of edge L.
+    """
+    return num_particles * np.pi / 6 * diameter ** 3 / L ** 3
+
+def get_box_length(num_particles, packing_fraction, diameter=1.0):
+    """
+    Function that returns the edge of the cubic box in which
+    num_particles spheres have the given packing fraction.
+    """
+    return (num_particles * np.pi / 6 * diameter ** 3 / packing_fraction) ** (1./3)
+
+def overlaps_existing(cell_list, positions, candidates, diameter):
+    """
+    Function that returns, for every candidate position, whether it
+    overlaps one of the positions binned in cell_list.
+    """
+    coords = cell_list.get_cell_coordinates(candidates)
+    overlap = np.zeros(len(candidates), dtype=bool)
+    for offset in cell_list.neighbor_offsets():
+        neighbor_cell = cell_list.flatten(coords + offset)
+        starts = cell_list.cell_start[neighbor_cell]
+        counts = cell_list.cell_start[neighbor_cell + 1] - starts
+        k = np.repeat(np.arange(len(candidates)), counts)
+        j = cell_list.cell_particles[expand_ranges(starts, counts)]
+        dr = minimum_image(positions[j] - candidates[k], cell_list.box)
+        close = np.einsum('ij,ij->i', dr, dr) < diameter ** 2
+        overlap[k[close]] = True
+    return overlap
+
+def insert_random(rng, num_particles, L, diameter=1.0, max_batches=100):
+    """
+    Function that places num_particles non-overlapping spheres in a
+    cubic box of edge L by random sequential insertion, in batches of
+    candidates tested against a cell grid. Returns the (N,3) positions,
+    or None if the box could not be filled.
+    """
+    box = [L, L, L, 0, 0, 0]
+    positions = np.zeros((0, 3))
+    for _ in range(max_batches):
+        n_missing = num_particles - len(positions)
+        if n_missing == 0:
+            return positions
+
+        # draw extra candidates, as some are rejected
+        n_candidates = max(4 * n_missing, 1024)
+        candidates = rng.uniform(-L/2, L/2, size=(n_candidates, 3))
+        if len(positions) > 0:
+            cell_list = CellList(box, diameter)
+            cell_list.build(positions)
+            candidates = candidates[~overlaps_existing(cell_list, positions, candidates, diameter)]
+
+        # of two overlapping candidates, the later one is dropped
+        _, j = CellList(box, diameter).pairs(candidates, r_cut=diameter)
+        keep = np.ones(len(candidates), dtype=bool)
+        keep[j] = False
+        positions = np.concatenate([positions, candidates[keep][:n_missing]])
+
+    print(f"ERROR: could not insert {num_particles} spheres in a box of edge {L}.")
+    return None
+
+def remove_overlaps(positions, L, diameter=1.0, neighbor_list=None, max_iterations=1000):
+    """
+    Function that pushes apart overlapping spheres until none overlap.
+    In every iteration, each overlapping pair is separated along its
+    axis by its overlap (plus a small margin), all pairs at once.
+    Returns the positions and whether all overlaps were removed.
+    """
+    box = [L, L, L, 0, 0, 0]
+    if neighbor_list is None:
+        neighbor_list = NeighborList(diameter, skin=0.3 * diameter)
+
+    for _ in range(max_iterations):
+        i, j = neighbor_list.pairs(positions, box, r_cut=diameter)
+        if len(i) == 0:
+            return positions, True
+
+        dr = minimum_image(positions[j] - positions[i], box)
+        r = np.linalg.norm(dr, axis=1)
+        r = np.maximum(r, 1e-12)
+        push = (0.5 * (1.01 * diameter - r) / r)[:, None] * dr
+
+        displacement = np.zeros_like(positions)
+        np.add.at(displacement, i, -push)
+        np.add.at(displacement, j, push)
+        positions = wrap_positions(positions + displacement, box)
+
+    return positions, False
+
+def generate_fluid(rng, num_particles, L, diameter=1.0, compression=0.98, tolerance=1e-4):
+    """
+    Function that returns (N,3) positions of num_particles non-overlapping
+    spheres in a cubic box of edge L, centered at the origin, or None if
+    the packing fraction could not be reached.
+
+    compression -> factor by which the box edge shrinks in every step
+    tolerance -> relative gap kept between spheres, so that the positions
+                 can be rounded to float32 without creating overlaps
+    """
+    diameter = diameter * (1 + tolerance)
+    L_insert = max(L, get_box_length(num_particles, INSERTION_PACKING_FRACTION, diameter))
+    positions = insert_random(rng, num_particles, L_insert, diameter=diameter)
+    if positions is None:
+        return None
+
+    # compressing the box is equivalent to inflating the spheres in the
+    # insertion box, which keeps the box (and the neighbor list) fixed
+    scale = L_insert / L
+    neighbor_list = NeighborList(diameter * scale, skin=0.3 * diameter)
+    current_diameter = diameter
+    while current_diameter < diameter * scale:
+        current_diameter = min(diameter * scale, current_diameter / compression)
+        positions, done = remove_overlaps(positions, L_insert, diameter=current_diameter,
+                                          neighbor_list=neighbor_list)
+        if not done:
+            print(f"ERROR: could not compress to a packing fraction of "
+                  f"{get_packing_fraction(num_particles, L, diameter)}.")
+            return None
+
+    return wrap_positions(positions / scale, [L, L, L, 0, 0, 0])
@@ -0,0 +1,175 @@
+"""
+Contains functions that arrange N patch vectors on the unit sphere as
+evenly as possible, by minimizing the Riesz energy sum_ij 1/r_ij^s of
+points on the sphere (s=1 is the Thomson problem; large s approaches the
+Tammes problem of maximizing the smallest angular separation).
+
+The optimization is warm-started from a Fibonacci sphere and its result
+is cached per (N, minimum angular separation), in memory and, if a cache
+directory is given, on disk, so it only runs once.
+"""
+import os
+import tempfile
+import numpy as np
+
+_GEOMETRY_CACHE = {}
+# part of the on-disk cache key, to be bumped whenever the optimizer
+# (or its parameters) changes so that stale geometries are not loaded
+GEOMETRY_VERSION = 1
+
+
+def default_geometry_dir():
+    """
+    Function that returns the default on-disk geometry cache:
+    the geometry/ subdirectory of kernel_cache.default_cache_dir().
+    """
+    # imported here, kernel_cache depends on utils through codegen and energy
+    from hoomd_kf.kernel_cache import default_cache_dir
+    return os.path.join(default_cache_dir(), "geometry")
+
+
+def fibonacci_sphere(n_points):
+    """
+    Function that returns n_points (n_points,3) unit vectors spread on
+    the sphere along a Fibonacci spiral.
+    """
+    golden_angle = np.pi * (3 - np.sqrt(5))
+    k = np.arange(n_points)
+    z = 1 - (2 * k + 1) / n_points
+    rho = np.sqrt(1 - z ** 2)
+    phi = golden_angle * k
+    return np.stack([rho * np.cos(phi), rho * np.sin(phi), z], axis=1)
+
+def get_min_angle(points):
+    """
+    Function that returns the smallest angle between any two of the
+    given unit vectors.
+    """
+    if len(points) < 2:
+        return np.pi
+    cos = points @ points.T
+    np.fill_diagonal(cos, -1)
+    return float(np.arccos(np.clip(cos.max(), -1, 1)))
+
+def riesz_relax(points, power=1.0, n_steps=10000, tol=1e-12):
+    """
+    Function that minimizes the Riesz energy of points on the unit
+    sphere by projected gradient descent with an adaptive step, until
+    no point moves by more than tol. All pair forces are evaluated at
+    once in each step.
+    """
+    points = points / np.linalg.norm(points, axis=1)[:, None]
+    n = len(points)
+    if n < 2:
+        return points
+
+    # distances are measured in units of the initial closest distance,
+    # which keeps r^-power finite for large powers
+    dr = points[:, None, :] - points[None, :, :]
+    r = np.linalg.norm(dr, axis=2)
+    np.fill_diagonal(r, np.inf)
+    scale = r.min()
+
+    def energy_and_force(x):
+        dr = (x[:, None, :] - x[None, :, :]) / scale
+        r = np.linalg.norm(dr, axis=2)
+        np.fill_diagonal(r, np.inf)
+        # a trial step that brings points too close overflows to inf
+        # (or nan) and is rejected
+        with np.errstate(over='ignore', invalid='ignore'):
+            energy = np.sum(r ** -power) / 2
+            force = np.einsum('ij,ijk->ik', power * r ** (-power - 2), dr)
+            # keep only the tangential component
+            force -= np.sum(force * x, axis=1)[:, None] * x
+        return energy, force
+
+    energy, force = energy_and_force(points)
+    step = 0.1 / n
+    for _ in range(n_steps):
+        trial = points + step * force
+        trial /= np.linalg.norm(trial, axis=1)[:, None]
+        trial_energy, trial_force = energy_and_force(trial)
+        if trial_energy <= energy:
+            points, energy, force = trial, trial_energy, trial_force
+            step *= 1.2
+            if step * np.max(np.abs(force)) < tol:
+                break
+        else:
+            step *= 0.5
+            if step * np.max(np.abs(force)) < tol:
+                break
+    return points
+
+def canonical_orientation(points):
+    """
+    Function that rotates the points so that the first one is along x
+    and the second one lies in the xz plane (z >= 0).
+    """
+    e1 = points[0]
+    if len(points) > 1:
+        # the first point that is not (anti)parallel to e1
+        cos = np.abs(points[1:] @ e1)
+        other = points[1 + np.argmin(cos)] if cos.min() < 1 - 1e-8 else None
+    else:
+        other = None
+    if other is None:
+        helper = np.eye(3)[np.argmin(np.abs(e1))]
+        other = helper
+    e3 = other - (other @ e1) * e1
+    e3 /= np.linalg.norm(e3)
+    e2 = np.cross(e3, e1)
+    rotated = points @ np.stack([e1, e2, e3], axis=1)
+    rotated[np.abs(rotated) < 1e-12] = 0
+    return rotated
+
+def optimize_patch_geometry(n_patches, min_angle=None, cache_dir=None):
+    """
+    Function that returns an (n_patches,3) array of evenly spread unit
+    vectors. If min_angle (radians) is given, the Riesz power is raised
+    until the smallest angular separation reaches min_angle; returns None
+    if that fails (e.g. the arrangement does not exist).
+
+    Results are cached per (n_patches, min_angle) in memory and, if
+    cache_dir is given, as .npy files in cache_dir (see
+    default_geometry_dir()), shared between jobs. A copy is returned.
+    """
+    key = (int(n_patches), None if min_angle is None else round(float(min_angle), 12))
+    if key in _GEOMETRY_CACHE:
+        return _GEOMETRY_CACHE[key].copy()
+
+    path = None
+    if cache_dir is not None:
+        angle_name = "any" if key[1] is None else f"{key[1]:.12f}"
+        path = os.path.join(cache_dir,
+                            f"geometry_v{GEOMETRY_VERSION}_{key[0]}_{angle_name}.npy")
+        if os.path.exists(path):
+            _GEOMETRY_CACHE[key] = np.load(path)
+            return _GEOMETRY_CACHE[key].copy()
+
+    points = fibonacci_sphere(n_patches)
+    power = 1.0
+    points = riesz_relax(points, power=power)
+    if min_angle is not None:
+        # approach the Tammes problem by sharpening the repulsion
+        while get_min_angle(points) < min_angle - 1e-6 and power < 1024:
+            power *= 2
+            points = riesz_relax(points, power=power)
+        if get_min_angle(points) < min_angle - 1e-6:
+            print(f"ERROR: could not place {n_patches} patches at least "
+                  f"{min_angle} radians apart.")
+            return None
+
+    points = canonical_orientation(points)
+    _GEOMETRY_CACHE[key] = points
+
+    if path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".tmp-", suffix=".npy")
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, points)
+            os.replace(tmp_path, path)
+        except OSError as error:
+            print(f"WARNING: could not cache the patch geometry in {cache_dir}: {error}")
+
+    return points.copy()
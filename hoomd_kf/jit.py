@@ -0,0 +1,148 @@
+"""
+This file contains an optional numba backend for the Kern-Frenkel pair
+evaluation of energy.py and bonds.py. The kernels are fused loops over
+the neighbor pairs that test the bonding criteria patch by patch, so
+no (M,P,P) temporaries are created, and they perform the same floating
+point operations in the same order as the NumPy engine, so the results
+are identical.
+
+numba is optional: if it is not installed, the NumPy engine is used.
+"""
+import numpy as np
+from hoomd_kf.utils import box_lengths
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ('numpy', 'numba')
+
+_warned = False
+
+
+def get_backend(backend=None):
+    """
+    Function that resolves the name of a backend: 'numpy' (default) or
+    'numba', which falls back to 'numpy' if numba is not installed.
+    """
+    global _warned
+
+    if backend is None:
+        backend = 'numpy'
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend}, choose from {BACKENDS}.")
+    if backend == 'numba' and numba is None:
+        if not _warned:
+            print("WARNING: numba is not installed, using the numpy backend.")
+            _warned = True
+        return 'numpy'
+    return backend
+
+
+if numba is not None:
+    @numba.njit(cache=False)
+    def _get_facing(positions, directions, L, i, j, cos_delta, r_max, r_hat,
+                    facing_i, facing_j):
+        """
+        Function that fills facing_i and facing_j with whether each patch
+        of i (j) points towards j (i) for the pair (i, j), and returns
+        the pair distance, or -1 if it is beyond r_max.
+        """
+        dr = np.empty(3)
+        for k in range(3):
+            d = positions[j, k] - positions[i, k]
+            dr[k] = d - L[k] * np.rint(d / L[k])
+        r = np.sqrt(dr[0] * dr[0] + dr[1] * dr[1] + dr[2] * dr[2])
+        if r >= r_max:
+            return -1.0
+
+        for k in range(3):
+            r_hat[k] = dr[k] / r
+        for a in range(directions.shape[1]):
+            cos_i = (directions[i, a, 0] * r_hat[0] + directions[i, a, 1] * r_hat[1]
+                     + directions[i, a, 2] * r_hat[2])
+            cos_j = -(directions[j, a, 0] * r_hat[0] + directions[j, a, 1] * r_hat[1]
+                      + directions[j, a, 2] * r_hat[2])
+            facing_i[a] = cos_i >= cos_delta[a]
+            facing_j[a] = cos_j >= cos_delta[a]
+        return r
+
+    @numba.njit(cache=False)
+    def _pair_energies(positions, directions, L, i, j, cos_delta, lambda_ab, epsilon_ab,
+                       r_max):
+        """
+        Kernel of jit_pair_energies().
+        """
+        n_patch = directions.shape[1]
+        r_hat = np.empty(3, dtype=directions.dtype)
+        facing_i = np.empty(n_patch, dtype=np.bool_)
+        facing_j = np.empty(n_patch, dtype=np.bool_)
+        e_pair = np.empty(len(i))
+
+        for m in range(len(i)):
+            r = _get_facing(positions, directions, L, i[m], j[m], cos_delta, r_max, r_hat,
+                            facing_i, facing_j)
+            e = 0.0
+            if r >= 0:
+                for a in range(n_patch):
+                    if facing_i[a]:
+                        for b in range(n_patch):
+                            if facing_j[b] and r < lambda_ab[a, b]:
+                                e += epsilon_ab[a, b]
+            e_pair[m] = -e
+        return e_pair
+
+    @numba.njit(cache=False)
+    def _find_bonds(positions, directions, L, i, j, cos_delta, lambda_ab, r_max):
+        """
+        Kernel of jit_find_bonds(). The bonds are counted in a first pass
+        and written in a second one, so only the output is allocated.
+        """
+        n_patch = directions.shape[1]
+        r_hat = np.empty(3, dtype=directions.dtype)
+        facing_i = np.empty(n_patch, dtype=np.bool_)
+        facing_j = np.empty(n_patch, dtype=np.bool_)
+
+        bonds = np.empty((0, 4), dtype=np.int64)
+        for write in (False, True):
+            n = 0
+            for m in range(len(i)):
+                r = _get_facing(positions, directions, L, i[m], j[m], cos_delta, r_max,
+                                r_hat, facing_i, facing_j)
+                if r < 0:
+                    continue
+                for a in range(n_patch):
+                    if facing_i[a]:
+                        for b in range(n_patch):
+                            if facing_j[b] and r < lambda_ab[a, b]:
+                                if write:
+                                    bonds[n, 0] = i[m]
+                                    bonds[n, 1] = a
+                                    bonds[n, 2] = j[m]
+                                    bonds[n, 3] = b
+                                n += 1
+            if not write:
+                bonds = np.empty((n, 4), dtype=np.int64)
+        return bonds
+
+
+def jit_pair_energies(arrays, lambda_ab, epsilon_ab, positions, box, i, j, directions):
+    """
+    Function that returns the Kern-Frenkel energies of the pairs (i, j),
+    like energy.pair_energies(), using the numba kernel.
+    """
+    return _pair_energies(np.asarray(positions, dtype=np.float64), directions,
+                          box_lengths(box), np.asarray(i, dtype=np.int64),
+                          np.asarray(j, dtype=np.int64), arrays['cos_delta'], lambda_ab,
+                          epsilon_ab, float(np.max(lambda_ab, initial=0)))
+
+def jit_find_bonds(arrays, lambda_ab, positions, box, i, j, directions):
+    """
+    Function that returns the (n_bonds, 4) bonds among the pairs (i, j),
+    like bonds.find_bonds(), using the numba kernel.
+    """
+    return _find_bonds(np.asarray(positions, dtype=np.float64), directions,
+                       box_lengths(box), np.asarray(i, dtype=np.int64),
+                       np.asarray(j, dtype=np.int64), arrays['cos_delta'], lambda_ab,
+                       float(np.max(lambda_ab, initial=0)))
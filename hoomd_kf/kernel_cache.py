@@ -0,0 +1,195 @@
+"""
+This file contains the KernelCache class: an on-disk cache for generated
+pair-kernel source and compiled artifacts, keyed by the content hash of
+a Patches object (see Patches.content_hash()).
+
+Every entry is a directory <cache_dir>/<key>/ holding one file per
+artifact. Files are written to a temporary name and moved into place
+with os.replace(), so readers never see partial files, and eviction is
+serialized between processes with a lock file. Entries are evicted in
+least-recently-used order once the cache grows beyond max_bytes.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from hoomd_kf.codegen import CODEGEN_VERSION, generate_cpp_code
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SOURCE_NAME = "kernel.cpp"
+LOCK_NAME = ".lock"
+
+
+def default_cache_dir():
+    """
+    Function that returns the default cache directory:
+    $HOOMD_KF_CACHE_DIR, or ~/.cache/hoomd_kf.
+    """
+    if "HOOMD_KF_CACHE_DIR" in os.environ:
+        return os.environ["HOOMD_KF_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "hoomd_kf")
+
+
+class KernelCache:
+    """
+    A KernelCache object stores kernel source and compiled artifacts
+    on disk, keyed by Patches content hash.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=256 * 1024 ** 2):
+        """
+        Initialize the KernelCache object.
+
+        cache_dir -> directory of the cache (default: default_cache_dir())
+        max_bytes -> size above which least recently used entries are evicted
+        """
+        if cache_dir is None:
+            cache_dir = default_cache_dir()
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __repr__(self):
+        """
+        __repr__ function for KernelCache object.
+        """
+        return f"<KernelCache object at {self.cache_dir}>"
+
+    @contextmanager
+    def lock(self):
+        """
+        Context manager that holds an exclusive, inter-process lock on
+        the cache directory. A no-op where fcntl is unavailable.
+        """
+        with open(os.path.join(self.cache_dir, LOCK_NAME), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def get_path(self, key, name):
+        """
+        Function that returns the path of an artifact in the cache.
+        """
+        return os.path.join(self.cache_dir, key, name)
+
+    def load(self, key, name):
+        """
+        Function that returns the bytes of a cached artifact,
+        or None if it is not in the cache.
+        """
+        path = self.get_path(key, name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        # mark the entry as recently used
+        try:
+            os.utime(os.path.join(self.cache_dir, key))
+        except FileNotFoundError:
+            pass
+        return data
+
+    def store(self, key, name, data):
+        """
+        Function that atomically writes an artifact to the cache
+        and evicts old entries if the cache is too large.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        # under the lock, so that evict() in another process can't
+        # remove the entry while it is written
+        with self.lock():
+            os.makedirs(entry, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=entry, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.get_path(key, name))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            os.utime(entry)
+
+        self.evict(keep=key)
+
+    def get_size(self):
+        """
+        Function that returns the total size of the cache in bytes.
+        """
+        return sum(size for _, _, size in self.list_entries())
+
+    def list_entries(self):
+        """
+        Function that returns (key, last_used, size) for all cache entries.
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, key)
+            if not os.path.isdir(entry):
+                continue
+            try:
+                last_used = os.stat(entry).st_mtime
+                size = sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+            except FileNotFoundError:
+                # removed by another process meanwhile
+                continue
+            entries.append((key, last_used, size))
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Function that removes least recently used entries until the
+        cache is no larger than max_bytes. The entry keep is never removed.
+        """
+        with self.lock():
+            entries = sorted(self.list_entries(), key=lambda entry: entry[1])
+            total = sum(size for _, _, size in entries)
+            for key, _, size in entries:
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        """
+        Function that removes all entries from the cache.
+        """
+        with self.lock():
+            for key, _, _ in self.list_entries():
+                shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+    def get_key(self, patches):
+        """
+        Function that returns the cache key of a Patches object.
+        The code generator version is part of the key so that stale
+        kernels are not reused after the generator changes.
+        """
+        return f"{patches.content_hash()}-v{CODEGEN_VERSION}"
+
+    def get_source(self, patches):
+        """
+        Function that returns the kernel source for a Patches object,
+        generating and storing it on a cache miss.
+        """
+        key = self.get_key(patches)
+        data = self.load(key, SOURCE_NAME)
+        if data is not None:
+            return data.decode()
+
+        code = generate_cpp_code(patches)
+        if code is not None:
+            self.store(key, SOURCE_NAME, code.encode())
+        return code
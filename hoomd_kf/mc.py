@@ -0,0 +1,553 @@
+"""
+This file contains the MonteCarlo class, a self-contained HPMC-style
+reference Monte Carlo engine for Kern-Frenkel patchy spheres that does
+not need hoomd. Particles are hard spheres of unit diameter that carry
+all the patches of a Patches object.
+
+Every trial move only evaluates the energy of the moved particle with
+its neighbors, found from a cell list that is updated as particles move.
+"""
+import numpy as np
+import gsd.hoomd
+from hoomd_kf.energy import patch_arrays, pair_parameters, bonded_patch_pairs
+from hoomd_kf.neighbor import CellList, wrap_positions, flatten_cells, expand_ranges
+from hoomd_kf.neighbor import get_neighbor_cell_table
+from hoomd_kf.utils import box_lengths, get_orientations, quaternion_multiply, rotate_vectors
+
+
+def random_rotations(rng, n, max_angle):
+    """
+    Function that returns n random rotation quaternions about uniformly
+    distributed axes, by angles uniform in [-max_angle, max_angle].
+    The distribution is symmetric, as detailed balance requires.
+    """
+    axis = rng.normal(size=(n, 3))
+    axis /= np.linalg.norm(axis, axis=1)[:, None]
+    angle = rng.uniform(-max_angle, max_angle, size=n)
+    return np.concatenate([np.cos(angle/2)[:, None],
+                           np.sin(angle/2)[:, None] * axis], axis=1)
+
+
+class MonteCarlo:
+    """
+    A MonteCarlo object runs NVT translation and rotation moves on a
+    configuration of Kern-Frenkel particles.
+    """
+
+    def __init__(self,
+                 patches,
+                 frame,
+                 kT=1.0,
+                 d=0.1,
+                 a=0.1,
+                 translation_fraction=0.5,
+                 diameter=1.0,
+                 max_cluster_size=None,
+                 seed=None):
+        """
+        Initialize the MonteCarlo object.
+
+        patches -> Patches object carried by every particle
+        frame -> gsd.hoomd.Frame with the initial configuration
+        kT -> temperature
+        d -> maximum displacement of translation moves
+        a -> maximum angle of rotation moves
+        translation_fraction -> fraction of moves that are translations
+        diameter -> hard sphere diameter
+        max_cluster_size -> largest cluster moved by cluster moves (default: N/2)
+        seed -> seed of the random number generator
+        """
+        self.patches = patches
+        self.arrays = patch_arrays(patches)
+        self.lambda_ab, self.epsilon_ab = pair_parameters(self.arrays)
+        self.kT = kT
+        self.d = d
+        self.a = a
+        self.translation_fraction = translation_fraction
+        self.diameter = diameter
+        self.max_cluster_size = max_cluster_size
+        self.rng = np.random.default_rng(seed)
+
+        self.box = np.array(frame.configuration.box, dtype=np.float64)
+        self.L = box_lengths(self.box)
+        self.positions = wrap_positions(frame.particles.position, self.box)
+        self.orientations = np.array(get_orientations(frame), dtype=np.float64)
+        self.typeid = frame.particles.typeid
+        self.types = frame.particles.types
+        self.N = frame.particles.N
+
+        self.r_cut = max(np.max(self.arrays['kf_lambda']), diameter)
+        self.cell_list = CellList(self.box, self.r_cut)
+        self.build_cells()
+
+        self.energy = self.get_total_energy()
+        self.n_attempted = {'translate': 0, 'rotate': 0, 'cluster': 0}
+        self.n_accepted = {'translate': 0, 'rotate': 0, 'cluster': 0}
+        if self.max_cluster_size is None:
+            self.max_cluster_size = max(self.N // 2, 1)
+
+    @classmethod
+    def from_system(cls, system, **kwargs):
+        """
+        Function that creates a MonteCarlo object from a PatchySystem
+        whose initial configuration has been generated.
+        """
+        return cls(system.patches, system.snapshot, **kwargs)
+
+    def __repr__(self):
+        """
+        __repr__ function for MonteCarlo object.
+        """
+        return f"<MonteCarlo object with {self.N} particles at {hex(id(self))}>"
+
+    def build_cells(self):
+        """
+        Function that fills the cell membership table: members[c] holds
+        the particles of cell c, padded with -1.
+        """
+        cell_list = self.cell_list
+        self.cell_of = cell_list.flatten(cell_list.get_cell_coordinates(self.positions))
+        counts = np.bincount(self.cell_of, minlength=cell_list.n_cells)
+        capacity = max(int(counts.max(initial=0)), 1) * 2
+
+        self.members = np.full((cell_list.n_cells, capacity), -1, dtype=np.int64)
+        self.cell_count = np.zeros(cell_list.n_cells, dtype=np.int64)
+        self.slot_of = np.zeros(self.N, dtype=np.int64)
+        order = np.argsort(self.cell_of, kind='stable')
+        starts = np.cumsum(counts) - counts
+        slots = np.arange(self.N) - np.repeat(starts, counts)
+        self.members[self.cell_of[order], slots] = order
+        self.slot_of[order] = slots
+        self.cell_count[:] = counts
+
+        self.neighbor_cells = get_neighbor_cell_table(cell_list.dims)
+
+    def move_to_cell(self, i, cell):
+        """
+        Function that moves particle i to the given cell in the
+        membership table.
+        """
+        old = self.cell_of[i]
+        if old == cell:
+            return
+
+        # swap i with the last member of its old cell
+        last_slot = self.cell_count[old] - 1
+        last = self.members[old, last_slot]
+        self.members[old, self.slot_of[i]] = last
+        self.slot_of[last] = self.slot_of[i]
+        self.members[old, last_slot] = -1
+        self.cell_count[old] -= 1
+
+        if self.cell_count[cell] == self.members.shape[1]:
+            grown = np.full((len(self.members), 2 * self.members.shape[1]), -1, dtype=np.int64)
+            grown[:, :self.members.shape[1]] = self.members
+            self.members = grown
+        self.members[cell, self.cell_count[cell]] = i
+        self.slot_of[i] = self.cell_count[cell]
+        self.cell_count[cell] += 1
+        self.cell_of[i] = cell
+
+    def get_cell(self, position):
+        """
+        Function that returns the cell of a single wrapped position.
+        """
+        dims = self.cell_list.dims
+        coords = np.floor((position + self.L/2) / self.L * dims).astype(np.int64) % dims
+        return (coords[0] * dims[1] + coords[1]) * dims[2] + coords[2]
+
+    def get_neighbors(self, i, position):
+        """
+        Function that returns the particles in the cells around position,
+        excluding particle i.
+        """
+        candidates = self.members[self.neighbor_cells[self.get_cell(position)]].ravel()
+        return candidates[(candidates >= 0) & (candidates != i)]
+
+    def get_particle_energy(self, i, position, orientation):
+        """
+        Function that returns the energy of particle i if it were at
+        position with orientation, given all other particles. Returns
+        np.inf on a hard sphere overlap.
+        """
+        neighbors = self.get_neighbors(i, position)
+        dr = self.positions[neighbors] - position
+        dr -= self.L * np.round(dr / self.L)
+        r_sq = np.einsum('ij,ij->i', dr, dr)
+        if np.any(r_sq < self.diameter ** 2):
+            return np.inf
+
+        close = neighbors[r_sq < self.r_cut ** 2]
+        if len(close) == 0:
+            return 0.0
+
+        positions = np.concatenate([position[None, :], self.positions[close]])
+        orientations = np.concatenate([orientation[None, :], self.orientations[close]])
+        i_pair = np.zeros(len(close), dtype=np.int64)
+        j_pair = np.arange(1, len(close) + 1)
+        bonded = bonded_patch_pairs(self.arrays, positions, orientations, self.box, i_pair, j_pair)
+        return -np.einsum('mab,ab->', bonded, self.epsilon_ab)
+
+    def get_total_energy(self):
+        """
+        Function that returns the total patch energy, computed from scratch.
+        """
+        i, j = self.cell_list.pairs(self.positions, r_cut=self.r_cut)
+        bonded = bonded_patch_pairs(self.arrays, self.positions, self.orientations, self.box, i, j)
+        return -np.einsum('mab,ab->', bonded, self.epsilon_ab)
+
+    def trial_move(self):
+        """
+        Function that attempts one translation or rotation move of a
+        random particle. Returns True if the move was accepted.
+        """
+        i = self.rng.integers(self.N)
+        position = self.positions[i]
+        orientation = self.orientations[i]
+
+        if self.rng.random() < self.translation_fraction:
+            move = 'translate'
+            new_position = position + self.rng.uniform(-self.d, self.d, size=3)
+            new_position -= self.L * np.floor((new_position + self.L/2) / self.L)
+            new_orientation = orientation
+        else:
+            move = 'rotate'
+            new_position = position
+            new_orientation = quaternion_multiply(random_rotations(self.rng, 1, self.a)[0],
+                                                  orientation)
+            new_orientation /= np.linalg.norm(new_orientation)
+        self.n_attempted[move] += 1
+
+        new_energy = self.get_particle_energy(i, new_position, new_orientation)
+        if new_energy == np.inf:
+            return False
+        delta_energy = new_energy - self.get_particle_energy(i, position, orientation)
+
+        if delta_energy > 0 and self.rng.random() >= np.exp(-delta_energy / self.kT):
+            return False
+
+        self.positions[i] = new_position
+        self.orientations[i] = new_orientation
+        if move == 'translate':
+            self.move_to_cell(i, self.get_cell(new_position))
+        self.energy += delta_energy
+        self.n_accepted[move] += 1
+        return True
+
+    def sweep(self):
+        """
+        Function that attempts N trial moves.
+        """
+        for _ in range(self.N):
+            self.trial_move()
+
+    def get_checkerboard_dims(self):
+        """
+        Function that returns the cell grid of checkerboard sweeps: the
+        largest even number of cells per dimension with edge >= r_cut.
+        """
+        dims = np.floor(self.L / self.r_cut).astype(np.int64)
+        dims -= dims % 2
+        if np.any(dims < 2):
+            raise ValueError("the box is too small for checkerboard sweeps.")
+        return dims
+
+    def checkerboard_sweep(self, n_steps=None):
+        """
+        Function that performs one sweep of batched moves, as in the
+        checkerboard scheme of hoomd's HPMC. The box is divided into an
+        even grid of cells of edge >= r_cut, shifted by a random offset,
+        and the cells are split into 8 checkerboard sets. Cells within a
+        set are not adjacent, and moves that would take a particle out of
+        its cell are rejected, so particles moved in different cells of a
+        set never interact and one particle per cell is moved at a time,
+        all as array operations.
+
+        n_steps -> number of moves per cell in each set
+                   (default: the mean cell occupancy, so ~N moves per sweep)
+        """
+        dims = self.get_checkerboard_dims()
+        width = self.L / dims
+        n_cells = int(np.prod(dims))
+        if n_steps is None:
+            n_steps = max(int(round(self.N / n_cells)), 1)
+
+        # random grid shift, to make the scheme ergodic
+        shift = self.rng.uniform(0, width)
+        coords = self.get_shifted_cell_coordinates(self.positions, shift, width, dims)
+        cell = flatten_cells(coords, dims)
+        order = np.argsort(cell, kind='stable')
+        counts = np.bincount(cell, minlength=n_cells)
+        starts = np.cumsum(counts) - counts
+        neighbor_cells = get_neighbor_cell_table(dims)
+
+        cell_coords = np.stack(np.unravel_index(np.arange(n_cells), tuple(dims)), axis=1)
+        cell_set = (cell_coords % 2) @ np.array([4, 2, 1])
+
+        for set_id in self.rng.permutation(8):
+            active = np.flatnonzero((cell_set == set_id) & (counts > 0))
+            if len(active) == 0:
+                continue
+            for _ in range(n_steps):
+                self.batched_moves(active, order, starts, counts, neighbor_cells,
+                                   shift, width, dims)
+
+        # particles moved within the shifted grid: refresh the cell table
+        self.build_cells()
+
+    def get_shifted_cell_coordinates(self, positions, shift, width, dims):
+        """
+        Function that returns the (n,3) cell coordinates of positions in
+        a grid of cells of the given width, shifted by shift.
+        """
+        wrapped = (positions + self.L/2 - shift) % self.L
+        return np.floor(wrapped / width).astype(np.int64) % dims
+
+    def batched_moves(self, active, order, starts, counts, neighbor_cells, shift, width, dims):
+        """
+        Function that attempts one move of a random particle in each of
+        the given (mutually non-adjacent) cells, as array operations.
+        """
+        n_active = len(active)
+        particles = order[starts[active] + self.rng.integers(counts[active])]
+        positions = self.positions[particles]
+        orientations = self.orientations[particles]
+
+        translate = self.rng.random(n_active) < self.translation_fraction
+        self.n_attempted['translate'] += int(np.sum(translate))
+        self.n_attempted['rotate'] += int(np.sum(~translate))
+
+        new_positions = positions.copy()
+        displacement = self.rng.uniform(-self.d, self.d, size=(n_active, 3))
+        new_positions[translate] += displacement[translate]
+        new_positions -= self.L * np.floor((new_positions + self.L/2) / self.L)
+
+        new_orientations = orientations.copy()
+        rotations = random_rotations(self.rng, n_active, self.a)
+        rotated = quaternion_multiply(rotations[~translate], orientations[~translate])
+        new_orientations[~translate] = rotated / np.linalg.norm(rotated, axis=1)[:, None]
+
+        # moves must stay within the active cell
+        new_coords = self.get_shifted_cell_coordinates(new_positions, shift, width, dims)
+        allowed = flatten_cells(new_coords, dims) == active
+
+        # neighbors of every moved particle
+        cells = neighbor_cells[active].ravel()
+        owner = np.repeat(np.arange(n_active), neighbor_cells.shape[1])
+        k = np.repeat(owner, counts[cells])
+        j = order[expand_ranges(starts[cells], counts[cells])]
+        keep = j != particles[k]
+        k, j = k[keep], j[keep]
+
+        # hard sphere overlaps of the new positions
+        dr = self.positions[j] - new_positions[k]
+        dr -= self.L * np.round(dr / self.L)
+        overlap = np.zeros(n_active, dtype=bool)
+        overlap[k[np.einsum('ij,ij->i', dr, dr) < self.diameter ** 2]] = True
+        allowed &= ~overlap
+
+        # energy change of every moved particle; the trial states are
+        # appended after the N current ones
+        all_positions = np.concatenate([self.positions, new_positions])
+        all_orientations = np.concatenate([self.orientations, new_orientations])
+        delta_energy = (self.get_batch_energy(all_positions, all_orientations,
+                                              self.N + k, j, k, n_active)
+                        - self.get_batch_energy(all_positions, all_orientations,
+                                                particles[k], j, k, n_active))
+
+        boltzmann = np.exp(-np.maximum(delta_energy, 0) / self.kT)
+        accept = allowed & (self.rng.random(n_active) < boltzmann)
+
+        moved = particles[accept]
+        self.positions[moved] = new_positions[accept]
+        self.orientations[moved] = new_orientations[accept]
+        self.energy += np.sum(delta_energy[accept])
+        self.n_accepted['translate'] += int(np.sum(accept & translate))
+        self.n_accepted['rotate'] += int(np.sum(accept & ~translate))
+
+    def get_batch_energy(self, positions, orientations, i, j, k, n_active):
+        """
+        Function that sums the pair energies of pairs (i, j) into the
+        moved particle k each pair belongs to.
+        """
+        dr = positions[j] - positions[i]
+        dr -= self.L * np.round(dr / self.L)
+        close = np.einsum('ij,ij->i', dr, dr) < self.r_cut ** 2
+        i, j, k = i[close], j[close], k[close]
+
+        bonded = bonded_patch_pairs(self.arrays, positions, orientations, self.box, i, j)
+        e_pair = -np.einsum('mab,ab->m', bonded, self.epsilon_ab)
+        return np.bincount(k, weights=e_pair, minlength=n_active)
+
+    def get_pair_energies(self, positions, orientations, j):
+        """
+        Function that returns the pair energies of particles at the given
+        positions and orientations with particles j (one pair per row).
+        """
+        n = len(j)
+        all_positions = np.concatenate([positions, self.positions[j]])
+        all_orientations = np.concatenate([orientations, self.orientations[j]])
+        bonded = bonded_patch_pairs(self.arrays, all_positions, all_orientations, self.box,
+                                    np.arange(n), np.arange(n, 2 * n))
+        return -np.einsum('mab,ab->m', bonded, self.epsilon_ab)
+
+    def get_boundary(self, cluster, in_cluster, positions, orientations):
+        """
+        Function that returns, for cluster members at the given positions
+        and orientations, whether they overlap with any non-member, and
+        the energies of their pairs with non-members within r_cut.
+        """
+        dims = self.cell_list.dims
+        coords = np.floor((positions + self.L/2) / self.L * dims).astype(np.int64) % dims
+        cells = self.neighbor_cells[flatten_cells(coords, dims)]
+        candidates = self.members[cells].reshape(len(cluster), -1)
+        k, slot = np.nonzero(candidates >= 0)
+        j = candidates[k, slot]
+        outside = ~in_cluster[j]
+        k, j = k[outside], j[outside]
+
+        dr = self.positions[j] - positions[k]
+        dr -= self.L * np.round(dr / self.L)
+        r_sq = np.einsum('ij,ij->i', dr, dr)
+        if np.any(r_sq < self.diameter ** 2):
+            return True, None
+        close = r_sq < self.r_cut ** 2
+        k, j = k[close], j[close]
+        return False, self.get_pair_energies(positions[k], orientations[k], j)
+
+    def build_cluster(self, seed):
+        """
+        Function that grows a cluster from particle seed. Every pair of a
+        member with a non-member is linked with probability
+        max(0, 1 - exp(E_ij / kT)), E_ij being the pair energy, so that
+        strongly bonded particles move together. Returns the members and
+        their positions unwrapped around the seed, or None if the cluster
+        grows beyond max_cluster_size.
+        """
+        in_cluster = np.zeros(self.N, dtype=bool)
+        in_cluster[seed] = True
+        cluster = [seed]
+        unwrapped = {seed: self.positions[seed]}
+        frontier = [seed]
+
+        while frontier:
+            m = frontier.pop()
+            neighbors = self.get_neighbors(m, self.positions[m])
+            neighbors = neighbors[~in_cluster[neighbors]]
+            if len(neighbors) == 0:
+                continue
+            dr = self.positions[neighbors] - self.positions[m]
+            dr -= self.L * np.round(dr / self.L)
+            close = np.einsum('ij,ij->i', dr, dr) < self.r_cut ** 2
+            neighbors, dr = neighbors[close], dr[close]
+            if len(neighbors) == 0:
+                continue
+
+            n = len(neighbors)
+            e_pair = self.get_pair_energies(np.repeat(self.positions[m][None, :], n, axis=0),
+                                            np.repeat(self.orientations[m][None, :], n, axis=0),
+                                            neighbors)
+            p_link = 1 - np.exp(np.minimum(e_pair, 0) / self.kT)
+            linked = self.rng.random(n) < p_link
+            for new, shift in zip(neighbors[linked], dr[linked]):
+                in_cluster[new] = True
+                cluster.append(new)
+                unwrapped[new] = unwrapped[m] + shift
+                frontier.append(new)
+            if len(cluster) > self.max_cluster_size:
+                return None, None, None
+
+        cluster = np.array(cluster, dtype=np.int64)
+        return cluster, in_cluster, np.array([unwrapped[m] for m in cluster])
+
+    def cluster_move(self):
+        """
+        Function that attempts a rigid translation or rotation of a
+        cluster of bonded particles. With the link probabilities of
+        build_cluster(), the link and Boltzmann factors of attractive
+        boundary pairs cancel, and the move is accepted with probability
+        min(1, exp(-dE+ / kT)), dE+ being the change in the repulsive
+        (positive) part of the boundary pair energies; overlapping moves
+        are rejected. Returns True if the move was accepted.
+        """
+        self.n_attempted['cluster'] += 1
+        cluster, in_cluster, unwrapped = self.build_cluster(self.rng.integers(self.N))
+        if cluster is None:
+            return False
+
+        orientations = self.orientations[cluster]
+        if self.rng.random() < self.translation_fraction:
+            new_unwrapped = unwrapped + self.rng.uniform(-self.d, self.d, size=3)
+            new_orientations = orientations
+        else:
+            rotation = random_rotations(self.rng, 1, self.a)
+            center = unwrapped.mean(axis=0)
+            new_unwrapped = center + rotate_vectors(rotation, unwrapped - center)[0]
+            new_orientations = quaternion_multiply(rotation, orientations)
+            new_orientations /= np.linalg.norm(new_orientations, axis=1)[:, None]
+
+        # internal pairs are only preserved if the cluster does not wrap around the box
+        for positions in (unwrapped, new_unwrapped):
+            if np.any(np.ptp(positions, axis=0) >= self.L/2):
+                return False
+
+        new_positions = new_unwrapped - self.L * np.floor((new_unwrapped + self.L/2) / self.L)
+        overlap, new_energies = self.get_boundary(cluster, in_cluster, new_positions,
+                                                  new_orientations)
+        if overlap:
+            return False
+        _, old_energies = self.get_boundary(cluster, in_cluster, self.positions[cluster],
+                                            orientations)
+
+        delta_repulsive = np.sum(np.maximum(new_energies, 0)) - np.sum(np.maximum(old_energies, 0))
+        if delta_repulsive > 0 and self.rng.random() >= np.exp(-delta_repulsive / self.kT):
+            return False
+
+        self.positions[cluster] = new_positions
+        self.orientations[cluster] = new_orientations
+        for i, position in zip(cluster, new_positions):
+            self.move_to_cell(i, self.get_cell(position))
+        self.energy += np.sum(new_energies) - np.sum(old_energies)
+        self.n_accepted['cluster'] += 1
+        return True
+
+    def run(self, n_sweeps, checkerboard=False, cluster_moves=0):
+        """
+        Function that runs n_sweeps sweeps, of single moves or of
+        batched checkerboard moves, each followed by cluster_moves
+        cluster moves.
+        """
+        for _ in range(n_sweeps):
+            if checkerboard:
+                self.checkerboard_sweep()
+            else:
+                self.sweep()
+            for _ in range(cluster_moves):
+                self.cluster_move()
+
+    def get_acceptance(self):
+        """
+        Function that returns the acceptance ratio of each move type.
+        """
+        return {move: self.n_accepted[move] / max(self.n_attempted[move], 1)
+                for move in self.n_attempted}
+
+    def get_overlaps(self):
+        """
+        Function that returns the number of overlapping pairs.
+        """
+        i, _ = self.cell_list.pairs(self.positions, r_cut=self.diameter)
+        return len(i)
+
+    def get_frame(self):
+        """
+        Function that returns the current configuration as a gsd.hoomd.Frame.
+        """
+        frame = gsd.hoomd.Frame()
+        frame.particles.N = self.N
+        frame.particles.position = self.positions.astype(np.float32)
+        frame.particles.orientation = self.orientations.astype(np.float32)
+        frame.particles.types = self.types
+        frame.particles.typeid = self.typeid
+        frame.configuration.box = self.box
+        return frame
@@ -0,0 +1,252 @@
+"""
+This file contains the CellList and NeighborList classes used for
+O(N) pair searches in periodic (orthorhombic) boxes.
+Both structures are stored as flat arrays.
+"""
+import numpy as np
+from hoomd_kf.utils import box_lengths, minimum_image
+
+
+def wrap_positions(positions, box):
+    """
+    Function that wraps positions into the box [-L/2, L/2).
+    """
+    L = box_lengths(box)
+    positions = np.asarray(positions, dtype=np.float64)
+    return positions - L * np.floor((positions + L/2) / L)
+
+def flatten_cells(coords, dims):
+    """
+    Function that converts (n,3) cell coordinates to flat cell indices
+    of a periodic grid with the given dims.
+    """
+    coords = coords % dims
+    return (coords[:, 0] * dims[1] + coords[:, 1]) * dims[2] + coords[:, 2]
+
+def get_neighbor_offsets(dims):
+    """
+    Function that returns the unique (n,3) cell offsets to visit.
+    Along dimensions with fewer than 3 cells, periodic images would
+    be visited twice, so duplicate offsets are removed.
+    """
+    per_dim = [np.unique(np.array([-1, 0, 1]) % d) for d in dims]
+    grid = np.meshgrid(*per_dim, indexing='ij')
+    return np.stack([g.ravel() for g in grid], axis=1)
+
+def get_neighbor_cell_table(dims):
+    """
+    Function that returns an (n_cells, n_offsets) array with the
+    neighbor cells (including itself) of every cell of a periodic grid.
+    """
+    n_cells = int(np.prod(dims))
+    coords = np.stack(np.unravel_index(np.arange(n_cells), tuple(dims)), axis=1)
+    return np.stack([flatten_cells(coords + offset, dims) for offset in get_neighbor_offsets(dims)],
+                    axis=1)
+
+def expand_ranges(starts, counts):
+    """
+    Function that concatenates range(start, start + count) for all
+    given starts and counts, without a Python loop.
+    """
+    total = counts.sum()
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + np.arange(total) - offsets
+
+
+class CellList:
+    """
+    A CellList object bins particles into cells of edge >= r_cut.
+    Particles are stored sorted by cell (cell_particles), with
+    cell_start[c]:cell_start[c+1] giving the particles of cell c.
+    """
+
+    def __init__(self, box, r_cut):
+        """
+        Initialize the CellList object.
+
+        box -> gsd box [Lx, Ly, Lz, xy, xz, yz]
+        r_cut -> minimum cell edge length
+        """
+        self.box = np.array(box, dtype=np.float64)
+        self.r_cut = r_cut
+        L = box_lengths(self.box)
+        self.dims = np.maximum(np.floor(L / r_cut).astype(np.int64), 1)
+        self.n_cells = int(np.prod(self.dims))
+
+        self.cell_index = None
+        self.cell_particles = None
+        self.cell_start = None
+
+    def __repr__(self):
+        """
+        __repr__ function for CellList object.
+        """
+        return f"<CellList object with {tuple(self.dims)} cells at {hex(id(self))}>"
+
+    def get_cell_coordinates(self, positions):
+        """
+        Function that returns the (N,3) integer cell coordinates of positions.
+        """
+        L = box_lengths(self.box)
+        positions = wrap_positions(positions, self.box)
+        coords = np.floor((positions + L/2) / L * self.dims).astype(np.int64)
+        # guard against round-off at the upper box edge
+        return coords % self.dims
+
+    def flatten(self, coords):
+        """
+        Function that converts (N,3) cell coordinates to flat cell indices.
+        """
+        return flatten_cells(coords, self.dims)
+
+    def build(self, positions):
+        """
+        Function that bins the given positions.
+        """
+        self.cell_index = self.flatten(self.get_cell_coordinates(positions))
+        self.cell_particles = np.argsort(self.cell_index, kind='stable')
+        counts = np.bincount(self.cell_index, minlength=self.n_cells)
+        self.cell_start = np.zeros(self.n_cells + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.cell_start[1:])
+
+    def neighbor_offsets(self):
+        """
+        Function that returns the unique (n,3) cell offsets to visit.
+        """
+        return get_neighbor_offsets(self.dims)
+
+    def candidate_pairs(self, positions):
+        """
+        Function that returns candidate (i, j) pairs with i < j whose
+        cells are neighbors. Call build() first.
+        """
+        coords = self.get_cell_coordinates(positions)
+        all_i, all_j = [], []
+        for offset in self.neighbor_offsets():
+            neighbor_cell = self.flatten(coords + offset)
+            starts = self.cell_start[neighbor_cell]
+            counts = self.cell_start[neighbor_cell + 1] - starts
+            i = np.repeat(np.arange(len(coords)), counts)
+            j = self.cell_particles[expand_ranges(starts, counts)]
+            keep = j > i
+            all_i.append(i[keep])
+            all_j.append(j[keep])
+
+        return np.concatenate(all_i), np.concatenate(all_j)
+
+    def pairs(self, positions, r_cut=None):
+        """
+        Function that returns all (i, j) pairs with i < j and
+        minimum-image distance below r_cut (default: the cell list cutoff).
+        """
+        if r_cut is None:
+            r_cut = self.r_cut
+        assert r_cut <= self.r_cut
+
+        positions = np.asarray(positions, dtype=np.float64)
+        self.build(positions)
+        i, j = self.candidate_pairs(positions)
+        dr = minimum_image(positions[j] - positions[i], self.box)
+        keep = np.einsum('ij,ij->i', dr, dr) < r_cut ** 2
+        return i[keep], j[keep]
+
+
+class NeighborList:
+    """
+    A NeighborList object holds a Verlet (half) neighbor list with
+    cutoff r_cut + skin. The list is only rebuilt once some particle
+    has moved further than skin/2 since the last build.
+    """
+
+    def __init__(self, r_cut, skin=0.3):
+        """
+        Initialize the NeighborList object.
+
+        r_cut -> interaction cutoff
+        skin -> extra buffer distance that allows skipping rebuilds
+        """
+        self.r_cut = r_cut
+        self.skin = skin
+
+        self.pair_i = None
+        self.pair_j = None
+        self.offsets = None
+
+        self.box = None
+        self.reference_positions = None
+        self.n_builds = 0
+
+    @classmethod
+    def from_patches(cls, patches, skin=0.3):
+        """
+        Function that creates a NeighborList with cutoff equal to the
+        maximum kf_lambda across the given Patches object.
+        """
+        return cls(patches.get_r_cut(), skin=skin)
+
+    def __repr__(self):
+        """
+        __repr__ function for NeighborList object.
+        """
+        n_pairs = 0 if self.pair_i is None else len(self.pair_i)
+        return f"<NeighborList object with {n_pairs} pairs at {hex(id(self))}>"
+
+    def needs_rebuild(self, positions, box):
+        """
+        Function that checks whether the list has to be rebuilt.
+        """
+        if self.reference_positions is None:
+            return True
+        if len(positions) != len(self.reference_positions):
+            return True
+        if not np.array_equal(np.asarray(box, dtype=np.float64), self.box):
+            return True
+
+        dr = minimum_image(np.asarray(positions, dtype=np.float64) - self.reference_positions, box)
+        max_disp_sq = np.max(np.einsum('ij,ij->i', dr, dr), initial=0)
+        return max_disp_sq > (self.skin / 2) ** 2
+
+    def build(self, positions, box):
+        """
+        Function that (re)builds the Verlet list from a cell list.
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        cell_list = CellList(box, self.r_cut + self.skin)
+        i, j = cell_list.pairs(positions)
+
+        order = np.lexsort((j, i))
+        self.pair_i = i[order]
+        self.pair_j = j[order]
+        self.offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.pair_i, minlength=len(positions)), out=self.offsets[1:])
+
+        self.box = np.array(box, dtype=np.float64)
+        self.reference_positions = positions.copy()
+        self.n_builds += 1
+
+    def update(self, positions, box):
+        """
+        Function that rebuilds the list if needed. Returns True if rebuilt.
+        """
+        if self.needs_rebuild(positions, box):
+            self.build(positions, box)
+            return True
+        return False
+
+    def pairs(self, positions, box, r_cut=None):
+        """
+        Function that returns all (i, j) pairs with i < j and
+        minimum-image distance below r_cut (default: the list cutoff),
+        updating the list first if needed.
+        """
+        if r_cut is None:
+            r_cut = self.r_cut
+        assert r_cut <= self.r_cut + self.skin
+
+        positions = np.asarray(positions, dtype=np.float64)
+        self.update(positions, box)
+        dr = minimum_image(positions[self.pair_j] - positions[self.pair_i], box)
+        keep = np.einsum('ij,ij->i', dr, dr) < r_cut ** 2
+        return self.pair_i[keep], self.pair_j[keep]
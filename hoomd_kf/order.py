@@ -0,0 +1,45 @@
+"""
+This file contains orientational order parameters of gsd frames of
+patchy particles. They accept a gsd.hoomd.Frame or a PatchFrame, so
+the world-frame patch directions can be shared with the energy and
+bond computations of the same frame.
+"""
+import numpy as np
+from hoomd_kf.energy import PatchFrame
+from hoomd_kf.bonds import find_bonds
+
+
+def nematic_order(patches, frame, patch=0):
+    """
+    Function that returns the nematic order parameter S of the direction
+    of one patch over all particles, and the director, from the largest
+    eigenvalue of Q = <3/2 u u - 1/2 I>.
+    """
+    patch_frame = PatchFrame.get(patches, frame)
+    u = patch_frame.directions[:, patch, :].astype(np.float64)
+    Q = 1.5 * np.einsum('ni,nj->ij', u, u) / len(u) - 0.5 * np.eye(3)
+    values, vectors = np.linalg.eigh(Q)
+    return float(values[-1]), vectors[:, -1]
+
+def bonded_fraction(patches, frame, neighbor_list=None):
+    """
+    Function that returns the fraction of all patches that are bonded.
+    A patch with several bonds (possible for wide patches) counts once.
+    """
+    patch_frame = PatchFrame.get(patches, frame)
+    bonds = find_bonds(patches, patch_frame, neighbor_list=neighbor_list)
+    n_patches = patch_frame.N * len(patches)
+    if n_patches == 0:
+        return 0.
+    # unique (particle, patch) pairs on either end of a bond
+    bonded = np.concatenate([bonds[:, :2], bonds[:, 2:]])
+    return len(np.unique(bonded, axis=0)) / n_patches
+
+def analyze_order(patches, frame, neighbor_list=None):
+    """
+    Function that returns (S, bonded fraction) of a frame, rotating the
+    patch vectors only once. Can be used with parallel.iter_analysis().
+    """
+    patch_frame = PatchFrame.get(patches, frame)
+    S, _ = nematic_order(patches, patch_frame)
+    return S, bonded_fraction(patches, patch_frame, neighbor_list=neighbor_list)
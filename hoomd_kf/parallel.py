@@ -0,0 +1,78 @@
+"""
+This file contains a driver to run per-frame analyses of gsd
+trajectories in a process pool. The trajectory is split into chunks of
+consecutive frames, every worker opens the gsd file on its own, and
+results are yielded in frame order.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import gsd.hoomd
+
+
+def get_num_frames(file_name):
+    """
+    Function that returns the number of frames in a gsd file.
+    """
+    with gsd.hoomd.open(name=file_name, mode='rb') as f:
+        return len(f)
+
+def get_chunks(start, stop, chunk_size):
+    """
+    Function that splits the frame range [start, stop) into
+    (start, stop) chunks of at most chunk_size frames.
+    """
+    return [(i, min(i + chunk_size, stop)) for i in range(start, stop, chunk_size)]
+
+def analyze_chunk(file_name, patches, analysis, start, stop):
+    """
+    Function that runs analysis(patches, frame) on frames [start, stop)
+    of a gsd file and returns the list of results. Runs in the workers.
+    """
+    with gsd.hoomd.open(name=file_name, mode='rb') as f:
+        return [analysis(patches, f[i]) for i in range(start, stop)]
+
+def iter_analysis(file_name,
+                  patches,
+                  analysis,
+                  n_workers=None,
+                  chunk_size=16,
+                  max_in_flight=None,
+                  start=0,
+                  stop=None):
+    """
+    Generator that runs analysis(patches, frame) on every frame of a gsd
+    file in a process pool and yields the results in frame order.
+
+    analysis -> picklable (module-level) function of (patches, frame),
+                e.g. energy.compute_energy or bonds.find_bonds
+    n_workers -> number of processes (default: os.cpu_count())
+    chunk_size -> number of consecutive frames handed to a worker at once
+    max_in_flight -> maximum number of chunks submitted but not yet
+                     yielded, which bounds memory (default: 2 * n_workers)
+    start, stop -> range of frames to analyze
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    if max_in_flight is None:
+        max_in_flight = 2 * n_workers
+    if stop is None:
+        stop = get_num_frames(file_name)
+
+    chunks = deque(get_chunks(start, stop, chunk_size))
+    in_flight = deque()
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        while chunks or in_flight:
+            while chunks and len(in_flight) < max_in_flight:
+                chunk_start, chunk_stop = chunks.popleft()
+                in_flight.append(executor.submit(analyze_chunk, file_name, patches,
+                                                 analysis, chunk_start, chunk_stop))
+            for result in in_flight.popleft().result():
+                yield result
+
+def analyze_trajectory(file_name, patches, analysis, **kwargs):
+    """
+    Function that returns the list of per-frame results of iter_analysis().
+    """
+    return list(iter_analysis(file_name, patches, analysis, **kwargs))
@@ -1,14 +1,389 @@
 """
-This file holds the Patch class and related methods.
+This file holds the Patch class and related methods, as well as the
+PatchArrays class that stores the parameters of a set of patches
+as contiguous arrays.
 """
+import copy
 import numpy as np
 
+
+COLUMNS = ('vec', 'kf_lambda', 'cos_delta', 'delta', 'epsilon', 'patch_type')
+
+
+def _column(name):
+    """
+    Function that creates a property exposing the first P rows of the
+    buffer of one parameter column of a PatchArrays object.
+    """
+    def getter(self):
+        return self._buffers[name][:self._size]
+
+    def setter(self, value):
+        value = np.asarray(value)
+        self._buffers[name] = value
+        self._size = len(value)
+
+    return property(getter, setter)
+
+
+def _grow(buffer, length, n_used):
+    """
+    Function that returns buffer if it holds at least length rows, or
+    else a new buffer, at least twice as long, with its first n_used rows.
+    """
+    if len(buffer) >= length:
+        return buffer
+    new = np.empty((max(length, 2 * len(buffer)),) + buffer.shape[1:], dtype=buffer.dtype)
+    new[:n_used] = buffer[:n_used]
+    return new
+
+
+class PatchArrays:
+    """
+    A PatchArrays object holds the parameters of P patches as a
+    struct of arrays:
+        vec -> (P,3) patch vectors
+        kf_lambda, cos_delta, delta, epsilon -> (P,) floats, NaN if unset
+        patch_type -> (P,) ints, -1 if unset
+        indptr, indices -> interaction lists in CSR form, i.e. patch i
+                           interacts with indices[indptr[i]:indptr[i+1]]
+
+    The arrays are views into buffers with spare capacity, which grow
+    geometrically so that appending patches one at a time is cheap.
+    Assigning an array to an attribute replaces its buffer.
+    """
+
+    def __init__(self, n_patches=0):
+        """
+        Initialize the PatchArrays object with n_patches unset patches.
+        """
+        self._buffers = {}
+        vec = np.zeros((n_patches, 3), dtype=np.float64)
+        vec[:, 0] = 1
+        self.vec = vec
+        self.kf_lambda = np.full(n_patches, np.nan)
+        self.cos_delta = np.full(n_patches, np.nan)
+        self.delta = np.full(n_patches, np.nan)
+        self.epsilon = np.full(n_patches, np.nan)
+        self.patch_type = np.full(n_patches, -1, dtype=np.int64)
+        self.indptr = np.zeros(n_patches + 1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        """
+        Function to return the number of patches.
+        """
+        return self._size
+
+    vec = _column('vec')
+    kf_lambda = _column('kf_lambda')
+    cos_delta = _column('cos_delta')
+    delta = _column('delta')
+    epsilon = _column('epsilon')
+    patch_type = _column('patch_type')
+
+    @property
+    def indptr(self):
+        return self._indptr[:self._size + 1]
+
+    @indptr.setter
+    def indptr(self, value):
+        self._indptr = np.asarray(value, dtype=np.int64)
+
+    @property
+    def indices(self):
+        return self._indices[:self._nnz]
+
+    @indices.setter
+    def indices(self, value):
+        self._indices = np.asarray(value, dtype=np.int64)
+        self._nnz = len(self._indices)
+
+    def __repr__(self):
+        """
+        __repr__ function for PatchArrays object.
+        """
+        return f"<PatchArrays object of size {len(self)} at {hex(id(self))}>"
+
+    def reserve(self, n_patches, n_indices):
+        """
+        Function that grows the buffers (at least doubling them) so that
+        they hold n_patches patches and n_indices interaction indices.
+        """
+        for name in COLUMNS:
+            self._buffers[name] = _grow(self._buffers[name], n_patches, self._size)
+        self._indptr = _grow(self._indptr, n_patches + 1, self._size + 1)
+        self._indices = _grow(self._indices, n_indices, self._nnz)
+
+    def append(self, other):
+        """
+        Function that appends the patches of another PatchArrays object
+        in place. Interaction indices are copied unchanged.
+        """
+        n, k = len(self), len(other)
+        nnz, m = self._nnz, len(other.indices)
+        self.reserve(n + k, nnz + m)
+        for name in COLUMNS:
+            self._buffers[name][n:n + k] = getattr(other, name)
+        self._indptr[n + 1:n + k + 1] = other.indptr[1:] + self._indptr[n]
+        self._indices[nnz:nnz + m] = other.indices
+        self._size = n + k
+        self._nnz = nnz + m
+
+    @classmethod
+    def from_patches(cls, list_of_patches):
+        """
+        Function that gathers a list of Patch objects into a new
+        PatchArrays object.
+        """
+        for i, patch in enumerate(list_of_patches):
+            if not isinstance(patch, Patch):
+                raise TypeError(f"patch index {i} is not a Patch object.")
+
+        arrays = cls(0)
+        if len(list_of_patches) == 0:
+            return arrays
+
+        rows = [patch._arrays.take([patch._index]) for patch in list_of_patches]
+        return cls.concatenate(rows, shift_indices=False)
+
+    @classmethod
+    def concatenate(cls, list_of_arrays, shift_indices=True):
+        """
+        Function that concatenates PatchArrays objects. If shift_indices,
+        the interaction indices of each block are offset by the number of
+        patches before it, so each block keeps its internal interactions.
+        """
+        arrays = cls(0)
+        for name in COLUMNS:
+            setattr(arrays, name, np.concatenate([getattr(a, name) for a in list_of_arrays]))
+
+        sizes = np.array([len(a) for a in list_of_arrays], dtype=np.int64)
+        nnz = np.array([len(a.indices) for a in list_of_arrays], dtype=np.int64)
+        patch_offsets = np.cumsum(sizes) - sizes
+        nnz_offsets = np.cumsum(nnz) - nnz
+
+        arrays.indptr = np.concatenate([[0]] + [a.indptr[1:] + off
+                                                for a, off in zip(list_of_arrays, nnz_offsets)])
+        if shift_indices:
+            arrays.indices = np.concatenate([a.indices + off
+                                             for a, off in zip(list_of_arrays, patch_offsets)])
+        else:
+            arrays.indices = np.concatenate([a.indices for a in list_of_arrays])
+        return arrays
+
+    def take(self, rows):
+        """
+        Function that returns a new PatchArrays object holding the given
+        rows, which can be a slice, integer indices or a boolean mask.
+        With a slice, the parameter columns are views that share memory
+        with this object; otherwise they are copies. Interaction indices
+        are copied unchanged.
+        """
+        if isinstance(rows, slice):
+            columns = rows
+            rows = np.arange(*rows.indices(len(self)), dtype=np.int64)
+        else:
+            rows = self.get_row_indices(rows)
+            columns = rows
+
+        arrays = PatchArrays(0)
+        for name in COLUMNS:
+            setattr(arrays, name, getattr(self, name)[columns])
+
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        arrays.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(counts, out=arrays.indptr[1:])
+        offsets = np.repeat(arrays.indptr[:-1] - starts, counts)
+        arrays.indices = self.indices[np.arange(arrays.indptr[-1]) - offsets]
+        return arrays
+
+    def get_row_indices(self, rows):
+        """
+        Function that converts integer indices (negative ones counting
+        from the end) or a boolean mask to an array of row indices.
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            if rows.shape != (len(self),):
+                raise IndexError(f"boolean mask of shape {rows.shape} does not match "
+                                 f"{len(self)} patches")
+            return np.flatnonzero(rows)
+
+        rows = rows.astype(np.int64, copy=False).reshape(-1)
+        if np.any((rows < -len(self)) | (rows >= len(self))):
+            raise IndexError("patch index out of range")
+        return rows % max(len(self), 1)
+
+    def get_interacts_with(self, i):
+        """
+        Function that returns the interaction list of patch i.
+        """
+        return self.indices[self.indptr[i]:self.indptr[i+1]]
+
+    def set_interacts_with(self, i, interacts_with):
+        """
+        Function that replaces the interaction list of patch i.
+        """
+        new = np.asarray(interacts_with, dtype=np.int64).reshape(-1)
+        start, stop = self.indptr[i], self.indptr[i+1]
+        self.indices = np.concatenate([self.indices[:start], new, self.indices[stop:]])
+        self.indptr[i+1:] += len(new) - (stop - start)
+
+    def set_csr(self, indptr, indices):
+        """
+        Function that replaces all interaction lists at once.
+        """
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+    def get_bitset(self):
+        """
+        Function that returns the interactions as a (P, ceil(P/64))
+        uint64 bitset: bit b % 64 of word b // 64 in row a is set if
+        patch a interacts with patch b.
+        """
+        n_words = max((len(self) + 63) // 64, 1)
+        bitset = np.zeros((len(self), n_words), dtype=np.uint64)
+        bits = np.left_shift(np.uint64(1), (self.indices % 64).astype(np.uint64))
+        np.bitwise_or.at(bitset, (self.get_rows(), self.indices // 64), bits)
+        return bitset
+
+    def interacts(self, a, b):
+        """
+        Function that checks (elementwise) whether patches a and b interact,
+        using binary search over the (row, index) entries.
+        """
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        a, b = np.broadcast_arrays(a, b)
+        # key every entry by row so that one search covers all rows
+        n = max(len(self), 1)
+        keys = np.sort(self.get_rows() * n + self.indices)
+        query = a * n + b
+        if len(keys) == 0:
+            return np.zeros(query.shape, dtype=bool)
+        pos = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        return keys[pos] == query
+
+    def get_rows(self):
+        """
+        Function that returns, for every entry of indices, the patch
+        (row) it belongs to.
+        """
+        return np.repeat(np.arange(len(self)), np.diff(self.indptr))
+
+
+class WriteThroughList(list):
+    """
+    A WriteThroughList is a list returned by a getter that hands its new
+    contents to an update function after every in-place change, so that
+    e.g. patch.interacts_with.append(5) changes the underlying arrays.
+    If the update function returns a list, it replaces the contents.
+    """
+
+    def __init__(self, values, update):
+        super().__init__(values)
+        self._update = update
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(list(self), memo)
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+    def _changed(self):
+        values = self._update(list(self))
+        if values is not None:
+            super().__setitem__(slice(None), values)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __iadd__(self, values):
+        super().__iadd__(values)
+        self._changed()
+        return self
+
+    def __imul__(self, n):
+        super().__imul__(n)
+        self._changed()
+        return self
+
+    def append(self, value):
+        super().append(value)
+        self._changed()
+
+    def extend(self, values):
+        super().extend(values)
+        self._changed()
+
+    def insert(self, i, value):
+        super().insert(i, value)
+        self._changed()
+
+    def remove(self, value):
+        super().remove(value)
+        self._changed()
+
+    def pop(self, i=-1):
+        value = super().pop(i)
+        self._changed()
+        return value
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *, key=None, reverse=False):
+        super().sort(key=key, reverse=reverse)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+
+def _field(name, doc):
+    """
+    Function that creates a property exposing one scalar column of
+    the PatchArrays object behind a Patch. NaN is exposed as None.
+    """
+    def getter(self):
+        value = getattr(self._arrays, name)[self._index]
+        if np.isnan(value):
+            return None
+        return float(value)
+
+    def setter(self, value):
+        getattr(self._arrays, name)[self._index] = np.nan if value is None else value
+
+    return property(getter, setter, doc=doc)
+
+
 class Patch:
     """
     Patch object contains parameters and interaction information
     for a patch of the Kern-Frenkel model.
+
+    A Patch is a lightweight view into one row of a PatchArrays object.
+    Patches created on their own own a single-row PatchArrays, while the
+    patches of a Patches object are views into its arrays. Those views
+    follow the arrays of the Patches object as it grows, and raise a
+    RuntimeError once its patches are replaced or reordered.
     """
 
+    __slots__ = ('_view_arrays', '_index', '_owner', '_layout')
+
     def __init__(self,
                  kf_lambda=None,
                  cos_delta=None,
@@ -25,8 +400,13 @@ class Patch:
         delta -> angular width of patch
         interacts_with -> list of patches (in terms of indices within a patches object) the patch interacts with
         epsilon -> depth of the square well attraction
+        patch_type -> integer identifier of the patch
         vec -> vector that positions the patch on the particle.
         """
+        self._view_arrays = PatchArrays(1)
+        self._index = 0
+        self._owner = None
+
         self.kf_lambda = kf_lambda
         self.cos_delta = cos_delta
         self.delta = delta
@@ -38,6 +418,91 @@ class Patch:
         self.check_angular_width()
         self.check_range()
 
+    @classmethod
+    def view(cls, arrays, index, owner=None):
+        """
+        Function that returns a Patch viewing row index of a PatchArrays
+        object, or if owner is given, of the current arrays of the
+        Patches object owner.
+        """
+        patch = cls.__new__(cls)
+        patch._view_arrays = arrays
+        patch._index = index
+        patch._owner = owner
+        if owner is not None:
+            patch._layout = owner.layout
+        return patch
+
+    @property
+    def _arrays(self):
+        """
+        The PatchArrays object the patch views.
+        """
+        if self._owner is None:
+            return self._view_arrays
+        if self._owner.layout != self._layout:
+            raise RuntimeError("stale Patch: the patches of its Patches object were replaced "
+                               "or reordered.")
+        return self._owner.arrays
+
+    def __copy__(self):
+        """
+        Copying a Patch detaches it from the arrays it views.
+        """
+        return Patch.view(self._arrays.take([self._index]), 0)
+
+    def __deepcopy__(self, memo):
+        """
+        Deep copies are detached as well.
+        """
+        return self.__copy__()
+
+    kf_lambda = _field('kf_lambda', "range of square well interaction")
+    cos_delta = _field('cos_delta', "cos of angular width of patch")
+    delta = _field('delta', "angular width of patch")
+    epsilon = _field('epsilon', "depth of the square well attraction")
+
+    @property
+    def patch_type(self):
+        """
+        Integer identifier of the patch.
+        """
+        value = self._arrays.patch_type[self._index]
+        if value < 0:
+            return None
+        return int(value)
+
+    @patch_type.setter
+    def patch_type(self, value):
+        self._arrays.patch_type[self._index] = -1 if value is None else value
+
+    @property
+    def vec(self):
+        """
+        Vector that positions the patch on the particle (a view).
+        """
+        return self._arrays.vec[self._index]
+
+    @vec.setter
+    def vec(self, value):
+        self._arrays.vec[self._index] = value
+
+    @property
+    def interacts_with(self):
+        """
+        List of patches the patch interacts with. Changing the list in
+        place (e.g. append) updates the interactions.
+        """
+        return WriteThroughList(self._arrays.get_interacts_with(self._index).tolist(),
+                                self._set_interacts_with)
+
+    @interacts_with.setter
+    def interacts_with(self, value):
+        self._set_interacts_with(value)
+
+    def _set_interacts_with(self, value):
+        self._arrays.set_interacts_with(self._index, value)
+
     def __repr__(self):
         """
         __repr__ function for Patch object.
@@ -95,7 +560,7 @@ class Patch:
         if self.kf_lambda is None:
             print("ERROR: I need kf_lambda to check single-bond-per-patch.")
             return False
-        
+
         if self.delta is None and self.cos_delta is None:
             print("ERROR: I need a patch angular width to check single-bond-per-patch.")
             return False
@@ -107,8 +572,8 @@ class Patch:
             sin_delta = np.sin(np.acos(self.cos_delta))
 
         sin_delta = np.sin(self.delta)
-        
+
         if sin_delta <= 1/(2*self.kf_lambda):
             return True
         else:
-            return False
\ No newline at end of file
+            return False
@@ -4,52 +4,154 @@ Has the ability to generate C++ code to be compiled by hoomd.hpmc.
 See: https://hoomd-blue.readthedocs.io/en/latest/tutorial/07-Modelling-Patchy-Particles/02-Simulating-a-System-of-Patchy-Particles.html
 """
 import copy
+import hashlib
 import numpy as np
-from hoomd_kf.patch import Patch
-from hoomd_kf.utils import check_adjacency, generate_patch_geometry, slice_to_indices
+from hoomd_kf.patch import Patch, PatchArrays, WriteThroughList
+from scipy.sparse import csr_matrix, issparse
+from hoomd_kf.utils import check_adjacency, generate_patch_geometry
+from hoomd_kf.utils import adjacency_to_csr, symmetrize_adjacency
+from hoomd_kf.codegen import generate_cpp_code
+from hoomd_kf.energy import patch_arrays
+
+
+class PatchList(WriteThroughList):
+    """
+    A PatchList is the list_of_patches of a Patches object. Appending
+    patches grows the patch arrays in place; other in-place changes
+    rebuild them.
+    """
+
+    def __init__(self, patches):
+        super().__init__(patches.get_views(), patches.update_list_of_patches)
+        self._patches = patches
+
+    def append(self, patch):
+        self.extend([patch])
+
+    def extend(self, list_of_patches):
+        list.extend(self, self._patches.append_patches(list(list_of_patches)))
+
+    def __iadd__(self, list_of_patches):
+        self.extend(list_of_patches)
+        return self
 
 
 class Patches:
     """
     A Patches object contains a list of Patch objects.
+
+    The patch parameters are stored as a PatchArrays object (arrays),
+    and list_of_patches returns Patch views into its rows.
     """
 
     def __init__(self, list_of_patches=None):
         """
-        Initialize the Patches object.
+        Initialize the Patches object. The parameters of the patches in
+        list_of_patches are copied: later changes to those Patch objects
+        do not change the Patches object (change its list_of_patches
+        instead).
+        """
+        # incremented whenever the arrays are replaced, which makes
+        # the Patch views handed out before stale
+        self.layout = 0
+        self.arrays = PatchArrays(0)
+        if list_of_patches:
+            self.list_of_patches = list_of_patches
+            self.check_patch_indices()
+
+    @property
+    def arrays(self):
+        """
+        PatchArrays object holding the patch parameters.
+        """
+        return self._arrays
+
+    @arrays.setter
+    def arrays(self, arrays):
+        self._arrays = arrays
+        self.layout += 1
+
+    @property
+    def list_of_patches(self):
+        """
+        List of Patch objects, as views into the patch arrays. Changing
+        the list in place (e.g. append) changes the patch arrays.
+        """
+        return PatchList(self)
+
+    @list_of_patches.setter
+    def list_of_patches(self, list_of_patches):
+        if list_of_patches is None:
+            list_of_patches = []
+        self.check_data(list_of_patches)
+        self.arrays = PatchArrays.from_patches(list_of_patches)
+
+    def get_views(self, start=0):
+        """
+        Function that returns a Patch view into every row of the arrays,
+        from row start on.
+        """
+        return [Patch.view(self.arrays, i, owner=self) for i in range(start, len(self.arrays))]
+
+    def append_patches(self, list_of_patches):
+        """
+        Function that appends (copies of) patches to the arrays in place,
+        so that the views handed out before stay valid. Returns the views
+        of the new patches.
+        """
+        self.check_data(list_of_patches)
+        start = len(self.arrays)
+        self.arrays.append(PatchArrays.from_patches(list_of_patches))
+        return self.get_views(start)
+
+    def update_list_of_patches(self, list_of_patches):
+        """
+        Function that rebuilds the arrays from a changed list_of_patches
+        and returns the views into the new arrays.
         """
         self.list_of_patches = list_of_patches
-        if self.list_of_patches:
-            self.check_data()
-            self.check_patch_indices()
+        return self.get_views()
 
     def __len__(self):
         """
         Function to return the number of patches.
         """
-        return len(self.list_of_patches)
+        return len(self.arrays)
 
     def __getitem__(self, key):
         """
-        Overload __getitem__ so that you can slice into Patches.
-        """
-        # TODO: do I want copy.copy in all?
-        if isinstance(key, slice):
-            indices = slice_to_indices(key, len(self.list_of_patches))
-            new_list = [copy.copy(self.list_of_patches[ii]) for ii in list(indices)]
-            new_patches = Patches(list_of_patches=new_list)
-            new_patches.update_interaction_indices(list(indices))
-            return new_patches
-        elif isinstance(key, int):
-            return copy.copy(self.list_of_patches[key])
-        elif isinstance(key, tuple):
-            new_list = [copy.copy(self.list_of_patches[ii]) for ii in key]
-            new_patches = Patches(list_of_patches=new_list)
-            new_patches.update_interaction_indices(key)
-            return new_patches
+        Overload __getitem__ so that you can slice into Patches. An int
+        returns a (detached) Patch; a slice, tuple, list, index array or
+        boolean mask returns a new Patches object. Slices share the
+        parameter arrays with this object.
+        """
+        if isinstance(key, (int, np.integer)):
+            if key < -len(self) or key >= len(self):
+                raise IndexError("patch index out of range")
+            return copy.copy(Patch.view(self.arrays, key % len(self)))
+        elif isinstance(key, slice):
+            return self.get_subset(key)
+        elif isinstance(key, (tuple, list, np.ndarray)):
+            return self.get_subset(key)
         else:
             raise TypeError
 
+    def get_subset(self, indices):
+        """
+        Function that returns a new Patches object with the given patches
+        (a slice, integer indices or a boolean mask), keeping only the
+        interactions among them.
+        """
+        if isinstance(indices, slice):
+            rows = np.arange(*indices.indices(len(self)), dtype=np.int64)
+        else:
+            rows = self.arrays.get_row_indices(indices)
+            indices = rows
+        new_patches = Patches()
+        new_patches.arrays = self.arrays.take(indices)
+        new_patches.update_interaction_indices(rows)
+        return new_patches
+
     def __repr__(self):
         """
         __repr__ function for Patches object.
@@ -76,73 +178,84 @@ class Patches:
     def __add__(self, to_be_added):
         """
         Function that can be used to merge two Patches objects,
-        or to add a new Patch to Patches.
+        or to add a new Patch to Patches. When merging, the interaction
+        indices of the second object are shifted past the first one.
+        Neither operand is modified.
         """
         if isinstance(to_be_added, Patches):
             # we have a Patches object
-            n_to_add = len(to_be_added)
-            for patch in to_be_added:
-                for i in range(len(patch.interacts_with)):
-                    patch.interacts_with[i] += n_to_add
-
-            new_patches = copy.deepcopy(self)
-            for patch in to_be_added:
-                new_patches.list_of_patches.append(copy.copy(patch))
-
-            return new_patches
+            return Patches.concatenate([self, to_be_added])
         elif isinstance(to_be_added, Patch):
             # we have a Patch object
-            new_patches = copy.deepcopy(self)
-            new_patches.list_of_patches.append(copy.copy(to_be_added))
+            new_patches = Patches()
+            new_patches.arrays = PatchArrays.concatenate([self.arrays,
+                                                          copy.copy(to_be_added)._arrays],
+                                                         shift_indices=False)
             return new_patches
         else:
             raise TypeError
 
-    def check_data(self):
+    @classmethod
+    def concatenate(cls, list_of_patches_objects):
+        """
+        Function that merges several Patches objects in one pass, which
+        is linear in the total number of patches (unlike repeated +).
+        The interaction indices of each object are shifted past the
+        patches before it.
+        """
+        for i, patches in enumerate(list_of_patches_objects):
+            if not isinstance(patches, Patches):
+                raise TypeError(f"item {i} is not a Patches object.")
+
+        new_patches = cls()
+        if len(list_of_patches_objects) > 0:
+            new_patches.arrays = PatchArrays.concatenate([patches.arrays
+                                                          for patches in list_of_patches_objects])
+        return new_patches
+
+    def check_data(self, list_of_patches=None):
         """
         Checks that the list of patches consists of Patch objects.
         """
-        for i, patch_i in enumerate(self.list_of_patches):
+        if list_of_patches is None:
+            list_of_patches = self.list_of_patches
+        for i, patch_i in enumerate(list_of_patches):
             if not isinstance(patch_i, Patch):
                 print(f"WARNING: patch index {i} is not a Patch object.")
 
     def check_patch_indices(self):
         """
-        Checks that each patch has a unique index.
+        Checks that each patch has a unique index. Patches without
+        a type are given their position as type.
         """
-        indices = []
-        for i, patch_i in enumerate(self.list_of_patches):
-            if patch_i.patch_type is None:
-                patch_i.patch_type = i
-                continue
-            if patch_i.patch_type not in indices:
-                indices.append(patch_i.patch_type)
-            else:
-                print("WARNING: clashing patch indices.")
-                return
+        patch_type = self.arrays.patch_type
+        unset = patch_type < 0
+        set_types = patch_type[~unset]
+        if len(np.unique(set_types)) != len(set_types):
+            print("WARNING: clashing patch indices.")
+        patch_type[unset] = np.flatnonzero(unset)
 
-    def set_adjacency(self, adjacency_matrix):
+    def set_adjacency(self, adjacency_matrix, symmetrize=False):
         """
         Function that sets what patch interacts with what other patch
-        based on an adjacency matrix.
+        based on an adjacency matrix, which can be dense or a
+        scipy.sparse matrix. If symmetrize, interactions given in one
+        direction only are set in both.
         """
-        adjacency_matrix = np.array(adjacency_matrix)
+        if not issparse(adjacency_matrix):
+            adjacency_matrix = np.array(adjacency_matrix)
+
+        if symmetrize:
+            adjacency_matrix = symmetrize_adjacency(adjacency_matrix)
 
         if not check_adjacency(adjacency_matrix):
             return
 
-        # clean interaction lists
-        for i in range(len(self)):
-            self.list_of_patches[i].interacts_with = []
+        if adjacency_matrix.shape[0] != len(self):
+            print(f"ERROR: adjacency matrix must be {len(self)} by {len(self)}.")
+            return
 
-        # set interaction lists based on the adjacency matrix provided
-        for i in range(len(self)):
-            for j in range(i, len(self)):
-                if adjacency_matrix[i, j] == 1:
-                    if j not in self.list_of_patches[i].interacts_with:
-                        self.list_of_patches[i].interacts_with.append(j)
-                    if i not in self.list_of_patches[j].interacts_with:
-                        self.list_of_patches[j].interacts_with.append(i)
+        self.arrays.set_csr(*adjacency_to_csr(adjacency_matrix))
 
     def make_all_patches_interact_with_each_other(self):
         """
@@ -157,23 +270,29 @@ class Patches:
                                        kf_lambda=1.1,
                                        epsilon=1,
                                        cos_delta=0.92,
-                                       theta=None):
+                                       theta=None,
+                                       min_angle=None,
+                                       cache_dir=None):
         """
         Function that uses utils.generate_patch_geometry() to 
-        create a list of patches.
-        """
-        vecs = generate_patch_geometry(n_patches, theta=theta)
-        patch_list = []
-        for i in range(n_patches):
-            vec = vecs[i]
-            patch = Patch(kf_lambda=kf_lambda,
-                          cos_delta=cos_delta,
-                          epsilon=epsilon,
-                          patch_type=i,
-                          vec=vec)
-            patch_list.append(patch)
-
-        self.list_of_patches = patch_list
+        create a list of patches. Beyond 4 patches, the patches are
+        spread evenly, at least min_angle apart if given, and the
+        geometry is cached on disk in cache_dir (default:
+        geometry.default_geometry_dir()).
+        """
+        vecs = generate_patch_geometry(n_patches, theta=theta, min_angle=min_angle,
+                                       cache_dir=cache_dir)
+        if vecs is None:
+            return
+        arrays = PatchArrays(n_patches)
+        arrays.vec[:] = vecs
+        arrays.kf_lambda[:] = kf_lambda
+        arrays.cos_delta[:] = cos_delta
+        arrays.delta[:] = np.arccos(cos_delta)
+        arrays.epsilon[:] = epsilon
+        arrays.patch_type[:] = np.arange(n_patches)
+
+        self.arrays = arrays
         self.make_all_patches_interact_with_each_other()
 
     def generate_simple_tetrahedral(self,
@@ -225,18 +344,112 @@ class Patches:
         """
         n_patch = len(self)
         adjacency = np.zeros((n_patch, n_patch))
-        for i, patch in enumerate(self.list_of_patches):
-            for j in patch.interacts_with:
-                adjacency[i,j] = 1
+        adjacency[self.arrays.get_rows(), self.arrays.indices] = 1
 
         return adjacency
 
+    def get_sparse_adjacency(self):
+        """
+        Function that returns the adjacency as a scipy.sparse CSR matrix
+        that shares the interaction arrays of the patches.
+        """
+        n_patch = len(self)
+        data = np.ones(len(self.arrays.indices), dtype=np.int8)
+        return csr_matrix((data, self.arrays.indices, self.arrays.indptr),
+                          shape=(n_patch, n_patch))
+
     def update_interaction_indices(self, indices):
-        translation = {ind:i for i, ind in enumerate(indices)}
-        for patch in self.list_of_patches:
-            interacts_with = []
-            for j in patch.interacts_with:
-                if j in indices:
-                    interacts_with.append(translation[j])
-            patch.interacts_with = interacts_with
-        
\ No newline at end of file
+        """
+        Function that translates interaction indices after the patches
+        at the given (old) indices have been picked out, in that order.
+        Interactions with patches that were not picked are dropped.
+        """
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        old = self.arrays.indices
+        size = max(old.max(initial=-1), indices.max(initial=-1)) + 1
+        translation = np.full(size, -1, dtype=np.int64)
+        translation[indices] = np.arange(len(indices))
+
+        new = translation[old]
+        keep = new >= 0
+        rows = self.arrays.get_rows()[keep]
+        indptr = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(self)), out=indptr[1:])
+        self.arrays.set_csr(indptr, new[keep])
+
+    def validate_geometry(self):
+        """
+        Function that checks the geometry of all patches at once and
+        returns a report (dict) with:
+            angles -> (P,P) angles between patch vectors
+            overlapping_pairs -> (n,2) pairs i < j of patches whose cones
+                                 overlap, i.e. angle < delta_i + delta_j
+            single_bond -> (P,) whether each patch allows only one bond,
+                           i.e. sin(delta) <= 1/(2 kf_lambda)
+            missing -> (P,) whether kf_lambda or the angular width is unset
+            valid -> True if all patches are set, none overlap and all
+                     allow a single bond only
+        """
+        arrays = self.arrays
+        vec = arrays.vec / np.linalg.norm(arrays.vec, axis=1)[:, None]
+        angles = np.arccos(np.clip(vec @ vec.T, -1, 1))
+
+        delta = np.where(np.isnan(arrays.delta), np.arccos(arrays.cos_delta), arrays.delta)
+        missing = np.isnan(delta) | np.isnan(arrays.kf_lambda)
+
+        overlap = angles < delta[:, None] + delta[None, :]
+        i, j = np.nonzero(np.triu(overlap, k=1))
+        overlapping_pairs = np.stack([i, j], axis=1)
+
+        with np.errstate(invalid='ignore'):
+            single_bond = np.sin(delta) <= 1 / (2 * arrays.kf_lambda)
+
+        return {'angles': angles,
+                'overlapping_pairs': overlapping_pairs,
+                'single_bond': single_bond,
+                'missing': missing,
+                'valid': bool(not np.any(missing) and len(overlapping_pairs) == 0
+                              and np.all(single_bond))}
+
+    def get_r_cut(self):
+        """
+        Function that returns the interaction cutoff, i.e. the maximum
+        kf_lambda across all patches.
+        """
+        return float(np.max(self.arrays.kf_lambda))
+
+    def content_hash(self):
+        """
+        Function that returns a stable hex digest of the patch geometry,
+        epsilon, kf_lambda, angular width and adjacency. Patches objects
+        that define the same interaction have the same hash.
+        """
+        arrays = patch_arrays(self)
+        digest = hashlib.sha256(b"hoomd_kf.Patches")
+        for name in ('vec', 'kf_lambda', 'cos_delta', 'epsilon', 'adjacency'):
+            array = np.ascontiguousarray(arrays[name], dtype='<f8')
+            digest.update(name.encode())
+            digest.update(np.array(array.shape, dtype='<i8').tobytes())
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    def generate_cpp_code(self, cache=None):
+        """
+        Function that generates the C++ code of a pair kernel for
+        hoomd.hpmc.pair.user.CPPPotential, specialized to these patches.
+        If a KernelCache is given, the code is looked up there first.
+        """
+        if cache is not None:
+            return cache.get_source(self)
+        return generate_cpp_code(self)
+
+    def generate_cpp_potential(self, cache=None):
+        """
+        Function that creates a hoomd.hpmc.pair.user.CPPPotential
+        from these patches. Requires hoomd.
+        """
+        import hoomd
+
+        return hoomd.hpmc.pair.user.CPPPotential(r_cut=self.get_r_cut(),
+                                                 code=self.generate_cpp_code(cache=cache),
+                                                 param_array=[])
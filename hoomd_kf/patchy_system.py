@@ -2,11 +2,12 @@
 This file contains the PatchySystem class that holds info
 about the system to be simulated.
 """
-import itertools
-import random
 import numpy as np
 import gsd.hoomd
 from hoomd_kf.patches import Patches
+from hoomd_kf.utils import simple_cubic_lattice, allocate_counts, random_quaternions
+from hoomd_kf.fluid import generate_fluid, get_box_length
+from hoomd_kf.crystal import generate_crystal
 
 class PatchySystem:
     """
@@ -69,30 +70,115 @@ class PatchySystem:
         if np.abs(tot_frac-1) > 1e-10:
             print(f"WARNING: sum of particle type fractions is {tot_frac}.")
 
-    def generate_initial_configuration(self,
-                                       file_name=None,
-                                       mode='xb'):
+    def get_lattice_size(self):
         """
-        Function to create a .gsd file with initial configurations
+        Function that returns the number K of lattice sites per edge of
+        the simple cubic lattice of the initial configuration.
         """
-        if file_name is None:
-            file_name = "initial.gsd"
-
-        m = (self.num_particles/2) ** (1./3)
-        m = int(np.ceil(m))
+        return int(np.ceil(self.num_particles ** (1./3)))
 
-        K = int(np.ceil(self.num_particles ** (1./3)))
+    def get_initial_snapshot(self, indices=None, rng=None, random_orientations=False):
+        """
+        Function that returns a gsd.hoomd.Frame with the particles on a
+        simple cubic lattice. The number of particles of each type is
+        allocated exactly (largest remainder method) and the types are
+        randomly permuted.
+
+        indices -> optional lattice site coordinates from
+                   utils.simple_cubic_indices(num_particles, K), which can be
+                   shared between systems with the same num_particles
+        rng -> numpy.random.Generator (or seed) for the type permutation
+               and the orientations
+        random_orientations -> draw uniformly random orientations instead
+                               of the identity quaternion
+        """
+        rng = np.random.default_rng(rng)
+        K = self.get_lattice_size()
         spacing = self.num_particles / (K * self.density)
 
         # to prevent overlaps
         assert spacing >= 1
 
         L = K * spacing
-        x = np.linspace(-L/2, L/2, K, endpoint=False)
+        position = simple_cubic_lattice(self.num_particles, K, L, indices=indices)
+        return self.build_snapshot(position, L, rng, random_orientations=random_orientations)
+
+    def get_fluid_snapshot(self,
+                           rng=None,
+                           packing_fraction=None,
+                           diameter=1.0,
+                           random_orientations=False):
+        """
+        Function that returns a gsd.hoomd.Frame with the particles placed
+        at random without overlaps (see fluid.py), or None if the packing
+        fraction can't be reached.
+
+        packing_fraction -> target packing fraction (default: the box of
+                            get_initial_snapshot(), of edge num_particles / density)
+        diameter -> hard sphere diameter
+        random_orientations -> draw uniformly random orientations instead
+                               of the identity quaternion, as in
+                               get_initial_snapshot()
+        """
+        rng = np.random.default_rng(rng)
+        if packing_fraction is None:
+            L = self.num_particles / self.density
+        else:
+            L = get_box_length(self.num_particles, packing_fraction, diameter)
+
+        position = generate_fluid(rng, self.num_particles, L, diameter=diameter)
+        if position is None:
+            return None
+        return self.build_snapshot(position.astype(np.float32), L, rng,
+                                   random_orientations=random_orientations)
+
+    def get_crystal_snapshot(self,
+                             structure,
+                             rng=None,
+                             packing_fraction=None,
+                             diameter=1.0):
+        """
+        Function that returns a gsd.hoomd.Frame with the particles on a
+        diamond, bcc, fcc or chain lattice (see crystal.py), oriented so
+        that the patch vectors point along nearest-neighbor bonds. Returns
+        None if the lattice sites would overlap.
+
+        structure -> 'diamond', 'bcc', 'fcc' or 'chain'
+        rng -> numpy.random.Generator (or seed) for the type permutation
+        packing_fraction -> packing fraction of the lattice (default: the
+                            box of get_initial_snapshot(), of edge num_particles / density)
+        diameter -> hard sphere diameter
+        """
+        rng = np.random.default_rng(rng)
+        if packing_fraction is None:
+            L = self.num_particles / self.density
+        else:
+            L = get_box_length(self.num_particles, packing_fraction, diameter)
 
-        position = list(itertools.product(x, repeat=3))
-        position = position[0:self.num_particles]
-        orientation = [(1,0,0,0)] * self.num_particles
+        vectors = None
+        if self.patches is not None:
+            vectors = self.patches.arrays.vec
+        crystal = generate_crystal(structure, self.num_particles, L, vectors=vectors,
+                                   diameter=diameter)
+        if crystal is None:
+            return None
+        position, orientation = crystal
+        return self.build_snapshot(position.astype(np.float32), L, rng,
+                                   orientation=orientation.astype(np.float32))
+
+    def build_snapshot(self, position, L, rng, random_orientations=False, orientation=None):
+        """
+        Function that returns a gsd.hoomd.Frame with the given positions
+        in a cubic box of edge L. Particle types are allocated exactly
+        (largest remainder method) and randomly permuted with rng.
+
+        orientation -> (N,4) orientations, used as given if not None
+        """
+        if orientation is None and random_orientations:
+            orientation = random_quaternions(rng, self.num_particles).astype(np.float32)
+        elif orientation is None:
+            orientation = np.zeros((self.num_particles, 4), dtype=np.float32)
+            orientation[:, 0] = 1
 
         # gsd snapshot
         snapshot = gsd.hoomd.Frame()
@@ -103,18 +189,47 @@ class PatchySystem:
 
         # set types
         snapshot.particles.types = list(self.particle_types.keys())
-        type_ids = []
-        type_indices = {key:i for i, key in enumerate(self.particle_types.keys())}
+        counts = allocate_counts(list(self.particle_types.values()), self.num_particles)
+        type_ids = np.repeat(np.arange(len(counts), dtype=np.uint32), counts)
+        snapshot.particles.typeid = rng.permutation(type_ids)
+        return snapshot
 
-        for particle_type, fraction in self.particle_types.items():
-            N = int(np.round(fraction * self.num_particles))
-            type_ids += [type_indices[particle_type]] * N
+    def generate_initial_configuration(self,
+                                       file_name=None,
+                                       mode='xb',
+                                       seed=None,
+                                       random_orientations=False,
+                                       structure='lattice',
+                                       packing_fraction=None):
+        """
+        Function to create a .gsd file with initial configurations
 
-        random.shuffle(type_ids)
+        seed -> seed of the type permutation, orientations and positions
+        random_orientations -> draw uniformly random orientations
+        structure -> 'lattice' (simple cubic), 'fluid' (random, overlap-free),
+                     or a bond-aligned 'diamond', 'bcc', 'fcc' or 'chain' lattice
+        packing_fraction -> target packing fraction of a fluid or crystal
+        """
+        if file_name is None:
+            file_name = "initial.gsd"
 
-        snapshot.particles.typeid = type_ids
+        if structure == 'lattice':
+            snapshot = self.get_initial_snapshot(rng=seed, random_orientations=random_orientations)
+        elif structure == 'fluid':
+            snapshot = self.get_fluid_snapshot(rng=seed, packing_fraction=packing_fraction,
+                                               random_orientations=random_orientations)
+            if snapshot is None:
+                return
+        elif structure in ('diamond', 'bcc', 'fcc', 'chain'):
+            snapshot = self.get_crystal_snapshot(structure, rng=seed,
+                                                 packing_fraction=packing_fraction)
+            if snapshot is None:
+                return
+        else:
+            print(f"ERROR: unknown structure {structure}.")
+            return
 
         with gsd.hoomd.open(name=file_name, mode=mode) as f:
             f.append(snapshot)
 
-        self.snapshot = snapshot
\ No newline at end of file
+        self.snapshot = snapshot
@@ -0,0 +1,178 @@
+"""
+This file contains a batch generator of initial configurations for
+parameter sweeps over many state points (num_particles, density,
+particle_types and any other parameters, e.g. of the patches, which are
+recorded in the manifest).
+
+The state points are grouped by num_particles so that the lattice site
+coordinates are computed once per group and chunk, and the chunks are
+written in a process pool. A manifest.json describing every generated
+file is written to the output directory.
+"""
+import os
+import json
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import gsd.hoomd
+from hoomd_kf.patchy_system import PatchySystem
+from hoomd_kf.utils import simple_cubic_indices
+
+SYSTEM_KEYS = ('num_particles', 'density', 'particle_types')
+MANIFEST_NAME = "manifest.json"
+CRYSTAL_STRUCTURES = ('diamond', 'bcc', 'fcc', 'chain')
+
+
+def make_state_points(**grid):
+    """
+    Function that returns the state points (dicts) of the cartesian
+    product of the given lists of values, e.g.
+    make_state_points(num_particles=[1000], density=[0.1, 0.2]).
+    """
+    keys = list(grid)
+    return [dict(zip(keys, [value.tolist() if isinstance(value, np.generic) else value
+                             for value in values]))
+            for values in itertools.product(*grid.values())]
+
+def to_python(value):
+    """
+    Function that converts NumPy scalars and arrays to Python objects,
+    so that state points can be written to JSON.
+    """
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def get_file_name(state_point, k):
+    """
+    Function that returns the file name of state point k: its
+    'file_name' entry, or state_<k>.gsd.
+    """
+    return state_point.get('file_name', f"state_{k:05d}.gsd")
+
+def generate_chunk(output_dir, jobs, mode, patches=None):
+    """
+    Function that writes the initial configurations of a chunk of
+    (k, state_point, seed) jobs sharing num_particles, and returns
+    their manifest entries. Runs in the workers.
+    """
+    indices = None
+    entries = []
+    for k, state_point, seed in jobs:
+        system = PatchySystem(patches=patches,
+                              **{key: state_point[key] for key in SYSTEM_KEYS
+                                 if key in state_point})
+        if indices is None:
+            indices = simple_cubic_indices(system.num_particles, system.get_lattice_size())
+        random_orientations = state_point.get('random_orientations', False)
+        structure = state_point.get('structure', 'lattice')
+        if structure == 'lattice':
+            snapshot = system.get_initial_snapshot(
+                indices=indices, rng=np.random.default_rng(seed),
+                random_orientations=random_orientations)
+        elif structure == 'fluid':
+            snapshot = system.get_fluid_snapshot(
+                rng=np.random.default_rng(seed),
+                packing_fraction=state_point.get('packing_fraction'),
+                random_orientations=random_orientations)
+        elif structure in CRYSTAL_STRUCTURES and patches is None:
+            print(f"ERROR: the {structure} structure of state point {k} needs patches.")
+            snapshot = None
+        elif structure in CRYSTAL_STRUCTURES:
+            snapshot = system.get_crystal_snapshot(
+                structure, rng=np.random.default_rng(seed),
+                packing_fraction=state_point.get('packing_fraction'))
+        else:
+            print(f"ERROR: unknown structure {structure} of state point {k}.")
+            snapshot = None
+        if snapshot is None:
+            # left out of the manifest
+            continue
+
+        file_name = get_file_name(state_point, k)
+        with gsd.hoomd.open(name=os.path.join(output_dir, file_name), mode=mode) as f:
+            f.append(snapshot)
+
+        entry = {'index': k,
+                 'file_name': file_name,
+                 'seed': seed,
+                 'box_length': float(snapshot.configuration.box[0]),
+                 **state_point}
+        if patches is not None:
+            entry['patches_hash'] = patches.content_hash()
+        entries.append(entry)
+    return entries
+
+def get_chunks(state_points, seeds, chunk_size):
+    """
+    Function that groups the state points by num_particles and splits
+    every group into chunks of at most chunk_size jobs.
+    """
+    groups = {}
+    for k, (state_point, seed) in enumerate(zip(state_points, seeds)):
+        groups.setdefault(state_point['num_particles'], []).append((k, state_point, seed))
+
+    return [jobs[start:start + chunk_size]
+            for jobs in groups.values()
+            for start in range(0, len(jobs), chunk_size)]
+
+def write_manifest(output_dir, manifest):
+    """
+    Function that writes the manifest to a temporary file and moves it
+    into place, so that readers never see a partial file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, prefix=".tmp-")
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2, default=to_python)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST_NAME))
+
+def generate_initial_states(state_points,
+                            output_dir,
+                            n_workers=None,
+                            chunk_size=None,
+                            seed=None,
+                            mode='xb',
+                            patches=None):
+    """
+    Function that generates the initial configuration of every state
+    point as a gsd file in output_dir, and writes manifest.json there.
+    Returns the manifest, a list with one dict per state point (in the
+    given order) holding its file name, seed and parameters.
+
+    state_points -> list of dicts with num_particles, density and
+                    optionally particle_types, random_orientations,
+                    structure ('lattice', 'fluid', 'diamond', 'bcc', 'fcc'
+                    or 'chain'), packing_fraction,
+                    file_name and any other (JSON serializable) parameters
+    n_workers -> number of processes (default: os.cpu_count())
+    chunk_size -> number of state points handed to a worker at once
+                  (default: about 4 chunks per worker)
+    seed -> seed from which the per-state-point seeds are derived
+    mode -> mode in which the gsd files are opened
+    patches -> Patches object carried by the particles of every state
+               point, required by the crystal structures to orient the
+               particles (its content_hash() is recorded in the manifest)
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    if chunk_size is None:
+        chunk_size = max(int(np.ceil(len(state_points) / (4 * n_workers))), 1)
+    # fail before any file is written if the manifest can't be
+    json.dumps(state_points, default=to_python)
+    os.makedirs(output_dir, exist_ok=True)
+
+    seeds = np.random.SeedSequence(seed).generate_state(len(state_points)).tolist()
+    chunks = get_chunks(state_points, seeds, chunk_size)
+
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(generate_chunk, output_dir, jobs, mode, patches)
+                       for jobs in chunks]
+            results = [future.result() for future in futures]
+    else:
+        results = [generate_chunk(output_dir, jobs, mode, patches) for jobs in chunks]
+
+    manifest = sorted(itertools.chain.from_iterable(results), key=lambda entry: entry['index'])
+    write_manifest(output_dir, manifest)
+    return manifest
@@ -2,7 +2,10 @@
 Contains utility functions for the hoomd_kf module.
 """
 import numpy as np
+import gsd.hoomd
 from scipy.linalg import issymmetric
+from scipy.sparse import csr_matrix, issparse
+from hoomd_kf.geometry import optimize_patch_geometry, default_geometry_dir
 
 def check_adjacency(adjacency):
     """
@@ -12,7 +15,10 @@ def check_adjacency(adjacency):
         1- m by m
         2- contains 1s and 0s only
         3- symmetric
+    scipy.sparse matrices are checked in O(nnz).
     """
+    if issparse(adjacency):
+        return check_sparse_adjacency(adjacency)
 
     adjacency = np.array(adjacency)
 
@@ -30,14 +36,56 @@ def check_adjacency(adjacency):
         print("ERROR: adjacency matrix should contain only 0s and 1s.")
         return False
 
-    # TODO: may want to relax this condition in the future
-    # if the adjacency matrices become gigantic and sparse, use other methods to check for this
     if not issymmetric(adjacency):
         print("ERROR: adjacency matrix must be symmetric.")
         return False
 
     return True
 
+def check_sparse_adjacency(adjacency):
+    """
+    Sparse version of check_adjacency(), which only looks at the
+    stored entries.
+    """
+    shape = adjacency.shape
+
+    if shape[0] != shape[1]:
+        print("ERROR: adjacency matrix must be square.")
+        return False
+
+    adjacency = csr_matrix(adjacency)
+    data = adjacency.data
+    if not np.all((data == 1) | (data == 0)):
+        print("ERROR: adjacency matrix should contain only 0s and 1s.")
+        return False
+
+    difference = adjacency - adjacency.T
+    difference.eliminate_zeros()
+    if difference.nnz > 0:
+        print("ERROR: adjacency matrix must be symmetric.")
+        return False
+
+    return True
+
+def symmetrize_adjacency(adjacency):
+    """
+    Function that returns a sparse adjacency matrix in which an
+    interaction set in either direction is set in both.
+    """
+    adjacency = csr_matrix(adjacency)
+    return adjacency.maximum(adjacency.T)
+
+def adjacency_to_csr(adjacency):
+    """
+    Function that converts a dense or sparse adjacency matrix to CSR
+    arrays (indptr, indices) with sorted column indices.
+    """
+    adjacency = csr_matrix(adjacency)
+    adjacency.sum_duplicates()
+    adjacency.eliminate_zeros()
+    adjacency.sort_indices()
+    return adjacency.indptr.astype(np.int64), adjacency.indices.astype(np.int64)
+
 def slice_to_indices(key, n_el):
     """
     Function that converts a slice object to a list of
@@ -62,19 +110,26 @@ def slice_to_indices(key, n_el):
 
     return list(range(start, stop, step))
 
-def generate_patch_geometry(n_patches, theta=None):
+def generate_patch_geometry(n_patches, theta=None, min_angle=None, cache_dir=None):
     """
     Function to generate some basic patch geometries.
-    Works until N=4:
     - N=1, single patch
     - N=2, two patches, can be separated by an angle theta, if provided.
     - N=3, 3 patches forming a triangle at the equator
     - N=4, tetrahedral arrangement
+    - N>4, evenly spread patches from geometry.optimize_patch_geometry(),
+      at least min_angle apart if min_angle is given (None if impossible),
+      cached on disk in cache_dir (default: geometry.default_geometry_dir())
     """
-    # TODO: implement N=5 and N=6 as well
     if n_patches > 4:
-        print("ERROR: can't generate patch geometry beyond n_patch=6.")
-        return None
+        if theta is not None:
+            print("WARNING: I can only generate regular shapes beyond n_patch=2, ignoring theta.")
+        if cache_dir is None:
+            cache_dir = default_geometry_dir()
+        vectors = optimize_patch_geometry(n_patches, min_angle=min_angle, cache_dir=cache_dir)
+        if vectors is None:
+            return None
+        return vectors.tolist()
     if n_patches > 2 and theta is not None:
         print("WARNING: I can only generate regular shapes beyond n_patch=2, ignoring theta.")
     if n_patches == 1:
@@ -106,4 +161,153 @@ def generate_patch_geometry(n_patches, theta=None):
         vec3 = [np.cos(theta), v3y, v3z]
         vec4 = [np.cos(theta), -v3y, v3z]
         vectors = [vec1, vec2, vec3, vec4]
-        return vectors
\ No newline at end of file
+        return vectors
+
+def rotate_vectors(quaternions, vectors):
+    """
+    Function that rotates every vector by every quaternion in one
+    batched step. Quaternions follow the hoomd (w, x, y, z) convention.
+    Given (N, 4) quaternions and (P, 3) vectors, returns an (N, P, 3)
+    array of rotated vectors.
+    """
+    quaternions = np.asarray(quaternions, dtype=np.float64).reshape(-1, 4)
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+
+    w = quaternions[:, None, 0:1]
+    u = quaternions[:, None, 1:]
+    v = vectors[None, :, :]
+
+    # v' = v + 2w (u x v) + 2 u x (u x v)
+    uv = np.cross(u, v)
+    uuv = np.cross(u, uv)
+    return v + 2 * (w * uv + uuv)
+
+def quaternion_multiply(q1, q2):
+    """
+    Function that returns the (elementwise) quaternion product q1 q2,
+    with quaternions in the hoomd (w, x, y, z) convention.
+    """
+    q1 = np.asarray(q1, dtype=np.float64)
+    q2 = np.asarray(q2, dtype=np.float64)
+    w1, v1 = q1[..., :1], q1[..., 1:]
+    w2, v2 = q2[..., :1], q2[..., 1:]
+
+    w = w1 * w2 - np.sum(v1 * v2, axis=-1, keepdims=True)
+    v = w1 * v2 + w2 * v1 + np.cross(v1, v2)
+    return np.concatenate([w, v], axis=-1)
+
+def rotation_matrix_to_quaternion(matrices):
+    """
+    Function that converts (n, 3, 3) rotation matrices into (n, 4) unit
+    quaternions in the hoomd (w, x, y, z) convention, as the dominant
+    eigenvector of the symmetric 4x4 matrix of each rotation, which is
+    robust for any rotation angle.
+    """
+    R = np.asarray(matrices, dtype=np.float64).reshape(-1, 3, 3)
+    xx, xy, xz = R[:, 0, 0], R[:, 0, 1], R[:, 0, 2]
+    yx, yy, yz = R[:, 1, 0], R[:, 1, 1], R[:, 1, 2]
+    zx, zy, zz = R[:, 2, 0], R[:, 2, 1], R[:, 2, 2]
+    K = np.stack([np.stack([xx + yy + zz, zy - yz, xz - zx, yx - xy], axis=-1),
+                  np.stack([zy - yz, xx - yy - zz, xy + yx, xz + zx], axis=-1),
+                  np.stack([xz - zx, xy + yx, yy - xx - zz, yz + zy], axis=-1),
+                  np.stack([yx - xy, xz + zx, yz + zy, zz - xx - yy], axis=-1)], axis=1) / 3
+    _, eigenvectors = np.linalg.eigh(K)
+    quaternions = eigenvectors[:, :, -1]
+    # q and -q are the same rotation, keep w >= 0
+    return quaternions * np.where(quaternions[:, :1] < 0, -1, 1)
+
+def random_quaternions(rng, n):
+    """
+    Function that returns (n, 4) unit quaternions drawn uniformly from
+    the rotation group (Shoemake's method), as one batch.
+    """
+    u1, u2, u3 = rng.random((3, n))
+    a = np.sqrt(1 - u1)
+    b = np.sqrt(u1)
+    return np.stack([a * np.sin(2 * np.pi * u2),
+                     a * np.cos(2 * np.pi * u2),
+                     b * np.sin(2 * np.pi * u3),
+                     b * np.cos(2 * np.pi * u3)], axis=1)
+
+def get_orientations(frame):
+    """
+    Function that returns the (N,4) orientations of a gsd frame,
+    defaulting to the identity quaternion if none are stored.
+    """
+    orientations = frame.particles.orientation
+    if orientations is None:
+        orientations = np.zeros((frame.particles.N, 4))
+        orientations[:, 0] = 1
+    return orientations
+
+def make_random_frame(num_particles, density=0.8, seed=0):
+    """
+    Function that returns a gsd frame of num_particles particles at
+    uniformly random positions (overlaps allowed) and orientations in a
+    cubic box, at number density density. Used by the tests and benchmarks.
+    """
+    rng = np.random.default_rng(seed)
+    L = (num_particles / density) ** (1./3)
+    frame = gsd.hoomd.Frame()
+    frame.particles.N = num_particles
+    frame.particles.position = rng.uniform(-L/2, L/2, size=(num_particles, 3)).astype(np.float32)
+    q = rng.normal(size=(num_particles, 4))
+    frame.particles.orientation = (q / np.linalg.norm(q, axis=1)[:, None]).astype(np.float32)
+    frame.configuration.box = [L, L, L, 0, 0, 0]
+    return frame
+
+def box_lengths(box):
+    """
+    Function that returns the (Lx, Ly, Lz) edge lengths of a gsd box.
+    Only orthorhombic boxes are supported.
+    """
+    box = np.asarray(box, dtype=np.float64)
+    if len(box) > 3 and np.any(box[3:6] != 0):
+        raise ValueError("only orthorhombic boxes (zero tilt factors) are supported.")
+    return box[:3]
+
+def minimum_image(dr, box):
+    """
+    Function that wraps separation vectors into the periodic box
+    using the minimum-image convention.
+    """
+    L = box_lengths(box)
+    return dr - L * np.round(dr / L)
+
+def allocate_counts(fractions, n):
+    """
+    Function that splits n items between categories in proportion to
+    the given fractions with the largest remainder method, so that
+    the counts sum to exactly n. Fractions are normalized by their sum.
+    """
+    fractions = np.asarray(fractions, dtype=np.float64)
+    quotas = fractions / fractions.sum() * n
+    counts = np.floor(quotas).astype(np.int64)
+    # hand the remaining items to the largest remainders (ties: first category)
+    order = np.argsort(-(quotas - counts), kind='stable')
+    counts[order[:n - counts.sum()]] += 1
+    return counts
+
+def simple_cubic_indices(n_sites, K):
+    """
+    Function that returns the (n_sites, 3) integer coordinates of the
+    first n_sites sites of a K x K x K simple cubic lattice, in the same
+    order as itertools.product(range(K), repeat=3).
+    """
+    index = np.arange(n_sites, dtype=np.int64)
+    return np.stack([index // (K * K), (index // K) % K, index % K], axis=1)
+
+def simple_cubic_lattice(n_sites, K, L, indices=None):
+    """
+    Function that returns the (n_sites, 3) float32 positions of the
+    first n_sites sites of a K x K x K simple cubic lattice filling a
+    box of edge L centered at the origin, in the same order as
+    itertools.product(x, repeat=3). The full K^3 lattice is never built.
+
+    indices -> optional site coordinates from simple_cubic_indices(n_sites, K),
+               which only depend on n_sites and K and can be reused
+    """
+    x = np.linspace(-L/2, L/2, K, endpoint=False)
+    if indices is None:
+        indices = simple_cubic_indices(n_sites, K)
+    return x[indices].astype(np.float32)
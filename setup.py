@@ -14,5 +14,6 @@ setup(
         packages=find_packages(),
         #install_requires=['hoomd','gsd','numpy'],
         install_requires=['gsd','numpy'],
+        extras_require={'jit': ['numba']},
         python_requires='>=3.6'
         )
@@ -0,0 +1,11 @@
+import pytest
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory, monkeypatch):
+    """
+    Keeps the on-disk caches (kernels, patch geometries) of every test
+    out of the user cache directory.
+    """
+    path = tmp_path_factory.mktemp("hoomd_kf_cache")
+    monkeypatch.setenv("HOOMD_KF_CACHE_DIR", str(path))
+    return path
@@ -0,0 +1,18 @@
+"""
+Helpers shared by the unit tests to build gsd frames.
+"""
+import numpy as np
+import gsd.hoomd
+from hoomd_kf.utils import make_random_frame
+
+def make_frame(positions, orientations, L=10):
+    """
+    Function that returns a frame with the given positions and
+    orientations in a cubic box of edge L.
+    """
+    frame = gsd.hoomd.Frame()
+    frame.particles.N = len(positions)
+    frame.particles.position = np.array(positions, dtype=np.float32)
+    frame.particles.orientation = np.array(orientations, dtype=np.float32)
+    frame.configuration.box = [L, L, L, 0, 0, 0]
+    return frame
@@ -0,0 +1,78 @@
+import numpy as np
+import gsd.hoomd
+from hoomd_kf.patches import Patches
+from hoomd_kf.energy import compute_energy
+from hoomd_kf.bonds import find_bonds
+from hoomd_kf.analysis_cache import AnalysisCache
+from frames import make_random_frame
+
+calls = []
+
+def counting_energy(patches, frame):
+    calls.append(1)
+    return compute_energy(patches, frame)
+
+def append_frames(file_name, n_frames, mode='rb+', seed=0):
+    with gsd.hoomd.open(name=file_name, mode=mode) as f:
+        for i in range(n_frames):
+            f.append(make_random_frame(40, density=0.625, seed=[seed, i]))
+
+class TestAnalysisCache:
+    def test_cache_reuse(self, tmp_path):
+        file_name = str(tmp_path / "traj.gsd")
+        append_frames(file_name, 5, mode='wb')
+        cache = AnalysisCache(cache_dir=str(tmp_path / "cache"))
+
+        patches = Patches()
+        patches.generate_simple_tetrahedral(cos_delta=0.5)
+
+        calls.clear()
+        first = cache.get_results(file_name, patches, counting_energy, chunk_size=2)
+        assert len(calls) == 5
+
+        calls.clear()
+        second = cache.get_results(file_name, patches, counting_energy, chunk_size=2)
+        assert len(calls) == 0
+        for a, b in zip(first, second):
+            assert np.isclose(a[0], b[0])
+            assert np.array_equal(a[1], b[1])
+
+        # a different Patches object is a different entry
+        other = Patches()
+        other.generate_simple_tetrahedral(cos_delta=0.6)
+        calls.clear()
+        cache.get_results(file_name, other, counting_energy)
+        assert len(calls) == 5
+
+    def test_growing_trajectory(self, tmp_path):
+        file_name = str(tmp_path / "traj.gsd")
+        append_frames(file_name, 3, mode='wb')
+        cache = AnalysisCache(cache_dir=str(tmp_path / "cache"))
+
+        patches = Patches()
+        patches.generate_simple_tetrahedral(cos_delta=0.5)
+        cache.get_results(file_name, patches, counting_energy)
+
+        append_frames(file_name, 2, seed=1)
+        calls.clear()
+        results = cache.get_results(file_name, patches, counting_energy)
+        assert len(calls) == 2
+        assert len(results) == 5
+
+        with gsd.hoomd.open(name=file_name, mode='rb') as f:
+            assert np.isclose(results[4][0], compute_energy(patches, f[4])[0])
+
+    def test_rewritten_trajectory(self, tmp_path):
+        file_name = str(tmp_path / "traj.gsd")
+        append_frames(file_name, 3, mode='wb')
+        cache = AnalysisCache(cache_dir=str(tmp_path / "cache"))
+
+        patches = Patches()
+        patches.generate_simple_tetrahedral(cos_delta=0.5)
+        cache.get_results(file_name, patches, find_bonds)
+
+        append_frames(file_name, 4, mode='wb', seed=2)
+        results = cache.get_results(file_name, patches, find_bonds)
+        with gsd.hoomd.open(name=file_name, mode='rb') as f:
+            for result, frame in zip(results, f):
+                assert np.array_equal(result, find_bonds(patches, frame))
@@ -0,0 +1,33 @@
+import gsd.hoomd
+from hoomd_kf.patches import Patches
+from hoomd_kf.bonds import find_bonds, iter_bonds
+from frames import make_frame
+
+class TestBonds:
+    def test_find_bonds(self):
+        patches = Patches()
+        patches.generate_bivalent()
+
+        # a chain of three particles, bonded through patches 0 and 1
+        frame = make_frame([[0, 0, 0], [1.05, 0, 0], [2.1, 0, 0]],
+                           [[1, 0, 0, 0]] * 3)
+        bonds = find_bonds(patches, frame)
+
+        assert bonds.shape == (2, 4)
+        assert {tuple(bond) for bond in bonds} == {(0, 0, 1, 1), (1, 0, 2, 1)}
+
+    def test_iter_bonds(self, tmp_path):
+        patches = Patches()
+        patches.generate_bivalent()
+
+        file_name = str(tmp_path / "traj.gsd")
+        with gsd.hoomd.open(name=file_name, mode='wb') as f:
+            f.append(make_frame([[0, 0, 0], [1.05, 0, 0]], [[1, 0, 0, 0]] * 2))
+            f.append(make_frame([[0, 0, 0], [1.5, 0, 0]], [[1, 0, 0, 0]] * 2))
+            f.append(make_frame([[0, 0, 0], [-1.05, 0, 0]], [[1, 0, 0, 0]] * 2))
+
+        bonds = list(iter_bonds(file_name, patches))
+        assert len(bonds) == 3
+        assert [tuple(bond) for bond in bonds[0]] == [(0, 0, 1, 1)]
+        assert len(bonds[1]) == 0
+        assert [tuple(bond) for bond in bonds[2]] == [(0, 1, 1, 0)]
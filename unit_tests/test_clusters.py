@@ -0,0 +1,36 @@
+import numpy as np
+from hoomd_kf.patches import Patches
+from hoomd_kf.clusters import label_clusters, cluster_size_histogram, analyze_clusters
+from frames import make_frame
+
+class TestClusters:
+    def test_label_clusters(self):
+        pairs = np.array([[0, 1], [1, 2], [4, 5]])
+        labels, sizes = label_clusters(pairs, 7)
+
+        assert list(sizes) == [3, 2, 1, 1]
+        assert labels[0] == labels[1] == labels[2] == 0
+        assert labels[4] == labels[5] == 1
+        assert labels[3] != labels[6]
+        assert list(cluster_size_histogram(sizes)) == [0, 2, 1, 1]
+
+    def test_no_bonds(self):
+        labels, sizes = label_clusters(np.zeros((0, 4)), 3)
+        assert list(sizes) == [1, 1, 1]
+        assert sorted(labels) == [0, 1, 2]
+
+        labels, sizes = label_clusters([], 3)
+        assert list(sizes) == [1, 1, 1]
+        assert sorted(labels) == [0, 1, 2]
+
+    def test_analyze_clusters(self):
+        patches = Patches()
+        patches.generate_bivalent()
+
+        frame = make_frame([[0, 0, 0], [1.05, 0, 0], [2.1, 0, 0], [0, 3, 0]],
+                           [[1, 0, 0, 0]] * 4)
+
+        labels, histogram, largest = analyze_clusters(patches, frame)
+        assert list(largest) == [0, 1, 2]
+        assert list(histogram) == [0, 1, 0, 1]
+        assert labels[3] == 1
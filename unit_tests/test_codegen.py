@@ -0,0 +1,40 @@
+import numpy as np
+from hoomd_kf.patches import Patches
+from hoomd_kf.patch import Patch
+from hoomd_kf.codegen import float_literal
+
+class TestCodegen:
+    def test_float_literal(self):
+        assert float_literal(1) == "1.0f"
+        assert float_literal(0.92) == "0.92f"
+        assert float_literal(1e-5) == "1e-05f"
+
+    def test_generate_cpp_code(self):
+        patches = Patches()
+        patches.generate_simple_tetrahedral(kf_lambda=1.2)
+        code = patches.generate_cpp_code()
+
+        assert "if (rsq >= 1.44f)" in code
+        assert "const unsigned long long adjacency[4] = {0xfull, 0xfull, 0xfull, 0xfull};" in code
+        assert code.count("energy -= ") == 16
+        assert patches.get_r_cut() == 1.2
+
+    def test_only_interacting_pairs(self):
+        patches = Patches()
+        patches.generate_simple_tetrahedral()
+        adjacency = np.array([[0, 1, 0, 0],
+                              [1, 0, 0, 0],
+                              [0, 0, 0, 0],
+                              [0, 0, 0, 1]])
+        patches.set_adjacency(adjacency)
+        code = patches.generate_cpp_code()
+
+        assert "{0x2ull, 0x1ull, 0x0ull, 0x8ull}" in code
+        assert code.count("energy -= ") == 3
+        assert "facing_i & 0x4ull" not in code
+
+    def test_too_many_patches(self):
+        patch_list = [Patch(kf_lambda=1.1, cos_delta=0.92, epsilon=1) for _ in range(65)]
+        patches = Patches(list_of_patches=patch_list)
+        patches.make_all_patches_interact_with_each_other()
+        assert patches.generate_cpp_code() is None
@@ -0,0 +1,80 @@
+import numpy as np
+from hoomd_kf.crystal import generate_crystal, get_lattice_cells, get_bond_directions
+from hoomd_kf.patches import Patches
+from hoomd_kf.utils import rotate_vectors, minimum_image
+
+def bonded_directions(structure, num_particles, L, patches):
+    """
+    Returns the patch directions of every particle, the unit vectors to
+    every other particle and their distances.
+    """
+    positions, orientations = generate_crystal(structure, num_particles, L,
+                                               vectors=patches.arrays.vec)
+    box = [L, L, L, 0, 0, 0]
+    directions = rotate_vectors(orientations, patches.arrays.vec)
+    dr = minimum_image(positions[None, :, :] - positions[:, None, :], box)
+    r = np.linalg.norm(dr, axis=2)
+    np.fill_diagonal(r, np.inf)
+    return directions, dr / r[:, :, None], r
+
+def nearest_along(unit, r, direction):
+    """
+    Returns the nearest particle in the given direction.
+    """
+    along = unit @ direction > 1 - 1e-6
+    return np.flatnonzero(along)[np.argmin(r[along])]
+
+class TestCrystal:
+    def test_bond_directions(self):
+        counts, cell = get_lattice_cells('diamond', 64, 4.0)
+        assert list(counts) == [2, 2, 2]
+        bonds, r_min = get_bond_directions('diamond', cell)
+        assert len(bonds) == 8
+        assert np.isclose(r_min, 2 * np.sqrt(3) / 4)
+        assert all(len(directions) == 4 for directions, _ in bonds)
+
+        counts, cell = get_lattice_cells('fcc', 32, 4.0)
+        bonds, _ = get_bond_directions('fcc', cell)
+        assert all(len(directions) == 12 for directions, _ in bonds)
+
+    def test_tetrahedral_diamond(self):
+        patches = Patches()
+        patches.generate_simple_tetrahedral()
+        L = 3 * 4 / np.sqrt(3)
+        directions, unit, r = bonded_directions('diamond', 216, L, patches)
+
+        # every patch points at a neighbor one bond length away, whose
+        # patch points back
+        for i in range(216):
+            for a in range(4):
+                j = nearest_along(unit[i], r[i], directions[i, a])
+                assert np.isclose(r[i, j], 1)
+                assert np.isclose(np.max(directions[j] @ -unit[i, j]), 1)
+
+    def test_tetrahedral_bcc(self):
+        patches = Patches()
+        patches.generate_simple_tetrahedral()
+        L = 4 * 2 / np.sqrt(3)
+        directions, unit, r = bonded_directions('bcc', 128, L, patches)
+
+        for i in range(128):
+            for a in range(4):
+                j = nearest_along(unit[i], r[i], directions[i, a])
+                assert np.isclose(r[i, j], 1)
+                assert np.isclose(np.max(directions[j] @ -unit[i, j]), 1)
+
+    def test_bivalent_chain(self):
+        patches = Patches()
+        patches.generate_bivalent()
+        positions, orientations = generate_crystal('chain', 100, 10.0,
+                                                   vectors=patches.arrays.vec)
+        directions = rotate_vectors(orientations, patches.arrays.vec)
+
+        assert np.allclose(np.abs(directions[:, :, 2]), 1)
+        # 10 chains of 10 particles along z
+        assert len(np.unique(positions[:, :2], axis=0)) == 10
+        assert np.allclose(np.diff(np.sort(positions[:10, 2])), 1)
+
+    def test_overlapping_sites(self):
+        assert generate_crystal('fcc', 256, 4.0) is None
+        assert generate_crystal('hcp', 256, 10.0) is None
@@ -0,0 +1,51 @@
+import numpy as np
+from hoomd_kf.patches import Patches
+from hoomd_kf.energy import compute_energy
+from hoomd_kf.bonds import find_bonds
+from hoomd_kf.domain import share_arrays, attach_arrays, get_slab_particles
+from hoomd_kf.domain import compute_energy_parallel, find_bonds_parallel
+from frames import make_random_frame
+
+class TestDomain:
+    def test_shared_arrays(self):
+        data = {'a': np.arange(6.).reshape(2, 3), 'b': np.array([True, False])}
+        blocks, specs = share_arrays(data)
+        try:
+            attached, arrays = attach_arrays(specs)
+            assert np.array_equal(arrays['a'], data['a'])
+            assert arrays['b'].dtype == bool
+            del arrays
+            for block in attached:
+                block.close()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def test_slab_particles(self):
+        frame = make_random_frame(1000)
+        positions = frame.particles.position
+        owned_count = np.zeros(1000, dtype=int)
+        for slab in range(4):
+            local, owned = get_slab_particles(positions, frame.configuration.box, 4, slab, 1.2)
+            owned_count[local[owned]] += 1
+            assert len(local) > np.sum(owned)
+        assert np.all(owned_count == 1)
+
+    def test_parallel_equals_serial(self):
+        rng = np.random.default_rng(2)
+        patches = Patches()
+        patches.generate_simple_tetrahedral(cos_delta=0.6, kf_lambda=1.3)
+        patches.arrays.epsilon[:] = rng.uniform(0.5, 2, 4)
+        frame = make_random_frame(3000)
+
+        total, per_particle = compute_energy(patches, frame)
+        bonds = find_bonds(patches, frame)
+        assert total < 0
+        for n_slabs in (1, 3, 7):
+            parallel_total, parallel_per_particle = compute_energy_parallel(
+                patches, frame, n_workers=2, n_slabs=n_slabs)
+            assert parallel_total == total
+            assert np.array_equal(parallel_per_particle, per_particle)
+            assert np.array_equal(find_bonds_parallel(patches, frame, n_workers=2,
+                                                      n_slabs=n_slabs), bonds)
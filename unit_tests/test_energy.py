@@ -0,0 +1,87 @@
+import numpy as np
+from hoomd_kf.patches import Patches
+from hoomd_kf.energy import compute_energy, PatchFrame
+from hoomd_kf.bonds import find_bonds
+from hoomd_kf.neighbor import NeighborList
+from frames import make_frame
+
+class TestEnergy:
+    def test_bonded_pair(self):
+        patches = Patches()
+        patches.generate_bivalent()
+
+        frame = make_frame([[0, 0, 0], [1.05, 0, 0]],
+                           [[1, 0, 0, 0], [1, 0, 0, 0]])
+        total, per_particle = compute_energy(patches, frame)
+
+        assert np.isclose(total, -1)
+        assert np.allclose(per_particle, [-0.5, -0.5])
+
+    def test_out_of_range(self):
+        patches = Patches()
+        patches.generate_bivalent()
+
+        frame = make_frame([[0, 0, 0], [1.2, 0, 0]],
+                           [[1, 0, 0, 0], [1, 0, 0, 0]])
+        total, _ = compute_energy(patches, frame)
+        assert total == 0
+
+    def test_rotated_away(self):
+        patches = Patches()
+        patches.generate_simple_tetrahedral()
+
+        # rotate by 90 degrees around z so that the x-patch points along y
+        q = [np.cos(np.pi/4), 0, 0, np.sin(np.pi/4)]
+        frame = make_frame([[0, 0, 0], [1.05, 0, 0]],
+                           [q, [1, 0, 0, 0]])
+        total, _ = compute_energy(patches, frame)
+        assert total == 0
+
+    def test_periodic_bond(self):
+        patches = Patches()
+        patches.generate_bivalent()
+
+        frame = make_frame([[-4.5, 0, 0], [4.45, 0, 0]],
+                           [[1, 0, 0, 0], [1, 0, 0, 0]])
+        total, _ = compute_energy(patches, frame)
+        assert np.isclose(total, -1)
+
+    def test_reuse_neighbor_list(self):
+        patches = Patches()
+        patches.generate_bivalent()
+        nlist = NeighborList.from_patches(patches)
+
+        frame = make_frame([[0, 0, 0], [1.05, 0, 0]],
+                           [[1, 0, 0, 0], [1, 0, 0, 0]])
+        total_1, _ = compute_energy(patches, frame, neighbor_list=nlist)
+        frame.particles.position[1, 0] = 1.15
+        total_2, _ = compute_energy(patches, frame, neighbor_list=nlist)
+
+        assert np.isclose(total_1, -1)
+        assert total_2 == 0
+        assert nlist.n_builds == 1
+
+    def test_patch_frame(self):
+        patches = Patches()
+        patches.generate_simple_tetrahedral()
+
+        rng = np.random.default_rng(1)
+        q = rng.normal(size=(300, 4))
+        frame = make_frame(rng.uniform(-4, 4, size=(300, 3)),
+                           q / np.linalg.norm(q, axis=1)[:, None], L=8)
+
+        patch_frame = PatchFrame(patches, frame)
+        directions = patch_frame.directions
+        assert directions.shape == (300, 4, 3)
+        assert patch_frame.directions is directions
+        assert PatchFrame.get(patches, patch_frame) is patch_frame
+
+        total, per_particle = compute_energy(patches, patch_frame)
+        expected_total, expected_per_particle = compute_energy(patches, frame)
+        assert total == expected_total
+        assert np.array_equal(per_particle, expected_per_particle)
+        assert np.array_equal(find_bonds(patches, patch_frame), find_bonds(patches, frame))
+
+        single = PatchFrame(patches, frame, dtype=np.float32)
+        assert single.directions.dtype == np.float32
+        assert np.allclose(single.directions, directions, atol=1e-6)
@@ -0,0 +1,42 @@
+import numpy as np
+from hoomd_kf.fluid import get_packing_fraction, get_box_length, insert_random
+from hoomd_kf.fluid import remove_overlaps, generate_fluid
+
+def min_distance(positions, L):
+    dr = positions[:, None, :] - positions[None, :, :]
+    dr -= L * np.round(dr / L)
+    r = np.linalg.norm(dr, axis=2)
+    return np.min(r[np.triu_indices(len(positions), k=1)])
+
+class TestFluid:
+    def test_box_length(self):
+        L = get_box_length(1000, 0.3, diameter=1.5)
+        assert np.isclose(get_packing_fraction(1000, L, diameter=1.5), 0.3)
+
+    def test_insert_random(self):
+        rng = np.random.default_rng(0)
+        L = get_box_length(300, 0.2)
+        positions = insert_random(rng, 300, L)
+        assert positions.shape == (300, 3)
+        assert min_distance(positions, L) >= 1
+
+    def test_remove_overlaps(self):
+        rng = np.random.default_rng(1)
+        L = get_box_length(200, 0.3)
+        positions = rng.uniform(-L/2, L/2, size=(200, 3))
+        assert min_distance(positions, L) < 1
+
+        positions, done = remove_overlaps(positions, L)
+        assert done
+        assert min_distance(positions, L) >= 1
+        assert np.all(np.abs(positions) <= L/2)
+
+    def test_generate_fluid(self):
+        L = get_box_length(400, 0.5)
+        positions = generate_fluid(np.random.default_rng(2), 400, L)
+        assert positions.shape == (400, 3)
+        assert min_distance(positions.astype(np.float32), L) >= 1
+
+        # same seed, same configuration
+        again = generate_fluid(np.random.default_rng(2), 400, L)
+        assert np.array_equal(again, positions)
@@ -0,0 +1,79 @@
+import numpy as np
+import hoomd_kf.geometry
+from hoomd_kf.geometry import fibonacci_sphere, get_min_angle, optimize_patch_geometry
+from hoomd_kf.geometry import GEOMETRY_VERSION
+from hoomd_kf.utils import generate_patch_geometry
+from hoomd_kf.patches import Patches
+
+class TestGeometry:
+    def test_fibonacci_sphere(self):
+        points = fibonacci_sphere(50)
+        assert points.shape == (50, 3)
+        assert np.allclose(np.linalg.norm(points, axis=1), 1)
+
+    def test_octahedron(self):
+        vecs = optimize_patch_geometry(6)
+        assert vecs.shape == (6, 3)
+        assert np.allclose(vecs[0], [1, 0, 0])
+        cos = vecs @ vecs.T
+        assert np.allclose(np.sort(cos, axis=1), [[-1, 0, 0, 0, 0, 1]] * 6, atol=1e-6)
+
+    def test_icosahedron(self):
+        vecs = optimize_patch_geometry(12)
+        cos = np.sort((vecs @ vecs.T)[0])
+        expected = [-1] + [-1/np.sqrt(5)] * 5 + [1/np.sqrt(5)] * 5 + [1]
+        assert np.allclose(cos, expected, atol=1e-6)
+
+    def test_min_angle(self):
+        vecs = optimize_patch_geometry(7, min_angle=np.radians(77))
+        assert get_min_angle(vecs) >= np.radians(77) - 1e-6
+
+        # 7 points can't all be 90 degrees apart
+        assert optimize_patch_geometry(7, min_angle=np.pi/2) is None
+
+    def test_cache(self, tmp_path):
+        hoomd_kf.geometry._GEOMETRY_CACHE.clear()
+        vecs = optimize_patch_geometry(9, cache_dir=tmp_path)
+        assert len(list(tmp_path.glob(f"geometry_v{GEOMETRY_VERSION}_9_*.npy"))) == 1
+
+        # cached results are copies
+        vecs[:] = 0
+        assert np.allclose(np.linalg.norm(optimize_patch_geometry(9), axis=1), 1)
+
+        hoomd_kf.geometry._GEOMETRY_CACHE.clear()
+        assert np.allclose(optimize_patch_geometry(9, cache_dir=tmp_path),
+                           optimize_patch_geometry(9))
+
+    def test_generate_patch_geometry(self):
+        for n in range(5, 13):
+            vecs = generate_patch_geometry(n)
+            assert len(vecs) == n
+            assert np.allclose(np.linalg.norm(vecs, axis=1), 1)
+
+        patches = Patches()
+        patches.generate_patches_from_geometry(8, min_angle=np.radians(70))
+        assert len(patches) == 8
+        assert get_min_angle(patches.arrays.vec) >= np.radians(70) - 1e-6
+
+    def test_default_cache_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOOMD_KF_CACHE_DIR", str(tmp_path))
+        hoomd_kf.geometry._GEOMETRY_CACHE.clear()
+        patches = Patches()
+        patches.generate_patches_from_geometry(10)
+        assert len(list((tmp_path / "geometry").glob(f"geometry_v{GEOMETRY_VERSION}_10_*.npy"))) == 1
+
+        # a new job (empty memory cache) loads the file instead of optimizing
+        hoomd_kf.geometry._GEOMETRY_CACHE.clear()
+        monkeypatch.setattr(hoomd_kf.geometry, "riesz_relax", None)
+        vecs = generate_patch_geometry(10, cache_dir=str(tmp_path / "geometry"))
+        assert np.allclose(vecs, patches.arrays.vec)
+
+    def test_cache_version(self, tmp_path, monkeypatch):
+        hoomd_kf.geometry._GEOMETRY_CACHE.clear()
+        optimize_patch_geometry(9, cache_dir=tmp_path)
+
+        # geometries of an older optimizer are not loaded
+        monkeypatch.setattr(hoomd_kf.geometry, "GEOMETRY_VERSION", GEOMETRY_VERSION + 1)
+        hoomd_kf.geometry._GEOMETRY_CACHE.clear()
+        optimize_patch_geometry(9, cache_dir=tmp_path)
+        assert len(list(tmp_path.glob("geometry_v*_9_*.npy"))) == 2
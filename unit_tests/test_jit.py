@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import hoomd_kf.jit
+from hoomd_kf.jit import get_backend
+from hoomd_kf.patches import Patches
+from hoomd_kf.energy import compute_energy, PatchFrame
+from hoomd_kf.bonds import find_bonds
+from frames import make_random_frame
+
+class TestJit:
+    def test_get_backend(self):
+        assert get_backend() == 'numpy'
+        assert get_backend('numba') in ('numpy', 'numba')
+        with pytest.raises(ValueError):
+            get_backend('cuda')
+
+    def test_fallback(self, monkeypatch):
+        monkeypatch.setattr(hoomd_kf.jit, 'numba', None)
+        assert get_backend('numba') == 'numpy'
+
+        patches = Patches()
+        patches.generate_simple_tetrahedral(cos_delta=0.6, kf_lambda=1.3)
+        frame = make_random_frame(200)
+        assert compute_energy(patches, frame, backend='numba')[0] == compute_energy(patches, frame)[0]
+
+    def test_identical_results(self):
+        pytest.importorskip('numba')
+        rng = np.random.default_rng(1)
+
+        patches = Patches()
+        patches.generate_patches_from_geometry(6, cos_delta=0.6)
+        patches.arrays.epsilon[:] = rng.uniform(0.5, 2, 6)
+        patches.arrays.kf_lambda[:] = rng.uniform(1.1, 1.4, 6)
+        frame = make_random_frame(2000)
+
+        for dtype in (np.float64, np.float32):
+            patch_frame = PatchFrame(patches, frame, dtype=dtype)
+            total, per_particle = compute_energy(patches, patch_frame)
+            jit_total, jit_per_particle = compute_energy(patches, patch_frame, backend='numba')
+            assert total < 0
+            assert total == jit_total
+            assert np.array_equal(per_particle, jit_per_particle)
+
+            bonds = find_bonds(patches, patch_frame)
+            jit_bonds = find_bonds(patches, patch_frame, backend='numba')
+            assert len(bonds) > 0
+            assert np.array_equal(bonds, jit_bonds)
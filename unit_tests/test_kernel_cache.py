@@ -0,0 +1,69 @@
+import os
+import time
+import threading
+from hoomd_kf.patches import Patches
+from hoomd_kf.kernel_cache import KernelCache
+
+class TestKernelCache:
+    def test_content_hash(self):
+        patches_1 = Patches()
+        patches_1.generate_simple_tetrahedral()
+        patches_2 = Patches()
+        patches_2.generate_simple_tetrahedral()
+        patches_3 = Patches()
+        patches_3.generate_simple_tetrahedral(epsilon=2)
+
+        assert patches_1.content_hash() == patches_2.content_hash()
+        assert patches_1.content_hash() != patches_3.content_hash()
+
+        patches_2.set_adjacency([[1, 0, 0, 0],
+                                 [0, 1, 0, 0],
+                                 [0, 0, 1, 0],
+                                 [0, 0, 0, 1]])
+        assert patches_1.content_hash() != patches_2.content_hash()
+
+    def test_get_source(self, tmp_path):
+        cache = KernelCache(cache_dir=str(tmp_path))
+        patches = Patches()
+        patches.generate_simple_tetrahedral()
+
+        code = patches.generate_cpp_code(cache=cache)
+        assert code == patches.generate_cpp_code()
+
+        key = cache.get_key(patches)
+        assert os.path.exists(cache.get_path(key, "kernel.cpp"))
+        assert patches.generate_cpp_code(cache=cache) == code
+
+    def test_store_load(self, tmp_path):
+        cache = KernelCache(cache_dir=str(tmp_path))
+        assert cache.load("abc", "kernel.so") is None
+        cache.store("abc", "kernel.so", b"binary")
+        assert cache.load("abc", "kernel.so") == b"binary"
+
+    def test_lru_eviction(self, tmp_path):
+        cache = KernelCache(cache_dir=str(tmp_path), max_bytes=250)
+        cache.store("a", "data", b"x" * 100)
+        cache.store("b", "data", b"x" * 100)
+
+        # make "a" the most recently used entry
+        past = time.time() - 100
+        os.utime(os.path.join(str(tmp_path), "b"), (past, past))
+        cache.load("a", "data")
+
+        cache.store("c", "data", b"x" * 100)
+        assert cache.load("a", "data") is not None
+        assert cache.load("b", "data") is None
+        assert cache.load("c", "data") is not None
+        assert cache.get_size() == 200
+
+    def test_store_waits_for_lock(self, tmp_path):
+        cache = KernelCache(cache_dir=str(tmp_path))
+        # another process evicting holds the lock
+        other = KernelCache(cache_dir=str(tmp_path))
+        with other.lock():
+            writer = threading.Thread(target=cache.store, args=("a", "data", b"x"))
+            writer.start()
+            time.sleep(0.2)
+            assert not os.path.exists(os.path.join(str(tmp_path), "a"))
+        writer.join()
+        assert cache.load("a", "data") == b"x"
@@ -0,0 +1,85 @@
+import numpy as np
+from hoomd_kf.patches import Patches
+from hoomd_kf.patchy_system import PatchySystem
+from hoomd_kf.energy import compute_energy
+from hoomd_kf.mc import MonteCarlo, random_rotations
+
+def make_system(tmp_path, num_particles=125, L=6.5):
+    patches = Patches()
+    patches.generate_simple_tetrahedral(cos_delta=0.8)
+    system = PatchySystem(num_particles=num_particles,
+                          density=num_particles / L,
+                          patches=patches)
+    system.generate_initial_configuration(file_name=str(tmp_path / "initial.gsd"), mode='wb')
+    return system
+
+class TestMonteCarlo:
+    def test_random_rotations(self):
+        rng = np.random.default_rng(0)
+        q = random_rotations(rng, 100, 0.3)
+        assert np.allclose(np.linalg.norm(q, axis=1), 1)
+        assert np.all(q[:, 0] >= np.cos(0.15))
+
+    def test_incremental_energy(self, tmp_path):
+        system = make_system(tmp_path)
+        mc = MonteCarlo.from_system(system, kT=0.2, d=0.2, a=0.5, seed=1)
+        mc.run(5)
+
+        acceptance = mc.get_acceptance()
+        assert acceptance['translate'] > 0
+        assert acceptance['rotate'] > 0
+        assert mc.get_overlaps() == 0
+
+        total, _ = compute_energy(system.patches, mc.get_frame())
+        assert mc.energy < 0
+        assert np.isclose(mc.energy, total)
+        assert np.isclose(mc.energy, mc.get_total_energy())
+
+    def test_cell_table(self, tmp_path):
+        system = make_system(tmp_path)
+        mc = MonteCarlo.from_system(system, d=0.5, seed=2)
+        mc.run(3)
+
+        cell_of = mc.cell_list.flatten(mc.cell_list.get_cell_coordinates(mc.positions))
+        assert np.array_equal(cell_of, mc.cell_of)
+        for i in range(mc.N):
+            assert mc.members[mc.cell_of[i], mc.slot_of[i]] == i
+        assert np.sum(mc.members >= 0) == mc.N
+
+    def test_checkerboard(self, tmp_path):
+        system = make_system(tmp_path, num_particles=512, L=10)
+        mc = MonteCarlo.from_system(system, kT=0.2, d=0.2, a=0.5, seed=3)
+        assert list(mc.get_checkerboard_dims()) == [8, 8, 8]
+
+        mc.run(5, checkerboard=True)
+
+        acceptance = mc.get_acceptance()
+        assert acceptance['translate'] > 0
+        assert acceptance['rotate'] > 0
+        assert mc.get_overlaps() == 0
+        assert mc.energy < 0
+        assert np.isclose(mc.energy, mc.get_total_energy())
+
+        # single moves keep working after batched sweeps
+        mc.run(1)
+        assert np.isclose(mc.energy, mc.get_total_energy())
+
+    def test_cluster_moves(self, tmp_path):
+        system = make_system(tmp_path, num_particles=216, L=8)
+        mc = MonteCarlo.from_system(system, kT=0.1, d=0.2, a=0.5, seed=4)
+        mc.run(5, checkerboard=True)
+
+        for _ in range(200):
+            mc.cluster_move()
+        assert mc.n_attempted['cluster'] == 200
+        assert mc.n_accepted['cluster'] > 0
+        assert mc.get_overlaps() == 0
+        assert np.isclose(mc.energy, mc.get_total_energy())
+
+        cluster, in_cluster, unwrapped = mc.build_cluster(0)
+        assert cluster[0] == 0
+        assert np.sum(in_cluster) == len(cluster)
+        assert unwrapped.shape == (len(cluster), 3)
+
+        mc.run(1, cluster_moves=10)
+        assert np.isclose(mc.energy, mc.get_total_energy())
@@ -0,0 +1,65 @@
+import numpy as np
+from hoomd_kf.patches import Patches
+from hoomd_kf.neighbor import CellList, NeighborList, wrap_positions
+
+def brute_force_pairs(positions, L, r_cut):
+    dr = positions[None, :, :] - positions[:, None, :]
+    dr -= L * np.round(dr / L)
+    r = np.linalg.norm(dr, axis=2)
+    i, j = np.nonzero(np.triu(r < r_cut, k=1))
+    return set(zip(i, j))
+
+class TestNeighbor:
+    def test_cell_list_pairs(self):
+        rng = np.random.default_rng(0)
+        L = 10
+        positions = rng.uniform(-L/2, L/2, size=(500, 3))
+        cell_list = CellList([L, L, L, 0, 0, 0], 1.1)
+        i, j = cell_list.pairs(positions)
+
+        assert len(i) == len(set(zip(i, j)))
+        assert set(zip(i, j)) == brute_force_pairs(positions, L, 1.1)
+
+    def test_small_box(self):
+        # fewer than 3 cells per dimension must not double count
+        rng = np.random.default_rng(1)
+        L = 2.5
+        positions = rng.uniform(-L/2, L/2, size=(30, 3))
+        cell_list = CellList([L, L, L, 0, 0, 0], 1.1)
+        i, j = cell_list.pairs(positions)
+
+        assert len(i) == len(set(zip(i, j)))
+        assert set(zip(i, j)) == brute_force_pairs(positions, L, 1.1)
+
+    def test_wrap_positions(self):
+        positions = np.array([[5.5, -5.5, 0.]])
+        wrapped = wrap_positions(positions, [10, 10, 10, 0, 0, 0])
+        assert np.allclose(wrapped, [[-4.5, 4.5, 0.]])
+
+    def test_from_patches(self):
+        patches = Patches()
+        patches.generate_simple_tetrahedral(kf_lambda=1.2)
+        nlist = NeighborList.from_patches(patches)
+        assert nlist.r_cut == 1.2
+
+    def test_skin_rebuild(self):
+        rng = np.random.default_rng(2)
+        L = 8
+        box = [L, L, L, 0, 0, 0]
+        positions = rng.uniform(-L/2, L/2, size=(300, 3))
+        nlist = NeighborList(1.1, skin=0.4)
+
+        i, j = nlist.pairs(positions, box)
+        assert set(zip(i, j)) == brute_force_pairs(positions, L, 1.1)
+        assert nlist.n_builds == 1
+
+        # small displacements reuse the list
+        positions += rng.uniform(-0.1, 0.1, size=positions.shape)
+        i, j = nlist.pairs(positions, box)
+        assert set(zip(i, j)) == brute_force_pairs(positions, L, 1.1)
+        assert nlist.n_builds == 1
+
+        # a large displacement triggers a rebuild
+        positions[0] += 0.5
+        nlist.pairs(positions, box)
+        assert nlist.n_builds == 2
@@ -0,0 +1,48 @@
+import numpy as np
+from hoomd_kf.patches import Patches
+from hoomd_kf.energy import PatchFrame
+from hoomd_kf.bonds import find_bonds
+from hoomd_kf.order import nematic_order, bonded_fraction, analyze_order
+from frames import make_frame
+
+class TestOrder:
+    def test_nematic_order(self):
+        patches = Patches()
+        patches.generate_bivalent()
+
+        frame = make_frame([[0, 0, 0], [3, 0, 0], [0, 3, 0]],
+                           [[1, 0, 0, 0]] * 3)
+        S, director = nematic_order(patches, frame)
+        assert np.isclose(S, 1)
+        assert np.allclose(np.abs(director), [1, 0, 0])
+
+        rng = np.random.default_rng(0)
+        q = rng.normal(size=(2000, 4))
+        frame = make_frame(rng.uniform(-5, 5, size=(2000, 3)),
+                           q / np.linalg.norm(q, axis=1)[:, None])
+        S, _ = nematic_order(patches, frame)
+        assert S < 0.1
+
+    def test_bonded_fraction(self):
+        patches = Patches()
+        patches.generate_bivalent()
+
+        # a chain of 3 particles has 2 bonds, i.e. 4 of 6 patches bonded
+        frame = make_frame([[0, 0, 0], [1.05, 0, 0], [2.1, 0, 0]],
+                           [[1, 0, 0, 0]] * 3)
+        assert np.isclose(bonded_fraction(patches, frame), 4 / 6)
+
+        patch_frame = PatchFrame(patches, frame)
+        S, fraction = analyze_order(patches, patch_frame)
+        assert np.isclose(S, 1)
+        assert np.isclose(fraction, 4 / 6)
+
+    def test_bonded_fraction_multiple_bonds(self):
+        patches = Patches()
+        patches.generate_patches_from_geometry(1, cos_delta=0.5)
+
+        # the wide patch of particle 0 bonds to both other particles
+        frame = make_frame([[0, 0, 0], [1, 0.3, 0], [1, -0.3, 0]],
+                           [[1, 0, 0, 0], [0, 0, 0, 1], [0, 0, 0, 1]])
+        assert len(find_bonds(patches, frame)) == 2
+        assert np.isclose(bonded_fraction(patches, frame), 1)
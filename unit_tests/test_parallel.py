@@ -0,0 +1,38 @@
+import numpy as np
+import gsd.hoomd
+from hoomd_kf.patches import Patches
+from hoomd_kf.energy import compute_energy
+from hoomd_kf.bonds import find_bonds
+from hoomd_kf.parallel import get_chunks, analyze_trajectory
+from frames import make_random_frame
+
+def make_trajectory(file_name, n_frames):
+    with gsd.hoomd.open(name=file_name, mode='wb') as f:
+        for i in range(n_frames):
+            f.append(make_random_frame(50, density=0.4, seed=i))
+
+class TestParallel:
+    def test_get_chunks(self):
+        assert get_chunks(0, 10, 4) == [(0, 4), (4, 8), (8, 10)]
+        assert get_chunks(3, 3, 4) == []
+
+    def test_analyze_trajectory(self, tmp_path):
+        file_name = str(tmp_path / "traj.gsd")
+        make_trajectory(file_name, 11)
+
+        patches = Patches()
+        patches.generate_simple_tetrahedral(cos_delta=0.5)
+
+        results = analyze_trajectory(file_name, patches, compute_energy,
+                                     n_workers=2, chunk_size=3, max_in_flight=2)
+        assert len(results) == 11
+
+        with gsd.hoomd.open(name=file_name, mode='rb') as f:
+            for result, frame in zip(results, f):
+                total, per_particle = compute_energy(patches, frame)
+                assert result[0] == total
+                assert np.array_equal(result[1], per_particle)
+
+        bonds = analyze_trajectory(file_name, patches, find_bonds,
+                                   n_workers=2, chunk_size=4, start=5, stop=7)
+        assert len(bonds) == 2
@@ -1,4 +1,6 @@
-from hoomd_kf.patch import Patch
+import copy
+import numpy as np
+from hoomd_kf.patch import Patch, PatchArrays
 
 class TestPatch:
     def test_patch_single_bond_per_patch(self):
@@ -6,3 +8,40 @@ class TestPatch:
                       cos_delta=0.92)
 
         assert patch.single_bond_per_patch()
+
+    def test_patch_standalone(self):
+        patch = Patch(kf_lambda=1.1, cos_delta=0.92, vec=[0, 1, 0])
+        assert patch.epsilon is None
+        assert patch.patch_type is None
+        assert np.isclose(patch.delta, np.arccos(0.92))
+        assert list(patch.vec) == [0, 1, 0]
+
+        patch.interacts_with = [0, 2]
+        assert patch.interacts_with == [0, 2]
+
+    def test_patch_view(self):
+        arrays = PatchArrays(3)
+        patch = Patch.view(arrays, 1)
+        patch.kf_lambda = 1.2
+        patch.interacts_with = [0, 2]
+
+        assert arrays.kf_lambda[1] == 1.2
+        assert list(arrays.get_interacts_with(1)) == [0, 2]
+        assert list(arrays.indptr) == [0, 0, 2, 2]
+
+        detached = copy.copy(patch)
+        detached.kf_lambda = 1.5
+        assert arrays.kf_lambda[1] == 1.2
+        assert detached.interacts_with == [0, 2]
+
+    def test_patch_arrays_take(self):
+        arrays = PatchArrays(3)
+        arrays.set_interacts_with(0, [1])
+        arrays.set_interacts_with(1, [0, 2])
+        arrays.set_interacts_with(2, [1])
+        arrays.kf_lambda[:] = [1.1, 1.2, 1.3]
+
+        subset = arrays.take([2, 1])
+        assert list(subset.kf_lambda) == [1.3, 1.2]
+        assert list(subset.get_interacts_with(0)) == [1]
+        assert list(subset.get_interacts_with(1)) == [0, 2]
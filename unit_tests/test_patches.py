@@ -1,5 +1,7 @@
 import copy
+import pytest
 import numpy as np
+from scipy.sparse import csr_matrix
 from hoomd_kf.patches import Patches
 from hoomd_kf.patch import Patch
 from hoomd_kf.utils import check_adjacency
@@ -231,4 +233,205 @@ class TestPatches:
         assert len(list_3) == 2
 
         assert list_3[0] == 2
-        assert list_3[1] == 3
\ No newline at end of file
+        assert list_3[1] == 3
+
+    def test_add_shifts_indices(self):
+        patches_1 = Patches()
+        patches_1.generate_simple_tetrahedral()
+
+        patches_2 = Patches()
+        patches_2.generate_bivalent()
+
+        total = patches_1 + patches_2
+
+        assert total[4].interacts_with == [4, 5]
+        assert total[0].interacts_with == [0, 1, 2, 3]
+        # the operands are left untouched
+        assert patches_2[0].interacts_with == [0, 1]
+
+    def test_arrays(self):
+        patches_obj = Patches()
+        patches_obj.generate_simple_tetrahedral(kf_lambda=1.2)
+
+        assert patches_obj.arrays.vec.shape == (4, 3)
+        assert np.all(patches_obj.arrays.kf_lambda == 1.2)
+        assert list(patches_obj.arrays.patch_type) == [0, 1, 2, 3]
+
+        # views write through to the arrays
+        patches_obj.list_of_patches[1].epsilon = 3
+        assert patches_obj.arrays.epsilon[1] == 3
+
+    def test_sparse_adjacency(self):
+        n_patch = 2000
+        patch_list = [Patch(kf_lambda=1.1, cos_delta=0.92, epsilon=1) for _ in range(n_patch)]
+        patches_obj = Patches(list_of_patches=patch_list)
+
+        # each patch interacts with its partner only
+        rows = np.arange(n_patch)
+        cols = rows ^ 1
+        adjacency = csr_matrix((np.ones(n_patch), (rows, cols)), shape=(n_patch, n_patch))
+        patches_obj.set_adjacency(adjacency)
+
+        assert patches_obj[10].interacts_with == [11]
+        assert patches_obj[11].interacts_with == [10]
+        assert (patches_obj.get_sparse_adjacency() != adjacency).nnz == 0
+        assert patches_obj.arrays.interacts(10, 11)
+        assert not patches_obj.arrays.interacts(10, 12)
+
+    def test_set_adjacency_symmetrize(self):
+        patches_obj = Patches()
+        patches_obj.generate_simple_tetrahedral()
+
+        patches_obj.set_adjacency([[0, 1, 0, 0],
+                                   [0, 0, 0, 0],
+                                   [0, 0, 0, 1],
+                                   [0, 0, 0, 0]], symmetrize=True)
+
+        assert patches_obj[0].interacts_with == [1]
+        assert patches_obj[1].interacts_with == [0]
+        assert patches_obj[3].interacts_with == [2]
+
+    def test_bitset(self):
+        patches_obj = Patches()
+        patches_obj.generate_simple_tetrahedral()
+        patches_obj.set_adjacency([[1, 0, 1, 0],
+                                   [0, 0, 0, 1],
+                                   [1, 0, 1, 0],
+                                   [0, 1, 0, 1]])
+
+        bitset = patches_obj.arrays.get_bitset()
+        assert bitset.shape == (4, 1)
+        assert list(bitset[:, 0]) == [0b0101, 0b1000, 0b0101, 0b1010]
+
+    def test_getitem_arrays(self):
+        patches_obj = Patches()
+        patches_obj.generate_simple_tetrahedral()
+        patches_obj.set_adjacency([[1, 0, 1, 0],
+                                   [0, 0, 0, 1],
+                                   [1, 0, 1, 0],
+                                   [0, 1, 0, 1]])
+
+        new_patches = patches_obj[np.array([2, 0])]
+        assert len(new_patches) == 2
+        assert new_patches[0].interacts_with == [1, 0]
+        assert new_patches[1].interacts_with == [1, 0]
+
+        new_patches = patches_obj[np.array([False, True, False, True])]
+        assert len(new_patches) == 2
+        assert new_patches[0].interacts_with == [1]
+        assert new_patches[1].interacts_with == [0, 1]
+
+        new_patches = patches_obj[[-1]]
+        assert new_patches[0].interacts_with == [0]
+
+        try:
+            patches_obj[np.array([True, False])]
+            assert False
+        except IndexError:
+            pass
+
+    def test_getitem_slice_shares_data(self):
+        patches_obj = Patches()
+        patches_obj.generate_simple_tetrahedral()
+
+        new_patches = patches_obj[::2]
+        assert np.shares_memory(new_patches.arrays.vec, patches_obj.arrays.vec)
+        assert np.allclose(new_patches.arrays.vec, patches_obj.arrays.vec[::2])
+        assert new_patches[1].interacts_with == [0, 1]
+
+        new_patches = patches_obj[-2:]
+        assert len(new_patches) == 2
+        assert new_patches[0].interacts_with == [0, 1]
+
+    def test_concatenate(self):
+        patches_1 = Patches()
+        patches_1.generate_simple_tetrahedral()
+        patches_2 = Patches()
+        patches_2.generate_bivalent()
+
+        total = Patches.concatenate([patches_1, patches_2, patches_2])
+        assert len(total) == 8
+        assert total[4].interacts_with == [4, 5]
+        assert total[7].interacts_with == [6, 7]
+        assert patches_2[0].interacts_with == [0, 1]
+        assert len(Patches.concatenate([])) == 0
+
+    def test_validate_geometry(self):
+        patches_obj = Patches()
+        patches_obj.generate_simple_tetrahedral()
+
+        report = patches_obj.validate_geometry()
+        assert report['valid']
+        assert report['angles'].shape == (4, 4)
+        assert np.isclose(report['angles'][0, 1], np.arccos(-1./3))
+        assert len(report['overlapping_pairs']) == 0
+        assert np.all(report['single_bond'])
+        assert not np.any(report['missing'])
+
+        # wide patches overlap and allow more than one bond
+        patches_obj.generate_simple_tetrahedral(cos_delta=0.3)
+        report = patches_obj.validate_geometry()
+        assert not report['valid']
+        assert len(report['overlapping_pairs']) == 6
+        assert not np.any(report['single_bond'])
+
+        patches_obj = Patches(list_of_patches=[Patch(cos_delta=0.92), Patch(kf_lambda=1.1)])
+        report = patches_obj.validate_geometry()
+        assert list(report['missing']) == [True, True]
+        assert not report['valid']
+
+    def test_in_place_changes(self):
+        patches_obj = Patches()
+        patches_obj.generate_bivalent()
+
+        patches_obj.list_of_patches.append(Patch(vec=[0, 0, 1], kf_lambda=1.1, cos_delta=0.9))
+        assert len(patches_obj) == 3
+
+        patch = patches_obj.list_of_patches[2]
+        patch.interacts_with.append(2)
+        assert patches_obj[2].interacts_with == [2]
+
+        interacts_with = patches_obj.list_of_patches[0].interacts_with
+        interacts_with += [2]
+        interacts_with.remove(1)
+        assert patches_obj[0].interacts_with == [0, 2]
+
+        # copies are plain lists, detached from the patches
+        copied = copy.copy(patches_obj[0].interacts_with)
+        copied.append(1)
+        assert patches_obj[0].interacts_with == [0, 2]
+
+    def test_views_follow_appends(self):
+        patches_obj = Patches()
+        patches_obj.generate_bivalent()
+        patch_0 = patches_obj.list_of_patches[0]
+
+        patches_obj.list_of_patches.append(Patch(vec=[0, 0, 1], kf_lambda=1.1, cos_delta=0.9))
+        patch_0.kf_lambda = 1.3
+        assert patches_obj[0].kf_lambda == 1.3
+
+        # once the patches are reordered, old views can't be used
+        patches = patches_obj.list_of_patches
+        patches.reverse()
+        with pytest.raises(RuntimeError):
+            patch_0.kf_lambda = 1.2
+        assert patches[2].kf_lambda == 1.3
+
+    def test_patches_copy_their_input(self):
+        patch_1 = Patch(vec=[1, 0, 0], kf_lambda=1.1, cos_delta=0.9, interacts_with=[0])
+        patches_obj = Patches([patch_1])
+        patch_1.kf_lambda = 1.5
+        assert patches_obj[0].kf_lambda == 1.1
+
+    def test_append_grows_geometrically(self):
+        patches_obj = Patches()
+        patches = patches_obj.list_of_patches
+        buffers = set()
+        for i in range(1000):
+            patches.append(Patch(vec=[1, 0, 0], kf_lambda=1.1, cos_delta=0.9, interacts_with=[i]))
+            buffers.add(id(patches_obj.arrays.kf_lambda.base))
+
+        assert len(patches_obj) == 1000
+        assert len(buffers) <= 12
+        assert patches_obj[999].interacts_with == [999]
+        assert np.array_equal(patches_obj.arrays.indptr, np.arange(1001))
@@ -1,5 +1,8 @@
 import os
+import numpy as np
 from hoomd_kf.patchy_system import PatchySystem
+from hoomd_kf.patches import Patches
+from hoomd_kf.bonds import find_bonds
 
 class TestPatchySystem:
     def test_initial_configuration(self):
@@ -39,4 +42,90 @@ class TestPatchySystem:
         assert list(type_ids).count(1) / test_system.num_particles == 0.15
         assert list(type_ids).count(2) / test_system.num_particles == 0.25
         assert list(type_ids).count(3) / test_system.num_particles == 0.5
-        
\ No newline at end of file
+        
+    def test_initial_configuration_dtypes(self):
+        test_system = PatchySystem(num_particles=1000,
+                                   density=50)
+
+        test_system.generate_initial_configuration(file_name="aux_files/initial.gsd", mode='wb')
+        snapshot = test_system.snapshot
+
+        assert snapshot.particles.position.dtype == np.float32
+        assert snapshot.particles.orientation.dtype == np.float32
+        assert snapshot.particles.typeid.dtype == np.uint32
+        assert len(np.unique(snapshot.particles.position, axis=0)) == 1000
+
+    def test_exact_type_counts(self):
+        test_system = PatchySystem(num_particles=10,
+                                   density=1,
+                                   particle_types={'A':1/3, 'B':1/3, 'C':1/3})
+        snapshot = test_system.get_initial_snapshot(rng=0)
+        assert len(snapshot.particles.typeid) == 10
+        assert list(np.bincount(snapshot.particles.typeid)) == [4, 3, 3]
+
+        # same seed, same permutation
+        again = test_system.get_initial_snapshot(rng=0)
+        assert np.array_equal(again.particles.typeid, snapshot.particles.typeid)
+
+    def test_random_orientations(self):
+        test_system = PatchySystem(num_particles=1000,
+                                   density=50)
+        test_system.generate_initial_configuration(file_name="aux_files/initial.gsd", mode='wb',
+                                                   seed=1, random_orientations=True)
+        orientation = test_system.snapshot.particles.orientation
+
+        assert orientation.dtype == np.float32
+        assert np.allclose(np.linalg.norm(orientation, axis=1), 1, atol=1e-6)
+        assert len(np.unique(orientation, axis=0)) == 1000
+        # uniform rotations have no preferred axis
+        assert np.allclose(np.mean(orientation[:, 1:] ** 2, axis=0), 0.25, atol=0.03)
+
+    def test_fluid_configuration(self):
+        test_system = PatchySystem(num_particles=500,
+                                   density=1,
+                                   particle_types={'A':0.5, 'B':0.5})
+        test_system.generate_initial_configuration(file_name="aux_files/initial.gsd", mode='wb',
+                                                   seed=2, structure='fluid',
+                                                   packing_fraction=0.45)
+        snapshot = test_system.snapshot
+        L = snapshot.configuration.box[0]
+        position = snapshot.particles.position
+
+        assert position.dtype == np.float32
+        assert np.isclose(500 * np.pi / 6 / L ** 3, 0.45)
+        assert np.all(np.abs(position) <= L/2)
+        assert list(np.bincount(snapshot.particles.typeid)) == [250, 250]
+
+        dr = position[:, None, :] - position[None, :, :]
+        dr -= L * np.round(dr / L)
+        r = np.linalg.norm(dr, axis=2)
+        assert np.min(r[np.triu_indices(500, k=1)]) >= 1
+
+    def test_crystal_configuration(self):
+        patches = Patches()
+        patches.generate_simple_tetrahedral()
+        test_system = PatchySystem(num_particles=512,
+                                   density=1,
+                                   patches=patches,
+                                   particle_types={'A':0.5, 'B':0.5})
+        test_system.generate_initial_configuration(file_name="aux_files/initial.gsd", mode='wb',
+                                                   seed=0, structure='diamond',
+                                                   packing_fraction=0.3)
+        snapshot = test_system.snapshot
+        L = snapshot.configuration.box[0]
+
+        assert snapshot.particles.position.dtype == np.float32
+        assert snapshot.particles.orientation.dtype == np.float32
+        assert np.isclose(512 * np.pi / 6 / L ** 3, 0.3)
+        assert list(np.bincount(snapshot.particles.typeid)) == [256, 256]
+        # one orientation per site of the unit cell
+        assert len(np.unique(snapshot.particles.orientation, axis=0)) <= 8
+        # a complete diamond lattice, every particle has 4 bonds
+        assert len(find_bonds(patches, snapshot)) == 2 * 512
+
+    def test_fluid_default_orientations(self):
+        test_system = PatchySystem(num_particles=100,
+                                   density=1)
+        snapshot = test_system.get_fluid_snapshot(rng=0, packing_fraction=0.3)
+        # same default as the lattice and generate_initial_configuration()
+        assert np.all(snapshot.particles.orientation == [1, 0, 0, 0])
@@ -0,0 +1,116 @@
+import os
+import json
+import pytest
+import numpy as np
+import gsd.hoomd
+from hoomd_kf.patchy_system import PatchySystem
+from hoomd_kf.patches import Patches
+from hoomd_kf.bonds import find_bonds
+from hoomd_kf.sweep import make_state_points, generate_initial_states, get_chunks
+
+class TestSweep:
+    def test_make_state_points(self):
+        state_points = make_state_points(num_particles=[100, 200], density=[0.1, 0.2, 0.3])
+        assert len(state_points) == 6
+        assert state_points[1] == {'num_particles': 100, 'density': 0.2}
+
+        chunks = get_chunks(state_points, range(6), 2)
+        assert len(chunks) == 4
+        for jobs in chunks:
+            assert len({state_point['num_particles'] for _, state_point, _ in jobs}) == 1
+
+    def test_generate_initial_states(self, tmp_path):
+        state_points = make_state_points(num_particles=[64, 100],
+                                         density=[0.1, 0.5],
+                                         particle_types=[{'A': 0.5, 'B': 0.5}],
+                                         kf_lambda=[1.1])
+        manifest = generate_initial_states(state_points, tmp_path, n_workers=2, seed=3)
+
+        assert len(manifest) == 4
+        with open(os.path.join(tmp_path, "manifest.json")) as f:
+            assert json.load(f) == manifest
+
+        for entry, state_point in zip(manifest, state_points):
+            assert entry['kf_lambda'] == 1.1
+            assert entry['num_particles'] == state_point['num_particles']
+            with gsd.hoomd.open(name=os.path.join(tmp_path, entry['file_name']), mode='rb') as f:
+                frame = f[0]
+            assert frame.particles.N == state_point['num_particles']
+            assert np.isclose(frame.configuration.box[0], entry['box_length'])
+
+            # same lattice as a single system
+            system = PatchySystem(num_particles=state_point['num_particles'],
+                                  density=state_point['density'])
+            expected = system.get_initial_snapshot()
+            assert np.array_equal(frame.particles.position, expected.particles.position)
+
+        # the seeds make the sweep reproducible
+        again = generate_initial_states(state_points, tmp_path / "again", n_workers=1, seed=3)
+        assert [entry['seed'] for entry in again] == [entry['seed'] for entry in manifest]
+        with gsd.hoomd.open(name=os.path.join(tmp_path, manifest[0]['file_name']), mode='rb') as f:
+            type_ids = f[0].particles.typeid
+        with gsd.hoomd.open(name=os.path.join(tmp_path / "again", again[0]['file_name']),
+                            mode='rb') as f:
+            assert np.array_equal(f[0].particles.typeid, type_ids)
+
+    def test_structures(self, tmp_path):
+        state_points = [{'num_particles': 200, 'density': 1, 'structure': 'fluid',
+                         'packing_fraction': 0.3},
+                        {'num_particles': 200, 'density': 1, 'structure': 'flud'}]
+        manifest = generate_initial_states(state_points, tmp_path, n_workers=1, seed=0)
+
+        # the unknown structure is left out
+        assert [entry['index'] for entry in manifest] == [0]
+        assert not os.path.exists(os.path.join(tmp_path, "state_00001.gsd"))
+        with gsd.hoomd.open(name=os.path.join(tmp_path, manifest[0]['file_name']), mode='rb') as f:
+            L = f[0].configuration.box[0]
+        assert np.isclose(200 * np.pi / 6 / L ** 3, 0.3)
+
+    def test_crystal_structures(self, tmp_path):
+        patches = Patches()
+        patches.generate_simple_tetrahedral()
+        state_points = make_state_points(num_particles=[250],
+                                         density=[1],
+                                         structure=['bcc', 'fcc'],
+                                         packing_fraction=[0.6])
+        manifest = generate_initial_states(state_points, tmp_path, n_workers=2, seed=1,
+                                           patches=patches)
+        assert len(manifest) == 2
+
+        for entry in manifest:
+            assert entry['patches_hash'] == patches.content_hash()
+            with gsd.hoomd.open(name=os.path.join(tmp_path, entry['file_name']), mode='rb') as f:
+                frame = f[0]
+            system = PatchySystem(num_particles=250, density=1, patches=patches)
+            expected = system.get_crystal_snapshot(entry['structure'], rng=entry['seed'],
+                                                   packing_fraction=0.6)
+            assert np.array_equal(frame.particles.position, expected.particles.position)
+            assert np.array_equal(frame.particles.orientation, expected.particles.orientation)
+            assert np.array_equal(frame.particles.typeid, expected.particles.typeid)
+
+        # tetrahedral patches bond along the bcc lattice
+        with gsd.hoomd.open(name=os.path.join(tmp_path, manifest[0]['file_name']), mode='rb') as f:
+            assert len(find_bonds(patches, f[0])) == 2 * 250
+
+        # without patches, crystals can't be oriented
+        manifest = generate_initial_states(state_points, tmp_path / "no_patches", n_workers=1)
+        assert manifest == []
+
+    def test_numpy_grid(self, tmp_path):
+        state_points = make_state_points(num_particles=np.array([64, 125]),
+                                         density=np.linspace(0.1, 0.2, 2))
+        assert type(state_points[0]['num_particles']) is int
+        assert type(state_points[0]['density']) is float
+
+        # values given directly as NumPy scalars are converted in the manifest
+        state_points.append({'num_particles': np.int64(27), 'density': np.float32(0.5)})
+        manifest = generate_initial_states(state_points, tmp_path, n_workers=1, seed=0)
+        assert len(manifest) == 5
+        with open(os.path.join(tmp_path, "manifest.json")) as f:
+            assert json.load(f)[4]['num_particles'] == 27
+
+        # a state point that can't be written to JSON fails before any file is written
+        with pytest.raises(TypeError):
+            generate_initial_states([{'num_particles': 8, 'density': 1, 'tag': object()}],
+                                    tmp_path / "bad", n_workers=1)
+        assert not os.path.exists(tmp_path / "bad")
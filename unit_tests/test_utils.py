@@ -1,6 +1,12 @@
+import itertools
 import numpy as np
+from scipy.sparse import csr_matrix
 from hoomd_kf.utils import check_adjacency
 from hoomd_kf.utils import generate_patch_geometry
+from hoomd_kf.utils import rotate_vectors
+from hoomd_kf.utils import adjacency_to_csr, symmetrize_adjacency
+from hoomd_kf.utils import simple_cubic_lattice
+from hoomd_kf.utils import allocate_counts, random_quaternions, rotation_matrix_to_quaternion
 
 class TestUtils:
     def test_check_adjacency(self):
@@ -68,4 +74,77 @@ class TestUtils:
         assert v1.dot(v1) == 1
         assert v2.dot(v2) == 1
         assert v3.dot(v3) == 1
-        assert v4.dot(v4) == 1
\ No newline at end of file
+        assert v4.dot(v4) == 1
+
+    def test_rotate_vectors(self):
+        q = np.array([[1, 0, 0, 0],
+                      [np.cos(np.pi/4), 0, 0, np.sin(np.pi/4)]])
+        vecs = np.array([[1, 0, 0], [0, 0, 1]])
+        rotated = rotate_vectors(q, vecs)
+
+        assert rotated.shape == (2, 2, 3)
+        assert np.allclose(rotated[0], vecs)
+        assert np.allclose(rotated[1, 0], [0, 1, 0])
+        assert np.allclose(rotated[1, 1], [0, 0, 1])
+
+    def test_check_sparse_adjacency(self):
+        adjacency = csr_matrix(np.array([[0, 1], [1, 0]]))
+        assert check_adjacency(adjacency)
+
+        adjacency = csr_matrix(np.array([[0, 1], [0, 0]]))
+        assert not check_adjacency(adjacency)
+
+        adjacency = csr_matrix(np.array([[0, 2], [2, 0]]))
+        assert not check_adjacency(adjacency)
+
+        adjacency = csr_matrix(np.ones((2, 3)))
+        assert not check_adjacency(adjacency)
+
+    def test_adjacency_to_csr(self):
+        adjacency = symmetrize_adjacency([[0, 1, 0], [0, 0, 0], [1, 0, 1]])
+        assert check_adjacency(adjacency)
+
+        indptr, indices = adjacency_to_csr(adjacency)
+        assert list(indptr) == [0, 2, 3, 5]
+        assert list(indices) == [1, 2, 0, 0, 2]
+
+    def test_simple_cubic_lattice(self):
+        K = 4
+        L = 10.
+        x = np.linspace(-L/2, L/2, K, endpoint=False)
+        reference = np.array(list(itertools.product(x, repeat=3)))[:50]
+
+        position = simple_cubic_lattice(50, K, L)
+        assert position.dtype == np.float32
+        assert position.shape == (50, 3)
+        assert np.allclose(position, reference)
+
+    def test_allocate_counts(self):
+        assert list(allocate_counts([0.5, 0.5], 11)) == [6, 5]
+        assert list(allocate_counts([0.1, 0.15, 0.25, 0.5], 100)) == [10, 15, 25, 50]
+        assert list(allocate_counts([0.2, 0.3, 0.5], 7)) == [1, 2, 4]
+
+        rng = np.random.default_rng(0)
+        for _ in range(100):
+            fractions = rng.random(5)
+            n = int(rng.integers(1, 1000))
+            counts = allocate_counts(fractions, n)
+            assert counts.sum() == n
+            assert np.all(np.abs(counts - fractions / fractions.sum() * n) < 1)
+
+    def test_random_quaternions(self):
+        q = random_quaternions(np.random.default_rng(0), 5000)
+        assert q.shape == (5000, 4)
+        assert np.allclose(np.linalg.norm(q, axis=1), 1)
+        assert np.allclose(np.mean(q ** 2, axis=0), 0.25, atol=0.02)
+
+    def test_rotation_matrix_to_quaternion(self):
+        quaternions = random_quaternions(np.random.default_rng(3), 20)
+        # rotation matrices from the rotated basis vectors
+        matrices = np.transpose(rotate_vectors(quaternions, np.eye(3)), (0, 2, 1))
+        result = rotation_matrix_to_quaternion(matrices)
+
+        assert np.allclose(np.abs(np.sum(result * quaternions, axis=1)), 1)
+        # half-turns, where the trace is -1
+        half_turns = rotation_matrix_to_quaternion([np.diag([1, -1, -1]), np.diag([-1, -1, 1])])
+        assert np.allclose(half_turns, [[0, 1, 0, 0], [0, 0, 0, 1]])